@@ -5,67 +5,57 @@ directement dans chaque fichier JSON du dossier output.
 Format simple : liste de phrases directement.
 """
 
-import json
 import os
-import shutil
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+import codec
+from backup_store import BackupStore
+from enrichment_manifest import EnrichmentManifest
+from file_pool import default_workers, process_files
+from scanner import SECTION_FORMAT, close_cache, enable_cache, get_scanner, iter_descriptions, scan_change
+
+ACID_KEYWORDS = [
+    'acid', 'consistency', 'atomic', 'isolation', 'durability',
+    'transaction', 'commit', 'rollback', 'lock', 'concurrency',
+    'serializable', 'repeatable_read', 'read_committed', 'read_uncommitted',
+    'write_ahead_log', 'wal', 'mvcc', 'optimistic_locking',
+    'pessimistic_locking', 'deadlock', 'two_phase_commit', '2pc',
+    'causal_consistency', 'eventual_consistency', 'strong_consistency',
+    'linearizability', 'serializability', 'isolation_level',
+    'atomicity', 'consistency_check', 'data_integrity', 'foreign_key',
+    'referential_integrity', 'constraint', 'unique_constraint',
+    'not_null', 'check_constraint', 'domain_integrity'
+]
+
 class AcidConsistencyAdderSimple:
-    def __init__(self, output_dir: str = "output"):
+    def __init__(self, output_dir: str = "output", incremental: bool = True, workers: Optional[int] = None):
         self.output_dir = Path(output_dir)
-        self.backup_dir = Path("output_backup_simple")
+        # Ne retraiter que les patches nouveaux ou modifiés (voir enrichment_manifest.py)
+        self.manifest = EnrichmentManifest() if incremental else None
+        # Fichiers traités en parallèle (voir file_pool.py)
+        self.workers = workers or default_workers()
+        self.backup_store = BackupStore()
+        self.backup_stage = "acid"
         
-        self.acid_keywords = [
-            'acid', 'consistency', 'atomic', 'isolation', 'durability',
-            'transaction', 'commit', 'rollback', 'lock', 'concurrency',
-            'serializable', 'repeatable_read', 'read_committed', 'read_uncommitted',
-            'write_ahead_log', 'wal', 'mvcc', 'optimistic_locking',
-            'pessimistic_locking', 'deadlock', 'two_phase_commit', '2pc',
-            'causal_consistency', 'eventual_consistency', 'strong_consistency',
-            'linearizability', 'serializability', 'isolation_level',
-            'atomicity', 'consistency_check', 'data_integrity', 'foreign_key',
-            'referential_integrity', 'constraint', 'unique_constraint',
-            'not_null', 'check_constraint', 'domain_integrity'
-        ]
+        self.acid_keywords = ACID_KEYWORDS
     
     def is_acid_related(self, text: str) -> bool:
         """Vérifie si le texte contient des mots-clés ACID/CONSISTENCY"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.acid_keywords)
+        return scan_change(text)["acid"]
     
-    def extract_acid_features_from_changes(self, changes: List[str]) -> List[str]:
-        """Extrait les fonctionnalités ACID de la liste des changements"""
-        acid_features = []
-        for change in changes:
-            if self.is_acid_related(change):
-                acid_features.append(change)
-        return acid_features
-    
-    def extract_acid_features_from_ai_analysis(self, ai_analysis: Dict) -> List[str]:
-        """Extrait les fonctionnalités ACID de l'analyse IA"""
-        acid_features = []
-        if 'details' in ai_analysis:
-            for detail in ai_analysis['details']:
-                if self.is_acid_related(detail['description']):
-                    acid_features.append(detail['description'])
-        return acid_features
+    def extract_acid_features(self, version_data: Dict) -> List[str]:
+        """Descriptions ACID du patch, chacune une seule fois (voir scanner.iter_descriptions)"""
+        return [description for description, _ in iter_descriptions(version_data)
+                if self.is_acid_related(description)]
     
     def process_version_data(self, version_data: Dict) -> Dict:
         """Traite les données d'une version pour ajouter les fonctionnalités ACID"""
         modified_data = version_data.copy()
         
-        # Extraire les fonctionnalités ACID
-        acid_features = []
-        
-        # Depuis les changements
-        if 'changes' in version_data:
-            acid_features.extend(self.extract_acid_features_from_changes(version_data['changes']))
-        
-        # Depuis l'analyse IA
-        if 'ai_analysis' in version_data:
-            acid_features.extend(self.extract_acid_features_from_ai_analysis(version_data['ai_analysis']))
+        # Extraire les fonctionnalités ACID (changements et analyse IA : mêmes lignes)
+        acid_features = self.extract_acid_features(version_data)
         
         # Ajouter la section acid_consistency_features avec format simple
         modified_data['acid_consistency_features'] = {
@@ -77,60 +67,79 @@ class AcidConsistencyAdderSimple:
         return modified_data
     
     def backup_output_directory(self):
-        """Crée une sauvegarde du dossier output"""
-        if self.backup_dir.exists():
-            shutil.rmtree(self.backup_dir)
-        shutil.copytree(self.output_dir, self.backup_dir)
-        print(f"Sauvegarde créée dans: {self.backup_dir}")
+        """Enregistre un instantané du dossier output (voir backup_store.py)"""
+        self.backup_store.snapshot(self.backup_stage, self.output_dir)
+    
+    def is_up_to_date(self, version_data: Dict) -> bool:
+        """Vrai si la section 'acid_consistency_features' est déjà à jour pour ces changements"""
+        if self.manifest is None or 'acid_consistency_features' not in version_data:
+            return False
+        if self.manifest.is_current('acid', version_data, get_scanner().fingerprints['acid'] + SECTION_FORMAT):
+            self.manifest.reused += 1
+            return True
+        return False
+    
+    def enrich_version(self, version_data: Dict) -> Dict:
+        """Enrichit un document ; le rend tel quel s'il n'a pas de 'database' ou est déjà à jour"""
+        if 'database' not in version_data or self.is_up_to_date(version_data):
+            return version_data
+        
+        modified_version = self.process_version_data(version_data)
+        if self.manifest is not None:
+            self.manifest.mark('acid', modified_version, get_scanner().fingerprints['acid'] + SECTION_FORMAT)
+            self.manifest.processed += 1
+        return modified_version
     
-    def process_json_file(self, file_path: Path) -> bool:
-        """Traite un fichier JSON individuel"""
+    def process_json_file(self, file_path: Path) -> Optional[Dict[str, int]]:
+        """Traite un fichier JSON individuel ; renvoie ses totaux s'il a été modifié, sinon None"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if not isinstance(data, list):
+            if not codec.is_array(file_path):
                 print(f"Le fichier {file_path.name} ne contient pas une liste")
-                return False
+                return None
             
             modified = False
-            for i, version_data in enumerate(data):
-                if 'database' not in version_data:
-                    continue
-                
-                # Traiter les données de la version
-                modified_version = self.process_version_data(version_data)
-                
-                # Vérifier si des modifications ont été apportées
-                if modified_version != version_data:
-                    data[i] = modified_version
-                    modified = True
+            totals = {"acid_features": 0}
+            writer = codec.open_writer(file_path)
+            try:
+                for version_data in codec.iter_array(file_path):
+                    modified_version = self.enrich_version(version_data)
+                    if 'acid_consistency_features' in modified_version:
+                        totals["acid_features"] += modified_version['acid_consistency_features']['total_count']
                     
-                    acid_count = modified_version['acid_consistency_features']['total_count']
-                    if acid_count > 0:
-                        print(f"  {version_data.get('patch_version', version_data.get('major_version', 'unknown'))}: {acid_count} fonctionnalités ACID")
+                    # Vérifier si des modifications ont été apportées
+                    if modified_version is not version_data and modified_version != version_data:
+                        modified = True
+                        
+                        acid_count = modified_version['acid_consistency_features']['total_count']
+                        if acid_count > 0:
+                            print(f"  {version_data.get('patch_version', version_data.get('major_version', 'unknown'))}: {acid_count} fonctionnalités ACID")
+                    
+                    writer.write(modified_version)
+            except Exception:
+                writer.abort()
+                raise
             
             # Sauvegarder les modifications
             if modified:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                writer.close()
                 print(f"✅ Fichier modifié: {file_path.name}")
-                return True
+                return totals
             else:
+                writer.abort()
                 print(f"ℹ️  Aucune modification nécessaire: {file_path.name}")
-                return False
-                
+                return None
+        
         except Exception as e:
             print(f"❌ Erreur lors du traitement du fichier {file_path}: {e}")
-            return False
-    
+            return None
+
     def process_all_files(self):
         """Traite tous les fichiers JSON du dossier output"""
         if not self.output_dir.exists():
             print(f"Le dossier {self.output_dir} n'existe pas.")
             return
         
-        json_files = list(self.output_dir.glob("*.json"))
+        json_files = codec.dataset_files(self.output_dir)
         if not json_files:
             print("Aucun fichier JSON trouvé dans le dossier output.")
             return
@@ -144,21 +153,10 @@ class AcidConsistencyAdderSimple:
         total_files_modified = 0
         total_acid_features = 0
         
-        for file_path in json_files:
-            print(f"\n📁 Traitement de: {file_path.name}")
-            if self.process_json_file(file_path):
+        for file_path, totals in process_files(self, json_files, self.workers):
+            if totals is not None:
                 total_files_modified += 1
-                
-                # Compter les fonctionnalités ACID dans ce fichier
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    for version_data in data:
-                        if 'acid_consistency_features' in version_data:
-                            total_acid_features += version_data['acid_consistency_features']['total_count']
-                except:
-                    pass
+                total_acid_features += totals["acid_features"]
         
         print("\n" + "=" * 60)
         print("RÉSUMÉ DU TRAITEMENT")
@@ -166,7 +164,10 @@ class AcidConsistencyAdderSimple:
         print(f"Fichiers traités: {len(json_files)}")
         print(f"Fichiers modifiés: {total_files_modified}")
         print(f"Total fonctionnalités ACID ajoutées: {total_acid_features}")
-        print(f"Sauvegarde disponible dans: {self.backup_dir}")
+        print(f"Sauvegarde disponible : python backup_store.py restore {self.backup_stage}")
+        if self.manifest is not None:
+            self.manifest.save()
+            print(self.manifest.report('acid'))
         
         if total_files_modified > 0:
             print("\n✅ Tous les fichiers ont été mis à jour avec les fonctionnalités ACID/CONSISTENCY!")
@@ -188,7 +189,9 @@ def main():
         return
     
     adder = AcidConsistencyAdderSimple()
+    enable_cache()
     adder.process_all_files()
+    close_cache()
 
 if __name__ == "__main__":
     main()
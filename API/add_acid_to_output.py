@@ -6,15 +6,17 @@ directement dans chaque fichier JSON du dossier output.
 
 import json
 import os
-import shutil
 from pathlib import Path
 from typing import Dict, List, Any
 from datetime import datetime
 
+from backup_store import BackupStore
+
 class AcidConsistencyAdder:
     def __init__(self, output_dir: str = "output"):
         self.output_dir = Path(output_dir)
-        self.backup_dir = Path("output_backup")
+        self.backup_store = BackupStore()
+        self.backup_stage = "add_acid"
         
         self.acid_keywords = [
             'acid', 'consistency', 'atomic', 'isolation', 'durability',
@@ -83,11 +85,8 @@ class AcidConsistencyAdder:
         return modified_data
     
     def backup_output_directory(self):
-        """Crée une sauvegarde du dossier output"""
-        if self.backup_dir.exists():
-            shutil.rmtree(self.backup_dir)
-        shutil.copytree(self.output_dir, self.backup_dir)
-        print(f"Sauvegarde créée dans: {self.backup_dir}")
+        """Enregistre un instantané du dossier output (voir backup_store.py)"""
+        self.backup_store.snapshot(self.backup_stage, self.output_dir)
     
     def process_json_file(self, file_path: Path) -> bool:
         """Traite un fichier JSON individuel"""
@@ -172,7 +171,7 @@ class AcidConsistencyAdder:
         print(f"Fichiers traités: {len(json_files)}")
         print(f"Fichiers modifiés: {total_files_modified}")
         print(f"Total fonctionnalités ACID ajoutées: {total_acid_features}")
-        print(f"Sauvegarde disponible dans: {self.backup_dir}")
+        print(f"Sauvegarde disponible : python backup_store.py restore {self.backup_stage}")
         
         if total_files_modified > 0:
             print("\n✅ Tous les fichiers ont été mis à jour avec les fonctionnalités ACID/CONSISTENCY!")
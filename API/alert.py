@@ -4,145 +4,106 @@ Script pour ajouter des alertes (vulnérabilités critiques, performance majeure
 directement dans chaque fichier JSON du dossier output.
 """
 
-import json
 import os
-import shutil
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 import re
 
+import codec
+from backup_store import BackupStore
+from enrichment_manifest import EnrichmentManifest
+from file_pool import default_workers, process_files
+from scanner import SECTION_FORMAT, close_cache, enable_cache, get_scanner, iter_descriptions, scan_change
+
+# Mots-clés pour les vulnérabilités critiques
+VULNERABILITY_KEYWORDS = [
+    'security', 'vulnerability', 'cve', 'exploit', 'attack', 'breach',
+    'authentication', 'authorization', 'privilege escalation', 'injection',
+    'xss', 'csrf', 'sql injection', 'remote code execution', 'rce',
+    'buffer overflow', 'memory corruption', 'dos', 'denial of service',
+    'cryptographic', 'encryption', 'tls', 'ssl', 'certificate',
+    'credential', 'password', 'token', 'jwt', 'oauth', 'saml',
+    'firewall', 'malware', 'virus', 'trojan', 'backdoor', 'rootkit'
+]
+
+# Mots-clés pour les changements de performance majeure
+PERFORMANCE_KEYWORDS = [
+    'performance', 'optimization', 'improve', 'speed', 'fast', 'slow',
+    'latency', 'throughput', 'benchmark', 'scalability', 'memory',
+    'cpu', 'disk', 'network', 'cache', 'index', 'query', 'execution',
+    'concurrency', 'parallel', 'async', 'batch', 'pool', 'connection',
+    'compression', 'serialization', 'deserialization', 'marshaling',
+    'garbage collection', 'gc', 'heap', 'stack', 'allocation', 'leak',
+    'bottleneck', 'hotspot', 'critical path', 'resource', 'utilization'
+]
+
+# Mots-clés pour les changements critiques/majeurs
+CRITICAL_KEYWORDS = [
+    'critical', 'major', 'breaking', 'incompatible', 'deprecation',
+    'removal', 'discontinued', 'obsolete', 'legacy', 'migration',
+    'upgrade', 'downgrade', 'compatibility', 'stability', 'reliability',
+    'crash', 'hang', 'deadlock', 'timeout', 'failure', 'error',
+    'exception', 'panic', 'abort', 'terminate', 'shutdown', 'restart'
+]
+
+# Mots-clés déterminant le niveau d'alerte (évalués dans cet ordre)
+ALERT_LEVEL_KEYWORDS = {
+    'critical': ['cve', 'exploit', 'rce', 'remote code execution', 'privilege escalation', 'crash', 'security'],
+    'high': ['breaking', 'incompatible', 'major performance', 'critical performance', 'deprecation'],
+    'medium': ['performance', 'optimization', 'improve', 'major', 'significant'],
+}
+
 class AlertsAdder:
-    def __init__(self, output_dir: str = "output"):
+    def __init__(self, output_dir: str = "output", incremental: bool = True, workers: Optional[int] = None):
         self.output_dir = Path(output_dir)
-        self.backup_dir = Path("output_backup_alerts")
-        
-        # Mots-clés pour les vulnérabilités critiques
-        self.vulnerability_keywords = [
-            'security', 'vulnerability', 'cve', 'exploit', 'attack', 'breach',
-            'authentication', 'authorization', 'privilege escalation', 'injection',
-            'xss', 'csrf', 'sql injection', 'remote code execution', 'rce',
-            'buffer overflow', 'memory corruption', 'dos', 'denial of service',
-            'cryptographic', 'encryption', 'tls', 'ssl', 'certificate',
-            'credential', 'password', 'token', 'jwt', 'oauth', 'saml',
-            'firewall', 'malware', 'virus', 'trojan', 'backdoor', 'rootkit'
-        ]
+        # Ne retraiter que les patches nouveaux ou modifiés (voir enrichment_manifest.py)
+        self.manifest = EnrichmentManifest() if incremental else None
+        # Fichiers traités en parallèle (voir file_pool.py)
+        self.workers = workers or default_workers()
+        self.backup_store = BackupStore()
+        self.backup_stage = "alerts"
         
-        # Mots-clés pour les changements de performance majeure
-        self.performance_keywords = [
-            'performance', 'optimization', 'improve', 'speed', 'fast', 'slow',
-            'latency', 'throughput', 'benchmark', 'scalability', 'memory',
-            'cpu', 'disk', 'network', 'cache', 'index', 'query', 'execution',
-            'concurrency', 'parallel', 'async', 'batch', 'pool', 'connection',
-            'compression', 'serialization', 'deserialization', 'marshaling',
-            'garbage collection', 'gc', 'heap', 'stack', 'allocation', 'leak',
-            'bottleneck', 'hotspot', 'critical path', 'resource', 'utilization'
-        ]
-        
-        # Mots-clés pour les changements critiques/majeurs
-        self.critical_keywords = [
-            'critical', 'major', 'breaking', 'incompatible', 'deprecation',
-            'removal', 'discontinued', 'obsolete', 'legacy', 'migration',
-            'upgrade', 'downgrade', 'compatibility', 'stability', 'reliability',
-            'crash', 'hang', 'deadlock', 'timeout', 'failure', 'error',
-            'exception', 'panic', 'abort', 'terminate', 'shutdown', 'restart'
-        ]
+        self.vulnerability_keywords = VULNERABILITY_KEYWORDS
+        self.performance_keywords = PERFORMANCE_KEYWORDS
+        self.critical_keywords = CRITICAL_KEYWORDS
     
     def is_vulnerability_related(self, text: str) -> bool:
         """Vérifie si le texte contient des mots-clés de vulnérabilité"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.vulnerability_keywords)
+        return 'vulnerability' in scan_change(text)["alert_types"]
     
     def is_performance_related(self, text: str) -> bool:
         """Vérifie si le texte contient des mots-clés de performance"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.performance_keywords)
+        return 'performance' in scan_change(text)["alert_types"]
     
     def is_critical_change(self, text: str) -> bool:
         """Vérifie si le texte contient des mots-clés de changement critique"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.critical_keywords)
+        return 'critical_change' in scan_change(text)["alert_types"]
     
     def assess_alert_level(self, text: str) -> str:
-        """Évalue le niveau d'alerte basé sur le contenu"""
-        text_lower = text.lower()
-        
-        # Critique : vulnérabilités de sécurité ou crashes
-        if any(word in text_lower for word in ['cve', 'exploit', 'rce', 'remote code execution', 'privilege escalation', 'crash', 'security']):
-            return 'critical'
-        
-        # Élevé : changements de performance majeurs ou breaking changes
-        elif any(word in text_lower for word in ['breaking', 'incompatible', 'major performance', 'critical performance', 'deprecation']):
-            return 'high'
-        
-        # Moyen : améliorations de performance ou changements importants
-        elif any(word in text_lower for word in ['performance', 'optimization', 'improve', 'major', 'significant']):
-            return 'medium'
-        
-        # Bas : changements mineurs
-        elif self.is_vulnerability_related(text) or self.is_performance_related(text) or self.is_critical_change(text):
-            return 'low'
-        
-        return None
+        """Évalue le niveau d'alerte basé sur le contenu (voir ALERT_LEVEL_KEYWORDS)"""
+        return scan_change(text)["alert_level"]
     
-    def extract_alerts_from_changes(self, changes: List[str]) -> List[Dict]:
-        """Extrait les alertes de la liste des changements"""
+    def extract_alerts(self, version_data: Dict) -> List[Dict]:
+        """Alertes du patch, une par description (voir scanner.iter_descriptions)"""
         alerts = []
-        for change in changes:
-            alert_level = self.assess_alert_level(change)
-            if alert_level:
-                alert_type = []
-                if self.is_vulnerability_related(change):
-                    alert_type.append('vulnerability')
-                if self.is_performance_related(change):
-                    alert_type.append('performance')
-                if self.is_critical_change(change):
-                    alert_type.append('critical_change')
-                
+        for description, category in iter_descriptions(version_data):
+            record = scan_change(description)
+            if record["alert_level"]:
                 alerts.append({
-                    "description": change,
-                    "level": alert_level,
-                    "type": alert_type,
+                    "description": description,
+                    "level": record["alert_level"],
+                    "type": list(record["alert_types"]),
+                    "category": category or 'unknown',
                 })
         return alerts
     
-    def extract_alerts_from_ai_analysis(self, ai_analysis: Dict) -> List[Dict]:
-        """Extrait les alertes de l'analyse IA"""
-        alerts = []
-        if 'details' in ai_analysis:
-            for detail in ai_analysis['details']:
-                alert_level = self.assess_alert_level(detail['description'])
-                if alert_level:
-                    alert_type = []
-                    if self.is_vulnerability_related(detail['description']):
-                        alert_type.append('vulnerability')
-                    if self.is_performance_related(detail['description']):
-                        alert_type.append('performance')
-                    if self.is_critical_change(detail['description']):
-                        alert_type.append('critical_change')
-                    
-                    alerts.append({
-                        "description": detail['description'],
-                        "level": alert_level,
-                        "type": alert_type,
-                        "category": detail.get('category', 'unknown'),
-                    })
-        return alerts
-    
     def process_version_data(self, version_data: Dict) -> Dict:
         """Traite les données d'une version pour ajouter les alertes"""
         modified_data = version_data.copy()
         
-        # Extraire les alertes
-        alerts = []
-        
-        # Depuis les changements
-        if 'changes' in version_data:
-            alerts.extend(self.extract_alerts_from_changes(version_data['changes']))
-        
-        # Depuis l'analyse IA
-        if 'ai_analysis' in version_data:
-            alerts.extend(self.extract_alerts_from_ai_analysis(version_data['ai_analysis']))
+        # Extraire les alertes (changements et analyse IA : mêmes lignes)
+        alerts = self.extract_alerts(version_data)
         
         # Trier les alertes par niveau d'importance
         level_priority = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
@@ -162,68 +123,89 @@ class AlertsAdder:
         return modified_data
     
     def backup_output_directory(self):
-        """Crée une sauvegarde du dossier output"""
-        if self.backup_dir.exists():
-            shutil.rmtree(self.backup_dir)
-        shutil.copytree(self.output_dir, self.backup_dir)
-        print(f"Sauvegarde créée dans: {self.backup_dir}")
+        """Enregistre un instantané du dossier output (voir backup_store.py)"""
+        self.backup_store.snapshot(self.backup_stage, self.output_dir)
+    
+    def is_up_to_date(self, version_data: Dict) -> bool:
+        """Vrai si la section 'alerts' est déjà à jour pour ces changements"""
+        if self.manifest is None or 'alerts' not in version_data:
+            return False
+        if self.manifest.is_current('alerts', version_data, get_scanner().fingerprints['alert'] + SECTION_FORMAT):
+            self.manifest.reused += 1
+            return True
+        return False
+    
+    def enrich_version(self, version_data: Dict) -> Dict:
+        """Enrichit un document ; le rend tel quel s'il n'a pas de 'database' ou est déjà à jour"""
+        if 'database' not in version_data or self.is_up_to_date(version_data):
+            return version_data
+        
+        modified_version = self.process_version_data(version_data)
+        if self.manifest is not None:
+            self.manifest.mark('alerts', modified_version, get_scanner().fingerprints['alert'] + SECTION_FORMAT)
+            self.manifest.processed += 1
+        return modified_version
     
-    def process_json_file(self, file_path: Path) -> bool:
-        """Traite un fichier JSON individuel"""
+    def process_json_file(self, file_path: Path) -> Optional[Dict[str, int]]:
+        """Traite un fichier JSON individuel ; renvoie ses totaux s'il a été modifié, sinon None"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if not isinstance(data, list):
+            if not codec.is_array(file_path):
                 print(f"Le fichier {file_path.name} ne contient pas une liste")
-                return False
+                return None
             
             modified = False
-            for i, version_data in enumerate(data):
-                if 'database' not in version_data:
-                    continue
-                
-                # Traiter les données de la version
-                modified_version = self.process_version_data(version_data)
-                
-                # Vérifier si des modifications ont été apportées
-                if modified_version != version_data:
-                    data[i] = modified_version
-                    modified = True
+            totals = {"alerts": 0, "critical": 0, "high": 0}
+            writer = codec.open_writer(file_path)
+            try:
+                for version_data in codec.iter_array(file_path):
+                    modified_version = self.enrich_version(version_data)
+                    if 'alerts' in modified_version:
+                        totals["alerts"] += modified_version['alerts']['total_count']
+                        totals["critical"] += modified_version['alerts']['critical_count']
+                        totals["high"] += modified_version['alerts']['high_count']
                     
-                    alert_count = modified_version['alerts']['total_count']
-                    critical_count = modified_version['alerts']['critical_count']
-                    high_count = modified_version['alerts']['high_count']
+                    # Vérifier si des modifications ont été apportées
+                    if modified_version is not version_data and modified_version != version_data:
+                        modified = True
+                        
+                        alert_count = modified_version['alerts']['total_count']
+                        critical_count = modified_version['alerts']['critical_count']
+                        high_count = modified_version['alerts']['high_count']
+                        
+                        if alert_count > 0:
+                            version_name = version_data.get('patch_version', version_data.get('major_version', 'unknown'))
+                            print(f"  {version_name}: {alert_count} alertes")
+                            if critical_count > 0:
+                                print(f"    ⚠️  {critical_count} critique(s)")
+                            if high_count > 0:
+                                print(f"    🔥 {high_count} élevée(s)")
                     
-                    if alert_count > 0:
-                        version_name = version_data.get('patch_version', version_data.get('major_version', 'unknown'))
-                        print(f"  {version_name}: {alert_count} alertes")
-                        if critical_count > 0:
-                            print(f"    ⚠️  {critical_count} critique(s)")
-                        if high_count > 0:
-                            print(f"    🔥 {high_count} élevée(s)")
+                    writer.write(modified_version)
+            except Exception:
+                writer.abort()
+                raise
             
             # Sauvegarder les modifications
             if modified:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                writer.close()
                 print(f"✅ Fichier modifié: {file_path.name}")
-                return True
+                return totals
             else:
+                writer.abort()
                 print(f"ℹ️  Aucune alerte trouvée: {file_path.name}")
-                return False
-                
+                return None
+        
         except Exception as e:
             print(f"❌ Erreur lors du traitement du fichier {file_path}: {e}")
-            return False
-    
+            return None
+
     def process_all_files(self):
         """Traite tous les fichiers JSON du dossier output"""
         if not self.output_dir.exists():
             print(f"Le dossier {self.output_dir} n'existe pas.")
             return
         
-        json_files = list(self.output_dir.glob("*.json"))
+        json_files = codec.dataset_files(self.output_dir)
         if not json_files:
             print("Aucun fichier JSON trouvé dans le dossier output.")
             return
@@ -239,23 +221,12 @@ class AlertsAdder:
         total_critical = 0
         total_high = 0
         
-        for file_path in json_files:
-            print(f"\n📁 Traitement de: {file_path.name}")
-            if self.process_json_file(file_path):
+        for file_path, totals in process_files(self, json_files, self.workers):
+            if totals is not None:
                 total_files_modified += 1
-                
-                # Compter les alertes dans ce fichier
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    for version_data in data:
-                        if 'alerts' in version_data:
-                            total_alerts += version_data['alerts']['total_count']
-                            total_critical += version_data['alerts']['critical_count']
-                            total_high += version_data['alerts']['high_count']
-                except:
-                    pass
+                total_alerts += totals["alerts"]
+                total_critical += totals["critical"]
+                total_high += totals["high"]
         
         print("\n" + "=" * 70)
         print("🚨 RÉSUMÉ DES ALERTES")
@@ -265,7 +236,10 @@ class AlertsAdder:
         print(f"Total alertes détectées: {total_alerts}")
         print(f"⚠️  Alertes critiques: {total_critical}")
         print(f"🔥 Alertes élevées: {total_high}")
-        print(f"Sauvegarde disponible dans: {self.backup_dir}")
+        print(f"Sauvegarde disponible : python backup_store.py restore {self.backup_stage}")
+        if self.manifest is not None:
+            self.manifest.save()
+            print(self.manifest.report('alerts'))
         
         if total_critical > 0:
             print(f"\n⚠️  ATTENTION: {total_critical} alerte(s) critique(s) détectée(s)!")
@@ -291,7 +265,9 @@ def main():
         return
     
     adder = AlertsAdder()
+    enable_cache()
     adder.process_all_files()
+    close_cache()
 
 if __name__ == "__main__":
     main()
@@ -15,7 +15,7 @@ def extract_other_by_database():
     
     # Fichiers à analyser
     files_to_analyze = {
-        "cassandra": "cassandra_versions.json",
+        "cassandra": "cassandra-versions.json",
         "mongodb": "mongodb-versions.json", 
         "cockroachdb": "cockroachdb-versions.json"
     }
@@ -1,6 +1,41 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'API'
+
+    def ready(self):
+        from .config import ENSURE_INDEXES_ON_STARTUP
+
+        if ENSURE_INDEXES_ON_STARTUP and serving_process():
+            # En tâche de fond : le serveur démarre même si la base est lente ou injoignable
+            threading.Thread(target=ensure_indexes, name="ensure-indexes", daemon=True).start()
+
+
+def serving_process() -> bool:
+    """Processus qui sert l'API : runserver (processus rechargé) ou serveur WSGI/ASGI
+
+    migrate, shell, test, check... et le processus surveillant de
+    l'autoreloader ne touchent pas à la base (python storage.py
+    ensure-indexes pour créer les index à la main).
+    """
+    program = os.path.basename(sys.argv[0]) if sys.argv else ""
+    if program not in ("manage.py", "django-admin", "django-admin.py"):
+        return True
+    if len(sys.argv) < 2 or sys.argv[1] != "runserver":
+        return False
+    return os.environ.get("RUN_MAIN") == "true" or "--noreload" in sys.argv
+
+
+def ensure_indexes():
+    from .storage import backend_name, get_repository
+
+    try:
+        get_repository().ensure_indexes()
+    except Exception as e:
+        print(f"⚠️  Index non vérifiés au démarrage ({backend_name()}) : {e}")
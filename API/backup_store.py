@@ -0,0 +1,257 @@
+"""
+Magasin de sauvegardes adressé par contenu.
+
+Au lieu de copier tout le dossier output à chaque étape (copytree vers
+output_backup*), chaque version de fichier est stockée une seule fois,
+compressée, sous le hash SHA-256 de son contenu :
+
+    output_backups/
+        objects/ab/abcdef….json.gz      (ou .json.xz avec lzma)
+        snapshots/<étape>/<horodatage>.json
+        stat_cache.json
+
+Un instantané n'est qu'un petit manifeste {fichier: hash}. Les fichiers
+dont la taille et la date de modification n'ont pas changé ne sont même
+pas relus : sans changement, une sauvegarde ne coûte qu'un stat par
+fichier et l'écriture du manifeste.
+
+Usage :
+    python backup_store.py list [étape]
+    python backup_store.py restore <étape> [--snapshot ID] [--target DOSSIER]
+    python backup_store.py gc
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import lzma
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import codec
+
+BACKUP_DIR = "output_backups"
+
+# Compression des objets : "gzip" (rapide) ou "lzma" (plus compact)
+BACKUP_COMPRESSION = os.environ.get("BACKUP_COMPRESSION", "gzip")
+
+# Nombre d'instantanés conservés par étape
+KEEP_SNAPSHOTS = 10
+
+CODECS = {
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+}
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupStore:
+    def __init__(self, root: str = BACKUP_DIR, compression: str = BACKUP_COMPRESSION):
+        if compression not in CODECS:
+            raise ValueError(f"Compression inconnue : {compression} (choix : {', '.join(CODECS)})")
+        self.root = Path(root)
+        self.compression = compression
+        self.objects_dir = self.root / "objects"
+        self.snapshots_dir = self.root / "snapshots"
+        self.stat_cache_path = self.root / "stat_cache.json"
+        self.stat_cache: Dict[str, List] = {}
+
+        if self.stat_cache_path.exists():
+            try:
+                with open(self.stat_cache_path, "r", encoding="utf-8") as f:
+                    self.stat_cache = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                self.stat_cache = {}
+
+    # ==============================
+    # OBJETS
+    # ==============================
+    def _object_path(self, digest: str, compression: Optional[str] = None) -> Path:
+        extension = CODECS[compression or self.compression][0]
+        return self.objects_dir / digest[:2] / f"{digest}.json{extension}"
+
+    def find_object(self, digest: str) -> Optional[Path]:
+        """Chemin de l'objet, quelle que soit la compression utilisée à l'écriture"""
+        for compression in CODECS:
+            path = self._object_path(digest, compression)
+            if path.exists():
+                return path
+        return None
+
+    def _hash_with_cache(self, path: Path) -> str:
+        """Hash du fichier, relu seulement si sa taille ou sa date ont changé"""
+        stat = path.stat()
+        key = str(path.resolve())
+        cached = self.stat_cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = file_hash(path)
+        self.stat_cache[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def _store_object(self, path: Path, digest: str) -> int:
+        """Stocke le fichier s'il est absent ; renvoie le nombre d'octets écrits"""
+        if self.find_object(digest) is not None:
+            return 0
+        target = self._object_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        with open(path, "rb") as src, CODECS[self.compression][1](tmp_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                dst.write(chunk)
+        os.replace(tmp_path, target)
+        return target.stat().st_size
+
+    # ==============================
+    # INSTANTANÉS
+    # ==============================
+    def snapshot(self, stage: str, source_dir, names: Optional[Iterable[str]] = None) -> Dict:
+        """Enregistre l'état des fichiers de patches de source_dir (ou des seuls `names`)"""
+        source_dir = Path(source_dir)
+        files = {}
+        new_objects = 0
+        bytes_written = 0
+
+        if names is None:
+            paths = [p for p in source_dir.iterdir() if p.is_file() and codec.format_of(p) is not None]
+        else:
+            paths = [source_dir / name for name in names if (source_dir / name).exists()]
+
+        for path in sorted(paths):
+            digest = self._hash_with_cache(path)
+            written = self._store_object(path, digest)
+            if written:
+                new_objects += 1
+                bytes_written += written
+            files[path.name] = {"hash": digest, "size": path.stat().st_size}
+
+        snapshot_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        manifest = {
+            "id": snapshot_id,
+            "stage": stage,
+            "created": datetime.now().isoformat(),
+            "source_dir": str(source_dir),
+            "files": files,
+        }
+
+        stage_dir = self.snapshots_dir / stage
+        stage_dir.mkdir(parents=True, exist_ok=True)
+        with open(stage_dir / f"{snapshot_id}.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        self._prune(stage)
+        self._save_stat_cache()
+
+        print(f"Sauvegarde '{stage}' : {len(files)} fichier(s), "
+              f"{new_objects} nouvel(s) objet(s), {bytes_written / 1024:.0f} Ko écrits")
+        return manifest
+
+    def _prune(self, stage: str):
+        for old in self.list_snapshots(stage)[:-KEEP_SNAPSHOTS]:
+            (self.snapshots_dir / stage / f"{old}.json").unlink()
+
+    def _save_stat_cache(self):
+        tmp_path = self.stat_cache_path.with_name(f"{self.stat_cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.stat_cache, f)
+        os.replace(tmp_path, self.stat_cache_path)
+
+    def stages(self) -> List[str]:
+        if not self.snapshots_dir.exists():
+            return []
+        return sorted(p.name for p in self.snapshots_dir.iterdir() if p.is_dir())
+
+    def list_snapshots(self, stage: str) -> List[str]:
+        """Identifiants des instantanés d'une étape, du plus ancien au plus récent"""
+        stage_dir = self.snapshots_dir / stage
+        if not stage_dir.exists():
+            return []
+        return sorted(p.stem for p in stage_dir.glob("*.json"))
+
+    def load_snapshot(self, stage: str, snapshot_id: Optional[str] = None) -> Dict:
+        snapshots = self.list_snapshots(stage)
+        if not snapshots:
+            raise FileNotFoundError(f"Aucune sauvegarde pour l'étape '{stage}'")
+        snapshot_id = snapshot_id or snapshots[-1]
+        with open(self.snapshots_dir / stage / f"{snapshot_id}.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def restore(self, stage: str, target_dir=None, snapshot_id: Optional[str] = None) -> Path:
+        """Reconstruit les fichiers d'un instantané (par défaut le plus récent)"""
+        manifest = self.load_snapshot(stage, snapshot_id)
+        target_dir = Path(target_dir or manifest["source_dir"])
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        for name, entry in manifest["files"].items():
+            object_path = self.find_object(entry["hash"])
+            if object_path is None:
+                raise FileNotFoundError(f"Objet manquant pour {name} : {entry['hash']}")
+            opener = gzip.open if object_path.suffix == ".gz" else lzma.open
+            tmp_path = target_dir / f"{name}.{os.getpid()}.tmp"
+            with opener(object_path, "rb") as src, open(tmp_path, "wb") as dst:
+                for chunk in iter(lambda: src.read(1 << 20), b""):
+                    dst.write(chunk)
+            os.replace(tmp_path, target_dir / name)
+
+        print(f"✅ Instantané '{stage}' {manifest['id']} restauré dans: {target_dir} ({len(manifest['files'])} fichier(s))")
+        return target_dir
+
+    def gc(self) -> int:
+        """Supprime les objets qui ne sont plus référencés par aucun instantané"""
+        referenced = set()
+        for stage in self.stages():
+            for snapshot_id in self.list_snapshots(stage):
+                referenced.update(e["hash"] for e in self.load_snapshot(stage, snapshot_id)["files"].values())
+
+        removed = 0
+        if self.objects_dir.exists():
+            for path in self.objects_dir.glob("*/*.json.*"):
+                if path.name.split(".")[0] not in referenced:
+                    path.unlink()
+                    removed += 1
+        print(f"🧹 {removed} objet(s) non référencé(s) supprimé(s)")
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sauvegardes du dossier output adressées par contenu")
+    parser.add_argument("--root", default=BACKUP_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="liste les instantanés")
+    list_parser.add_argument("stage", nargs="?")
+
+    restore_parser = subparsers.add_parser("restore", help="reconstruit l'instantané d'une étape")
+    restore_parser.add_argument("stage")
+    restore_parser.add_argument("--snapshot", help="identifiant (défaut : le plus récent)")
+    restore_parser.add_argument("--target", help="dossier cible (défaut : le dossier sauvegardé)")
+
+    subparsers.add_parser("gc", help="supprime les objets non référencés")
+
+    args = parser.parse_args()
+    store = BackupStore(args.root)
+
+    if args.command == "list":
+        for stage in ([args.stage] if args.stage else store.stages()):
+            print(f"📦 {stage}")
+            for snapshot_id in store.list_snapshots(stage):
+                manifest = store.load_snapshot(stage, snapshot_id)
+                print(f"   {snapshot_id}  {len(manifest['files'])} fichier(s)  {manifest['created']}")
+    elif args.command == "restore":
+        store.restore(args.stage, args.target, args.snapshot)
+    else:
+        store.gc()
+
+
+if __name__ == "__main__":
+    main()
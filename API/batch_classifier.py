@@ -0,0 +1,83 @@
+"""
+Classification vectorisée (NumPy) de toutes les lignes de changement.
+
+Pour les reclassifications de tout le corpus après un ajustement de
+mots-clés (enhance_keywords.py, deep_analysis.py, test_final*.py) :
+
+    1. les lignes sont tokenisées une seule fois en une matrice creuse
+       document × token (présence, format COO) ;
+    2. CATEGORIES devient une matrice token × catégorie (nombre
+       d'occurrences du mot-clé dans chaque liste) ;
+    3. les scores sont un seul produit matriciel, suivi d'un argmax.
+
+np.argmax renvoie le premier maximum : l'ordre des colonnes étant celui
+de CATEGORIES, le départage est identique à max(scores, key=scores.get).
+Le résultat est donc le même que etape2.classify_change.
+
+Utilisation :
+    matrix = TokenMatrix(descriptions)          # une fois
+    labels = matrix.classify(CATEGORIES)        # après chaque ajustement
+"""
+
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from etape2 import TOKEN_RE
+
+
+class TokenMatrix:
+    def __init__(self, texts: List[str]):
+        self.texts = [text.lower() for text in texts]
+        self.vocabulary: Dict[str, int] = {}
+
+        rows, cols = [], []
+        for i, text in enumerate(self.texts):
+            for token in set(TOKEN_RE.findall(text)):
+                cols.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+                rows.append(i)
+
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+        self.shape = (len(self.texts), len(self.vocabulary))
+
+    def category_matrix(self, categories: Dict[str, List[str]]):
+        """Matrice token × catégorie et liste des expressions multi-mots par catégorie"""
+        weights = np.zeros((self.shape[1], len(categories)), dtype=np.int32)
+        phrases = []
+        for j, keywords in enumerate(categories.values()):
+            for kw in keywords:
+                if TOKEN_RE.fullmatch(kw):
+                    col = self.vocabulary.get(kw)
+                    if col is not None:
+                        weights[col, j] += 1
+                else:
+                    phrases.append((j, re.compile(rf"\b{re.escape(kw)}\b")))
+        return weights, phrases
+
+    def scores(self, categories: Dict[str, List[str]]) -> np.ndarray:
+        """Scores document × catégorie = présence (creuse) · poids des mots-clés"""
+        weights, phrases = self.category_matrix(categories)
+        scores = np.zeros((self.shape[0], len(categories)), dtype=np.int32)
+
+        # Produit creux × dense : seules les lignes de poids non nulles sont additionnées
+        contributing = weights[self.cols].any(axis=1)
+        np.add.at(scores, self.rows[contributing], weights[self.cols[contributing]])
+
+        for j, pattern in phrases:
+            for i, text in enumerate(self.texts):
+                if pattern.search(text):
+                    scores[i, j] += 1
+        return scores
+
+    def classify(self, categories: Dict[str, List[str]]) -> List[str]:
+        names = np.asarray(list(categories) + ["other"], dtype=object)
+        scores = self.scores(categories)
+        best = scores.argmax(axis=1)
+        best[scores.max(axis=1, initial=0) == 0] = len(categories)
+        return names[best].tolist()
+
+
+def classify_texts(texts: List[str], categories: Dict[str, List[str]]) -> List[str]:
+    return TokenMatrix(texts).classify(categories)
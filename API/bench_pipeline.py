@@ -0,0 +1,200 @@
+"""
+Banc de mesure du pipeline sur des corpus synthétiques (1×, 10×, 100×).
+
+Pour chaque échelle, synthetic_corpus.py génère les sources dans
+bench_runs/x<N>/sources, puis chaque étape tourne dans son propre
+processus, dans ce dossier :
+
+    clean → etape2 → acid → alert → innovation → remove-changes → sync
+
+La synchronisation écrit par défaut dans le stockage embarqué SQLite
+(storage.py), fichier bench_runs/x<N>/storage.sqlite3 : c'est la
+référence à laquelle comparer le chemin MongoDB (--storage mongo, qui
+écrit dans la base configurée). Les enrichisseurs tournent sans
+manifeste ni cache de classification : tout est recalculé.
+
+Pour chaque étape : durée, CPU, pic de mémoire RSS (os.wait4), lignes de
+changement par seconde, documents et octets lus/écrits. Le rapport est
+écrit en JSON (--report) et ajouté à pipeline_benchmark_history.jsonl
+pour suivre l'évolution dans le temps.
+
+Usage :
+    python bench_pipeline.py --scales 1 10 100
+    python bench_pipeline.py --scales 1 --storage mongo
+    python bench_pipeline.py stage <étape>      # interne : une étape dans le dossier courant
+"""
+
+import argparse
+import json
+import os
+import platform
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import codec
+import stage_metrics
+import storage
+from synthetic_corpus import CorpusModel, generate
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = "bench_runs"
+REPORT_FILE = "pipeline_benchmark.json"
+HISTORY_FILE = "pipeline_benchmark_history.jsonl"
+
+STAGES = ["clean", "etape2", "acid", "alert", "innovation", "remove-changes", "sync"]
+STORAGE_FILE = "storage.sqlite3"
+
+
+# ==============================
+# ÉTAPES (CÔTÉ ENFANT)
+# ==============================
+def run_stage(name: str):
+    if name == "clean":
+        runpy.run_path(os.path.join(API_DIR, "clean.py"), run_name="__main__")
+    elif name == "etape2":
+        import etape2
+        etape2.process_files(incremental=False)
+    elif name == "acid":
+        from ACID import AcidConsistencyAdderSimple
+        AcidConsistencyAdderSimple(incremental=False).process_all_files()
+    elif name == "alert":
+        from alert import AlertsAdder
+        AlertsAdder(incremental=False).process_all_files()
+    elif name == "innovation":
+        from innovation import InnovationSummaryGenerator
+        InnovationSummaryGenerator(incremental=False).process_all_files()
+    elif name == "remove-changes":
+        sys.argv = ["remove-changes.py"]
+        runpy.run_path(os.path.join(API_DIR, "remove-changes.py"), run_name="__main__")
+    elif name == "sync":
+        import sync
+        sync.sync_new_patches(close_client=False)
+        print(f"📦 {storage.get_repository().count()} document(s) ({storage.backend_name()})")
+        storage.close_repository()
+    else:
+        raise ValueError(f"Étape inconnue : {name}")
+
+
+# ==============================
+# MESURE (CÔTÉ PARENT)
+# ==============================
+def count_lines(sources_dir: Path) -> int:
+    """Nombre de lignes de changement du corpus (entrées des listes 'changes')"""
+    lines = 0
+    for path in codec.dataset_files(sources_dir):
+        if codec.is_array(path):
+            lines += sum(len(doc.get("changes") or []) for doc in codec.iter_array(path) if isinstance(doc, dict))
+    return lines
+
+
+def measure_stage(name: str, run_dir: Path, lines: int, backend: str = "sqlite") -> Dict:
+    fd, report_path = tempfile.mkstemp(prefix="stage_metrics_", suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, **{
+        stage_metrics.METRICS_ENV: report_path,
+        storage.BACKEND_ENV: backend,
+        storage.PATH_ENV: str((run_dir / STORAGE_FILE).resolve()),
+    })
+
+    with open(run_dir / f"{name}.log", "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        returncode, usage = stage_metrics.run_child(
+            [sys.executable, os.path.abspath(__file__), "stage", name], env=env, cwd=run_dir, stdout=log)
+        wall = time.perf_counter() - start
+    counters = stage_metrics.read_report(report_path).get("counters", {})
+    os.remove(report_path)
+
+    record = {
+        "stage": name,
+        "status": "ok" if returncode == 0 else f"exit {returncode}",
+        "wall_s": round(wall, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3) if usage is not None else None,
+        "max_rss_kb": usage.ru_maxrss if usage is not None else None,
+        "lines_per_s": round(lines / wall, 1) if wall > 0 else None,
+    }
+    record.update(counters)
+    return record
+
+
+def bench_scale(scale: int, work_dir: Path, model: CorpusModel, seed: int, backend: str = "sqlite") -> Dict:
+    run_dir = work_dir / f"x{scale}"
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+    (run_dir / "output").mkdir(parents=True)
+
+    print(f"\n🧪 Échelle x{scale} : génération du corpus...")
+    start = time.perf_counter()
+    counts = generate(scale, run_dir / "sources", seed=seed, model=model)
+    generation_s = time.perf_counter() - start
+
+    lines = count_lines(run_dir / "sources")
+    result = {
+        "scale": scale,
+        "patches": sum(counts.values()),
+        "lines": lines,
+        "source_bytes": sum(p.stat().st_size for p in (run_dir / "sources").iterdir()),
+        "generation_s": round(generation_s, 3),
+        "stages": [],
+    }
+
+    for name in STAGES:
+        record = measure_stage(name, run_dir, lines, backend)
+        result["stages"].append(record)
+        rss = (record["max_rss_kb"] or 0) / 1024
+        print(f"  {name:<16} {record['wall_s']:>9.2f}s {record['lines_per_s'] or 0:>12.0f} lignes/s "
+              f"{rss:>9.1f} Mo  {'✅' if record['status'] == 'ok' else '❌ ' + record['status']}")
+        if record["status"] != "ok":
+            print(f"  ⚠️  Voir {run_dir / (name + '.log')} ; étapes suivantes ignorées")
+            break
+    return result
+
+
+def run_benchmark(scales: List[int], work_dir: str = WORK_DIR, report_file: str = REPORT_FILE,
+                  seed: int = 42, keep: bool = False, backend: str = "sqlite") -> Dict:
+    work_dir = Path(work_dir)
+    model = CorpusModel()
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "format": codec.FORMAT,
+        "seed": seed,
+        "storage": backend,
+        "scales": [],
+    }
+
+    for scale in scales:
+        report["scales"].append(bench_scale(scale, work_dir, model, seed, backend))
+        if not keep:
+            shutil.rmtree(work_dir / f"x{scale}")
+
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    stage_metrics.append_record(report, HISTORY_FILE)
+    print(f"\n💾 Rapport sauvegardé dans: {report_file} (historique : {HISTORY_FILE})")
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "stage":
+        run_stage(sys.argv[2])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Mesure du pipeline sur des corpus synthétiques")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="conserve les dossiers bench_runs/x<N>")
+    parser.add_argument("--storage", choices=["sqlite", "memory", "mongo"], default="sqlite",
+                        help="backend de l'étape sync (mongo : écrit dans la base configurée)")
+    args = parser.parse_args()
+
+    run_benchmark(args.scales, args.work_dir, args.report, args.seed, args.keep, args.storage)
@@ -0,0 +1,108 @@
+"""
+Manifeste de détection des changements du scheduler.
+
+Pour chaque tâche du graphe (enrich:<base>, join, report), le manifeste
+retient le hash SHA-256 de ses entrées (fichier de sources/, fichiers de
+output/, code des scripts) et de ses sorties lors de sa dernière
+exécution réussie. Si un scraper réécrit un fichier identique, l'étape
+suivante voit les mêmes entrées et des sorties intactes : elle n'est pas
+relancée, ses sorties sont seulement touchées (date de modification).
+
+Comme pour backup_store.py, un fichier dont la taille et la date de
+modification n'ont pas changé n'est pas relu.
+
+    change_manifest.json
+        {"tasks": {tâche: {"key": …, "inputs": {chemin: hash}, "outputs": {…}}},
+         "stat_cache": {chemin: [taille, mtime_ns, hash]}}
+
+`python scheduler.py --force` ignore le manifeste et relance tout.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from backup_store import file_hash
+
+MANIFEST_FILE = "change_manifest.json"
+
+
+class ChangeManifest:
+    def __init__(self, path: str = MANIFEST_FILE, base_dir: str = "."):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, path)
+        self.tasks: Dict[str, Dict] = {}
+        self.stat_cache: Dict[str, List] = {}
+        # Les tâches du graphe tournent dans des threads du scheduler
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.tasks = data.get("tasks", {})
+                self.stat_cache = data.get("stat_cache", {})
+            except (json.JSONDecodeError, OSError):
+                print(f"⚠️  Manifeste {self.path} illisible : toutes les étapes seront relancées")
+
+    # ==============================
+    # HASHES
+    # ==============================
+    def file_hash(self, path: str) -> Optional[str]:
+        """Hash du fichier (None s'il n'existe pas), relu seulement si sa taille ou sa date ont changé"""
+        full_path = os.path.join(self.base_dir, path)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            cached = self.stat_cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = file_hash(full_path)
+        with self.lock:
+            self.stat_cache[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def fingerprint(self, paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        return {path: self.file_hash(path) for path in sorted(set(paths))}
+
+    # ==============================
+    # TÂCHES
+    # ==============================
+    def is_current(self, task: str, inputs: Dict[str, Optional[str]], outputs: Iterable[str], key: str = "") -> bool:
+        """Vrai si les entrées sont celles de la dernière exécution réussie et les sorties intactes"""
+        with self.lock:
+            entry = self.tasks.get(task)
+        if not entry or entry.get("key") != key or entry.get("inputs") != inputs:
+            return False
+        current = self.fingerprint(outputs)
+        return None not in current.values() and current == entry.get("outputs")
+
+    def record(self, task: str, inputs: Dict[str, Optional[str]], outputs: Iterable[str], key: str = ""):
+        """Enregistre une exécution réussie (entrées lues avant, sorties hashées après)"""
+        entry = {"key": key, "inputs": inputs, "outputs": self.fingerprint(outputs)}
+        with self.lock:
+            self.tasks[task] = entry
+        self.save()
+
+    def touch(self, outputs: Iterable[str]):
+        """Met à jour la date des sorties d'une tâche sautée, sans les relire"""
+        for path in outputs:
+            full_path = os.path.join(self.base_dir, path)
+            os.utime(full_path)
+            stat = os.stat(full_path)
+            with self.lock:
+                cached = self.stat_cache.get(path)
+                if cached:
+                    self.stat_cache[path] = [stat.st_size, stat.st_mtime_ns, cached[2]]
+        self.save()
+
+    def save(self):
+        with self.lock:
+            data = {"tasks": self.tasks, "stat_cache": self.stat_cache}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
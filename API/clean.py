@@ -1,17 +1,17 @@
-import json
 from datetime import datetime
 
+import codec
+
 # Fichier d'entrée (normalisé)
 input_file = "sources/mongodb-versions.json"
 
 # Fichier de sortie (nettoyé)
 output_file = "sources/mongodb-versions.json"
 
-cleaned_data = []
 
-with open(input_file, "r", encoding="utf-8") as f:
-    data = json.load(f)
-    for doc in data:
+def clean_documents(docs):
+    """Nettoie les documents un par un (utilisé aussi par pipeline.py)"""
+    for doc in docs:
         # Supprime si changes est vide ou absent
         if not doc.get("changes"):
             continue
@@ -27,10 +27,12 @@ with open(input_file, "r", encoding="utf-8") as f:
                 # Si la date n'est pas dans le format attendu, on laisse telle quelle
                 pass
 
-        cleaned_data.append(doc)
+        yield doc
+
 
-# Sauvegarde le JSON nettoyé
-with open(output_file, "w", encoding="utf-8") as f:
-    json.dump(cleaned_data, f, indent=2, ensure_ascii=False)
+if __name__ == "__main__":
+    # Lecture et écriture en flux : un document à la fois en mémoire
+    with codec.open_writer(output_file) as writer:
+        writer.write_all(clean_documents(codec.iter_array(input_file)))
 
-print(f"[✅] {len(cleaned_data)} documents nettoyés et sauvegardés dans {output_file}")
+    print(f"[✅] {writer.count} documents nettoyés et sauvegardés dans {output_file}")
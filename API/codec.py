@@ -0,0 +1,400 @@
+"""
+Format des fichiers intermédiaires du pipeline (sources/ → output/ → MongoDB).
+
+Toutes les étapes lisent et écrivent leurs fichiers de patches via ce
+module. Formats disponibles :
+
+    json           tableau JSON indenté (défaut, lisible à l'œil)
+    marshal        enregistrements marshal préfixés par leur longueur
+    marshal-zlib   idem, flux compressé zlib (conteneur gzip)
+    marshal-lzma   idem, flux compressé lzma (conteneur xz)
+
+Le format d'écriture se choisit avec la variable d'environnement
+PIPELINE_FORMAT ou l'option --format de etape2.py / pipeline.py. À la
+lecture, le format est déduit de l'extension : les étapes qui réécrivent
+un fichier en place (ACID, alertes, innovations, remove-changes)
+conservent son format.
+
+Fichier binaire : MAGIC, un octet de type (A = tableau, O = objet), puis
+pour chaque élément sa longueur (4 octets, little endian) et son
+encodage marshal. marshal n'est sûr que pour des fichiers produits par
+le pipeline lui-même.
+
+Usage :
+    python codec.py bench [--dir output] [--report codec_benchmark.json]
+    python codec.py convert <format> [--dir output]
+"""
+
+import argparse
+import gzip
+import json
+import lzma
+import marshal
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import stage_metrics
+from json_stream import JsonArrayWriter, is_json_array, iter_json_array
+
+FORMATS = {
+    "json": ".json",
+    "marshal": ".mrec",
+    "marshal-zlib": ".mrec.gz",
+    "marshal-lzma": ".mrec.xz",
+}
+
+FORMAT = os.environ.get("PIPELINE_FORMAT", "json")
+
+MAGIC = b"NSQLREC1"
+ARRAY = b"A"
+OBJECT = b"O"
+MARSHAL_VERSION = 4
+
+_LENGTH = struct.Struct("<I")
+
+
+def set_format(fmt: str):
+    """Choisit le format d'écriture des étapes (option --format)"""
+    global FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu : {fmt} (choix : {', '.join(FORMATS)})")
+    FORMAT = fmt
+
+
+# ==============================
+# NOMS DE FICHIERS
+# ==============================
+def format_of(path) -> Optional[str]:
+    name = Path(path).name
+    # Extensions les plus longues d'abord (.mrec.gz avant .mrec)
+    for fmt, extension in sorted(FORMATS.items(), key=lambda item: -len(item[1])):
+        if name.endswith(extension):
+            return fmt
+    return None
+
+
+def dataset_name(path) -> str:
+    """Nom du fichier sans l'extension de format (mongodb-versions)"""
+    name = Path(path).name
+    return name[:-len(FORMATS[format_of(name)])]
+
+
+def dataset_path(directory, name: str, fmt: Optional[str] = None) -> Path:
+    return Path(directory) / (name + FORMATS[fmt or FORMAT])
+
+
+def dataset_files(directory) -> List[Path]:
+    """Fichiers de patches du dossier, un par jeu de données (le plus récent si plusieurs formats)"""
+    latest: Dict[str, Path] = {}
+    for path in Path(directory).iterdir():
+        if not path.is_file() or format_of(path) is None:
+            continue
+        name = dataset_name(path)
+        if name not in latest or path.stat().st_mtime_ns > latest[name].stat().st_mtime_ns:
+            latest[name] = path
+    return list(latest.values())
+
+
+def find_dataset(directory, name: str) -> Optional[Path]:
+    candidates = [dataset_path(directory, name, fmt) for fmt in FORMATS]
+    existing = [path for path in candidates if path.exists()]
+    if not existing:
+        return None
+    return max(existing, key=lambda path: path.stat().st_mtime_ns)
+
+
+def _remove_other_formats(path: Path):
+    """Un jeu de données n'existe que dans un format à la fois"""
+    name = dataset_name(path)
+    for fmt in FORMATS:
+        other = dataset_path(path.parent, name, fmt)
+        if other != path and other.exists():
+            other.unlink()
+
+
+# ==============================
+# LECTURE
+# ==============================
+def _open_binary(path, mode: str):
+    fmt = format_of(path)
+    if fmt == "marshal-zlib":
+        return gzip.open(path, mode)
+    if fmt == "marshal-lzma":
+        return lzma.open(path, mode)
+    return open(path, mode)
+
+
+def _read_header(f, path) -> bytes:
+    header = f.read(len(MAGIC) + 1)
+    if header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} : en-tête d'enregistrements invalide")
+    return header[len(MAGIC):]
+
+
+def _iter_records(f, path) -> Iterator[Any]:
+    while True:
+        prefix = f.read(_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) < _LENGTH.size:
+            raise ValueError(f"{path} : enregistrement tronqué")
+        (length,) = _LENGTH.unpack(prefix)
+        payload = f.read(length)
+        if len(payload) < length:
+            raise ValueError(f"{path} : enregistrement tronqué")
+        yield marshal.loads(payload)
+
+
+def _counted(path, items: Iterator[Any]) -> Iterator[Any]:
+    """Compte documents et octets lus (voir stage_metrics.py)"""
+    stage_metrics.count(bytes_read=os.path.getsize(path))
+    for item in items:
+        stage_metrics.count(docs_in=1)
+        yield item
+
+
+def is_array(path) -> bool:
+    """Vrai si le fichier contient une liste de patches (et non un objet unique)"""
+    if format_of(path) == "json":
+        return is_json_array(path)
+    with _open_binary(path, "rb") as f:
+        return _read_header(f, path) == ARRAY
+
+
+def _iter_array(path) -> Iterator[Any]:
+    if format_of(path) == "json":
+        yield from iter_json_array(path)
+        return
+    with _open_binary(path, "rb") as f:
+        if _read_header(f, path) != ARRAY:
+            raise ValueError(f"{path} : une liste est attendue")
+        yield from _iter_records(f, path)
+
+
+def iter_array(path) -> Iterator[Any]:
+    """Éléments d'une liste de patches, un par un, quel que soit le format"""
+    return _counted(path, _iter_array(path))
+
+
+def _iter_items(path) -> Iterator[Any]:
+    if format_of(path) == "json":
+        if is_json_array(path):
+            yield from iter_json_array(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                yield json.load(f)
+        return
+    with _open_binary(path, "rb") as f:
+        _read_header(f, path)
+        yield from _iter_records(f, path)
+
+
+def iter_items(path) -> Iterator[Any]:
+    """Éléments d'une liste, ou la valeur unique si le fichier contient un objet"""
+    return _counted(path, _iter_items(path))
+
+
+def load(path) -> Any:
+    """Contenu complet du fichier : liste de patches ou objet"""
+    if is_array(path):
+        return list(iter_array(path))
+    return next(iter_items(path))
+
+
+# ==============================
+# ÉCRITURE
+# ==============================
+class RecordWriter:
+    """Écrit une liste d'enregistrements marshal (même interface que JsonArrayWriter)"""
+
+    def __init__(self, path, kind: bytes = ARRAY):
+        self.path = str(path)
+        self.tmp_path = self.path + ".tmp"
+        self.count = 0
+        self.bytes_written = 0
+        self._raw = open(self.tmp_path, "wb")
+        fmt = format_of(path)
+        if fmt == "marshal-zlib":
+            self._file = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6, mtime=0)
+        elif fmt == "marshal-lzma":
+            self._file = lzma.LZMAFile(self._raw, mode="wb")
+        else:
+            self._file = self._raw
+        self._file.write(MAGIC + kind)
+
+    def write(self, item: Any):
+        payload = marshal.dumps(item, MARSHAL_VERSION)
+        self._file.write(_LENGTH.pack(len(payload)))
+        self._file.write(payload)
+        self.count += 1
+
+    def write_all(self, items: Iterable[Any]):
+        for item in items:
+            self.write(item)
+
+    def _close_files(self):
+        if self._file is not self._raw:
+            self._file.close()
+        self._raw.close()
+
+    def close(self):
+        self._close_files()
+        self.bytes_written = os.path.getsize(self.tmp_path)
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._close_files()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class _DatasetWriter:
+    """Enveloppe d'un writer : supprime à la fermeture les copies du jeu dans d'autres formats"""
+
+    def __init__(self, writer, path: Path):
+        self._writer = writer
+        self.path = path
+
+    def __getattr__(self, name):
+        return getattr(self._writer, name)
+
+    def close(self):
+        self._writer.close()
+        _remove_other_formats(self.path)
+        stage_metrics.count(docs_out=self._writer.count, bytes_written=self.path.stat().st_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._writer.abort()
+        return False
+
+
+def open_writer(path, kind: bytes = ARRAY):
+    """Writer en flux pour le format indiqué par l'extension de path"""
+    path = Path(path)
+    if format_of(path) == "json":
+        if kind != ARRAY:
+            raise ValueError("Un objet JSON unique s'écrit avec dump()")
+        return _DatasetWriter(JsonArrayWriter(path), path)
+    return _DatasetWriter(RecordWriter(path, kind), path)
+
+
+def dump(data: Any, path) -> int:
+    """Écrit une liste de patches ou un objet ; renvoie la taille du fichier"""
+    path = Path(path)
+    if isinstance(data, list):
+        with open_writer(path) as writer:
+            writer.write_all(data)
+    elif format_of(path) == "json":
+        tmp_path = str(path) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        _remove_other_formats(path)
+        stage_metrics.count(docs_out=1, bytes_written=path.stat().st_size)
+    else:
+        with open_writer(path, OBJECT) as writer:
+            writer.write(data)
+    return path.stat().st_size
+
+
+# ==============================
+# BENCHMARK ET CONVERSION
+# ==============================
+def benchmark(directory: str = "output", repeat: int = 3) -> Dict:
+    """Temps d'écriture/lecture et taille de chaque fichier dans chaque format"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for path in sorted(dataset_files(directory)):
+            data = load(path)
+            name = dataset_name(path)
+            results[name] = {}
+            for fmt in FORMATS:
+                target = dataset_path(tmp_dir, name, fmt)
+                write_times, read_times = [], []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    size = dump(data, target)
+                    write_times.append(time.perf_counter() - start)
+
+                    start = time.perf_counter()
+                    load(target)
+                    read_times.append(time.perf_counter() - start)
+                results[name][fmt] = {
+                    "size_kb": round(size / 1024, 1),
+                    "serialize_ms": round(min(write_times) * 1000, 2),
+                    "parse_ms": round(min(read_times) * 1000, 2),
+                }
+
+    totals = {
+        fmt: {
+            key: round(sum(r[fmt][key] for r in results.values()), 2)
+            for key in ("size_kb", "serialize_ms", "parse_ms")
+        }
+        for fmt in FORMATS
+    }
+    return {"directory": directory, "repeat": repeat, "files": results, "totals": totals}
+
+
+def print_benchmark(report: Dict):
+    print(f"📊 FORMATS INTERMÉDIAIRES ({report['directory']}, meilleur de {report['repeat']})")
+    print("=" * 78)
+    print(f"{'fichier':<28}{'format':<15}{'taille (Ko)':>12}{'écriture (ms)':>12}{'lecture (ms)':>12}")
+    for name, formats in list(report["files"].items()) + [("TOTAL", report["totals"])]:
+        for fmt, values in formats.items():
+            print(f"{name:<28}{fmt:<15}{values['size_kb']:>12}{values['serialize_ms']:>12}{values['parse_ms']:>12}")
+        print("-" * 78)
+
+
+def convert(fmt: str, directory: str = "output"):
+    """Réécrit tous les jeux de données du dossier dans le format donné"""
+    for path in dataset_files(directory):
+        if format_of(path) == fmt:
+            continue
+        target = dataset_path(directory, dataset_name(path), fmt)
+        dump(load(path), target)
+        print(f"✅ {path.name} → {target.name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Formats des fichiers intermédiaires du pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = subparsers.add_parser("bench", help="compare les formats sur les fichiers d'un dossier")
+    bench_parser.add_argument("--dir", default="output")
+    bench_parser.add_argument("--repeat", type=int, default=3)
+    bench_parser.add_argument("--report", help="écrit aussi le résultat dans ce fichier JSON")
+
+    convert_parser = subparsers.add_parser("convert", help="convertit les fichiers d'un dossier")
+    convert_parser.add_argument("format", choices=list(FORMATS))
+    convert_parser.add_argument("--dir", default="output")
+
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        report = benchmark(args.dir, args.repeat)
+        print_benchmark(report)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"💾 Rapport sauvegardé dans: {args.report}")
+    else:
+        convert(args.format, args.dir)
@@ -1,3 +1,5 @@
+import os
+
 # ==================== CONFIGURATION MONGODB ====================
 
 # URI de connexion MongoDB Atlas
@@ -10,6 +12,7 @@ DATABASE_NAME = "VT"
 # Noms des collections
 COLLECTION_TABLES = "tables"
 COLLECTION_VERSIONS = "versions"
+COLLECTION_VERSION_STATS = "version_stats"
 
 # ==================== CONFIGURATION API ====================
 
@@ -42,6 +45,12 @@ API_ENDPOINTS = {
         "method": "GET",
         "description": "Récupère toutes les versions d'une technologie spécifique",
         "response_example": [{"database": "MongoDB", "major_version": "7.0", "...": "..."}]
+    },
+    "stats": {
+        "path": "/api/technologies/<tech>/stats/",
+        "method": "GET",
+        "description": "Totaux d'une technologie (ou d'une version majeure avec ?major=7.0)",
+        "response_example": {"database": "MongoDB", "major_version": "*", "patches_count": 36, "...": "..."}
     }
 }
 
@@ -101,20 +110,59 @@ ERROR_MESSAGES = {
 
 # ==================== CONFIGURATION SSL MONGODB ====================
 
-# Activer les options SSL personnalisées
-# Mettre à True si vous avez des erreurs SSL avec MongoDB Atlas
-USE_CUSTOM_SSL = True
+# Activer les options SSL personnalisées (certificat et nom d'hôte NON vérifiés)
+# Désactivé par défaut : le client vérifie le TLS d'Atlas. Pour diagnostiquer
+# une erreur SSL seulement : VT_MONGO_INSECURE_TLS=1 python sync.py
+USE_CUSTOM_SSL = os.environ.get("VT_MONGO_INSECURE_TLS") == "1"
 
 # Options SSL pour MongoDB (utile pour résoudre les problèmes de connexion)
 MONGO_SSL_OPTIONS = {
     "tls": True,
     "tlsAllowInvalidCertificates": True,
     "tlsAllowInvalidHostnames": True,
+}
+
+# ==================== CLIENT MONGODB (mongo.py) ====================
+
+# Options du client partagé (un pool de connexions par processus)
+# Compression zlib : les documents enrichis (texte répétitif) se compressent bien
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": 20,
+    "minPoolSize": 0,
+    "maxIdleTimeMS": 60000,
+    "compressors": "zlib",
+    "zlibCompressionLevel": 6,
     "serverSelectionTimeoutMS": 15000,
     "connectTimeoutMS": 20000,
     "socketTimeoutMS": 20000
 }
 
+# ==================== SYNCHRONISATION (sync.py) ====================
+
+# Nombre d'upserts envoyés par bulk_write
+SYNC_BATCH_SIZE = 500
+
+# Write concern des écritures de synchronisation
+# Ex. : {"w": "majority", "j": True} pour attendre la réplication et le journal
+SYNC_WRITE_CONCERN = {"w": 1}
+
+# Valeur de major_version des totaux d'une base entière dans version_stats
+STATS_ALL_VERSIONS = "*"
+
+# ==================== STOCKAGE (storage.py) ====================
+
+# Backend des patches synchronisés : "mongo", "sqlite" (fichier local) ou "memory"
+# La variable d'environnement VT_STORAGE remplace cette valeur (ex. VT_STORAGE=sqlite)
+STORAGE_BACKEND = "mongo"
+
+# Fichier du backend sqlite (remplacé par VT_STORAGE_PATH)
+STORAGE_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vt_storage.sqlite3")
+
+# Création des index (idempotente) au démarrage du serveur de l'API (runserver,
+# WSGI/ASGI), en tâche de fond ; pas pour migrate, shell, test...
+# Vérification : python storage.py check-indexes
+ENSURE_INDEXES_ON_STARTUP = True
+
 # ==================== PARAMÈTRES DE SÉCURITÉ ====================
 
 # ⚠️ EN PRODUCTION : Utiliser des variables d'environnement !
@@ -162,6 +210,13 @@ API_DOCUMENTATION = f"""
    ├─ Réponse  : [{{"database": "MongoDB", "major_version": "7.0", ...}}]
    └─ Usage    : Récupérer toutes les versions d'une technologie
 
+4️⃣  Statistiques d'une technologie
+   ├─ URL      : {API_BASE_URL}/api/technologies/<tech>/stats/
+   ├─ Méthode  : GET
+   ├─ Paramètre: ?major=<version majeure> (optionnel, totaux de la base par défaut)
+   ├─ Réponse  : {{"database": "MongoDB", "major_version": "*", "patches_count": 36, ...}}
+   └─ Usage    : Totaux innovations, features ACID, alertes et types dominants
+
 ═══════════════════════════════════════════════════════════════
 
 📊 EXEMPLES D'URLS COMPLÈTES:
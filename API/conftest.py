@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules de API/ s'importent entre eux à plat (import codec, from etape2 import ...)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
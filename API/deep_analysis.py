@@ -2,11 +2,11 @@ import json
 import os
 import re
 from collections import Counter, defaultdict
-from etape2 import classify_change, CATEGORIES
+from etape2 import classify_many, CATEGORIES
 
 def extract_remaining_other_deep():
     """Extrait les descriptions encore classées comme 'other' après les améliorations"""
-    remaining_other = []
+    descriptions = []
     
     for filename in os.listdir("output"):
         if not filename.endswith(".json"):
@@ -21,12 +21,11 @@ def extract_remaining_other_deep():
         for item in items:
             if "ai_analysis" in item and "details" in item["ai_analysis"]:
                 for detail in item["ai_analysis"]["details"]:
-                    # Tester avec la classification actuelle
-                    category = classify_change(detail["description"])
-                    if category == "other":
-                        remaining_other.append(detail["description"])
+                    descriptions.append(detail["description"])
     
-    return remaining_other
+    # Tester avec la classification actuelle (vectorisée sur tout le corpus)
+    categories = classify_many(descriptions, engine="numpy")
+    return [desc for desc, category in zip(descriptions, categories) if category == "other"]
 
 def find_patterns_and_context(descriptions):
     """Trouve des motifs et contextes spécifiques dans les descriptions restantes"""
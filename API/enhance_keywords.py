@@ -6,9 +6,9 @@ from etape2 import CATEGORIES
 
 def extract_remaining_other():
     """Extrait les descriptions encore classées comme 'other' avec les nouveaux mots-clés"""
-    from etape2 import classify_change
+    from etape2 import classify_many
     
-    remaining_other = []
+    descriptions = []
     
     for filename in os.listdir("output"):
         if not filename.endswith(".json"):
@@ -23,12 +23,11 @@ def extract_remaining_other():
         for item in items:
             if "ai_analysis" in item and "details" in item["ai_analysis"]:
                 for detail in item["ai_analysis"]["details"]:
-                    # Tester avec la classification actuelle
-                    category = classify_change(detail["description"])
-                    if category == "other":
-                        remaining_other.append(detail["description"])
+                    descriptions.append(detail["description"])
     
-    return remaining_other
+    # Tester avec la classification actuelle (vectorisée sur tout le corpus)
+    categories = classify_many(descriptions, engine="numpy")
+    return [desc for desc, category in zip(descriptions, categories) if category == "other"]
 
 def analyze_remaining_patterns(descriptions):
     """Analyse les motifs dans les descriptions restantes pour trouver des mots-clés manquants"""
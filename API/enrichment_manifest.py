@@ -0,0 +1,136 @@
+"""
+Manifeste d'enrichissement incrémental.
+
+Pour chaque patch (database, patch_version), le manifeste retient par
+étape (etape2, acid, alerts, innovation) le hash de sa liste de
+changements combiné à l'empreinte du dictionnaire de l'étape. Une
+étape ne retraite que les patches nouveaux ou dont les changements (ou
+les mots-clés) ont changé, et réutilise le document enrichi précédent
+pour les autres.
+
+Certaines sources contiennent plusieurs entrées pour la même version :
+tous les hashes vus lors de la dernière exécution de l'étape sont
+conservés.
+
+Le scheduler enrichit plusieurs bases en parallèle (une par processus) :
+la sauvegarde relit le fichier sous verrou et ne remplace que les
+entrées des bases traitées par le processus.
+
+Après remove-changes.py, la clé 'changes' n'existe plus dans output/ :
+le hash est alors calculé sur les descriptions de ai_analysis.details,
+qui reprennent exactement la liste des changements.
+"""
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou, un seul processus à la fois
+    fcntl = None
+
+MANIFEST_FILE = "enrichment_manifest.json"
+
+
+def patch_key(doc: Dict) -> Optional[str]:
+    database = doc.get('database')
+    version = doc.get('patch_version', doc.get('major_version'))
+    if not database or not version:
+        return None
+    return f"{database}|{version}"
+
+
+def changes_hash(doc: Dict, stage_fingerprint: str = "") -> str:
+    if 'changes' in doc:
+        changes = doc['changes']
+    else:
+        changes = [d.get('description') for d in doc.get('ai_analysis', {}).get('details', [])]
+    payload = json.dumps([stage_fingerprint, changes], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+@contextmanager
+def _locked(path: str):
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _database(key: str) -> str:
+    return key.split('|', 1)[0]
+
+
+class EnrichmentManifest:
+    def __init__(self, path: str = MANIFEST_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict[str, List[str]]] = self._read()
+        self.seen = defaultdict(set)
+        self.reused = 0
+        self.processed = 0
+
+    def _read(self) -> Dict[str, Dict[str, List[str]]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            print(f"⚠️  Manifeste {self.path} illisible : retraitement complet")
+            return {}
+
+    def is_current(self, stage: str, doc: Dict, stage_fingerprint: str = "") -> bool:
+        """Vrai si le patch a déjà été enrichi par cette étape avec les mêmes changements"""
+        key = patch_key(doc)
+        if key is None:
+            return False
+        digest = changes_hash(doc, stage_fingerprint)
+        if digest in self.entries.get(key, {}).get(stage, []):
+            self.seen[(key, stage)].add(digest)
+            return True
+        return False
+
+    def mark(self, stage: str, doc: Dict, stage_fingerprint: str = ""):
+        key = patch_key(doc)
+        if key is not None:
+            self.seen[(key, stage)].add(changes_hash(doc, stage_fingerprint))
+
+    def merge(self, seen: Dict, reused: int = 0, processed: int = 0):
+        """Reprend les marques d'un processus worker (voir file_pool.py)"""
+        for key, digests in seen.items():
+            self.seen[key].update(digests)
+        self.reused += reused
+        self.processed += processed
+
+    def save(self):
+        """Remplace, pour les étapes exécutées et les bases traitées, les hashes par ceux vus pendant ce run"""
+        stages = {stage for _, stage in self.seen}
+        databases = {_database(key) for key, _ in self.seen}
+
+        with _locked(self.path + '.lock'):
+            # Relire : un autre processus a pu enregistrer d'autres bases entre-temps
+            entries = self._read()
+            for key, entry in entries.items():
+                if _database(key) in databases:
+                    for stage in stages:
+                        entry.pop(stage, None)
+            for (key, stage), digests in self.seen.items():
+                entries.setdefault(key, {})[stage] = sorted(digests)
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        self.entries = entries
+
+    def report(self, stage: str) -> str:
+        return f"♻️  {stage} : {self.processed} patch(es) analysé(s), {self.reused} réutilisé(s)"
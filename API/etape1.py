@@ -1,6 +1,7 @@
 import json
 import pandas as pd
-from pathlib import Path
+
+import codec
 
 # ==================== CLASSIFICATION DES BASES DE DONNÉES ====================
 class DatabaseClassifier:
@@ -43,14 +44,10 @@ all_data = []
 files_skipped = []
 
 # ==================== LECTURE DES FICHIERS ====================
-for file in Path("output").glob("*.json"):
+for file in codec.dataset_files("output"):
     try:
-        with open(file, "r", encoding="utf-8") as f:
-            content = json.load(f)
-            if isinstance(content, list):
-                all_data.extend(content)
-            else:
-                all_data.append(content)
+        # Lecture en flux : un fichier invalide n'ajoute aucune ligne
+        all_data.extend(list(codec.iter_items(file)))
     except json.JSONDecodeError:
         print(f"⚠️ Fichier JSON invalide : {file}")
         files_skipped.append(file)
@@ -58,7 +55,7 @@ for file in Path("output").glob("*.json"):
         print(f"⚠️ Erreur inattendue dans {file} : {e}")
         files_skipped.append(file)
 
-print(f"\n📁 Fichiers lus avec succès : {len(list(Path('output').glob('*.json'))) - len(files_skipped)}")
+print(f"\n📁 Fichiers lus avec succès : {len(codec.dataset_files('output')) - len(files_skipped)}")
 if files_skipped:
     print("⚠️ Fichiers ignorés :")
     for f in files_skipped:
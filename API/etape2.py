@@ -1,15 +1,23 @@
-import json
+import argparse
 import os
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Union
 
+import codec
+from enrichment_manifest import EnrichmentManifest, changes_hash, patch_key
+from scanner import close_cache, current_cache, enable_cache, get_scanner, scan_change
+
 # ==============================
 # CONFIGURATION
 # ==============================
 INPUT_DIR = "sources"
 OUTPUT_DIR = "output"
 
+# Nombre de patches lus en mémoire à la fois (lecture/écriture en flux)
+BATCH_SIZE = 256
+
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # ==============================
@@ -92,22 +100,90 @@ CATEGORIES = {
     ]
 }
 
+# ==============================
+# MATCHER DE MOTS-CLÉS (CONSTRUIT UNE SEULE FOIS)
+# ==============================
+TOKEN_RE = re.compile(r"\w+")
+
+
+class KeywordMatcher:
+    """Compte les mots-clés de chaque catégorie en un seul passage sur le texte.
+
+    Un mot-clé composé uniquement de caractères de mot correspond à
+    ``\\b{kw}\\b`` si et seulement si c'est un token ``\\w+`` complet du
+    texte : on tokenise donc une fois et on consulte un index
+    mot-clé → catégories. Les rares expressions contenant des espaces
+    gardent une regex précompilée.
+    Les doublons des listes comptent autant de fois qu'ils apparaissent,
+    comme dans la boucle d'origine.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = list(categories)
+        self.token_index = defaultdict(lambda: defaultdict(int))
+        phrases = defaultdict(list)
+
+        for category, keywords in categories.items():
+            for kw in keywords:
+                if TOKEN_RE.fullmatch(kw):
+                    self.token_index[kw][category] += 1
+                else:
+                    phrases[category].append(kw)
+
+        self.token_index = {kw: dict(hits) for kw, hits in self.token_index.items()}
+        self.phrase_patterns = {
+            category: [re.compile(rf"\b{re.escape(kw)}\b") for kw in kws]
+            for category, kws in phrases.items()
+        }
+
+    def scores(self, text: str) -> Dict[str, int]:
+        """Nombre de mots-clés trouvés par catégorie (catégories sans hit omises)"""
+        text = text.lower()
+        counts = defaultdict(int)
+
+        for token in set(TOKEN_RE.findall(text)):
+            hits = self.token_index.get(token)
+            if hits:
+                for category, n in hits.items():
+                    counts[category] += n
+
+        for category, patterns in self.phrase_patterns.items():
+            for pattern in patterns:
+                if pattern.search(text):
+                    counts[category] += 1
+
+        # Ordre de CATEGORIES conservé : départage identique à max(scores, key=scores.get)
+        return {category: counts[category] for category in self.categories if counts.get(category)}
+
+    def classify(self, text: str) -> str:
+        scores = self.scores(text)
+        if not scores:
+            return "other"
+        return max(scores, key=scores.get)
+
+
+MATCHER = KeywordMatcher(CATEGORIES)
+
 # ==============================
 # CLASSIFICATION D'UN CHANGEMENT
 # ==============================
 def classify_change(text: str) -> str:
-    text = text.lower()
-    scores = defaultdict(int)
+    return MATCHER.classify(text)
 
-    for category, keywords in CATEGORIES.items():
-        for kw in keywords:
-            if re.search(rf"\b{kw}\b", text):
-                scores[category] += 1
 
-    if not scores:
-        return "other"
+def classify_many(texts: List[str], engine: str = "keyword") -> List[str]:
+    """Classifie une liste de changements
 
-    return max(scores, key=scores.get)
+    engine="keyword" : matcher par ligne ; engine="numpy" : produit
+    matriciel sur tout le lot (voir batch_classifier.py), même résultat.
+    """
+    if engine == "numpy":
+        from batch_classifier import classify_texts
+        return classify_texts(texts, CATEGORIES)
+    return [MATCHER.classify(text) for text in texts]
+
+# Classifieur statistique optionnel (voir nb_classifier.py) ; None = mots-clés
+CLASSIFIER = None
 
 # ==============================
 # ANALYSE D'UN PATCH COMPLET
@@ -127,9 +203,14 @@ def analyze_patch(patch: Dict) -> Dict:
     }
 
     details = []
+    changes = patch.get("changes", [])
+
+    if CLASSIFIER is not None:
+        categories = CLASSIFIER.predict(changes)
+    else:
+        categories = [scan_change(change)["category"] for change in changes]
 
-    for change in patch.get("changes", []):
-        category = classify_change(change)
+    for change, category in zip(changes, categories):
         summary[category] += 1
         details.append({
             "description": change,
@@ -147,38 +228,183 @@ def analyze_patch(patch: Dict) -> Dict:
 # ==============================
 # TRAITEMENT DES FICHIERS JSON
 # ==============================
-def process_files():
-    for filename in os.listdir(INPUT_DIR):
-        if not filename.endswith(".json"):
-            continue
+def _init_worker(classifier):
+    """Worker du pool : reprend le classifieur du parent (sous spawn, le module est réimporté sans lui)"""
+    global CLASSIFIER
+    CLASSIFIER = classifier
+
+
+def make_executor(workers: int):
+    """Pool de processus pour analyze_patches, None en série"""
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(CLASSIFIER,))
+
 
-        input_path = os.path.join(INPUT_DIR, filename)
-        output_path = os.path.join(OUTPUT_DIR, filename)
+def _analyze_chunk(args):
+    """Analyse un lot de patches dans un processus worker"""
+    patches, use_cache = args
+    if not use_cache:
+        return [analyze_patch(patch) for patch in patches], 0, 0
 
-        with open(input_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    cache = enable_cache()
+    hits, misses = cache.hits, cache.misses
+    analyzed = [analyze_patch(patch) for patch in patches]
+    cache.flush()
+    return analyzed, cache.hits - hits, cache.misses - misses
 
-        # Cas 1 : liste de patches
-        if isinstance(data, list):
-            analyzed_data = [analyze_patch(patch) for patch in data]
 
-        # Cas 2 : un seul patch
-        elif isinstance(data, dict):
-            analyzed_data = analyze_patch(data)
+def analyze_patches(patches: List[Dict], executor=None, workers: int = 1) -> List[Dict]:
+    """Analyse une liste de patches, en parallèle si un executor est fourni.
 
+    Les lots sont découpés dans l'ordre et executor.map rend les
+    résultats dans le même ordre : la sortie est identique au mode série.
+    """
+    if executor is None or len(patches) < 2:
+        return [analyze_patch(patch) for patch in patches]
+
+    cache = current_cache()
+    if cache is not None:
+        # Les workers ouvrent leur propre connexion : rien ne doit rester verrouillé ici
+        cache.flush()
+    chunk_size = max(1, -(-len(patches) // (workers * 4)))
+    chunks = [(patches[i:i + chunk_size], cache is not None) for i in range(0, len(patches), chunk_size)]
+
+    analyzed = []
+    for result, hits, misses in executor.map(_analyze_chunk, chunks):
+        analyzed.extend(result)
+        if cache is not None:
+            cache.hits += hits
+            cache.misses += misses
+    return analyzed
+
+
+def stage_fingerprint() -> str:
+    """Empreinte de ce qui détermine ai_analysis : modèle chargé ou CATEGORIES"""
+    if CLASSIFIER is not None:
+        return CLASSIFIER.fingerprint
+    return get_scanner().fingerprints["category"]
+
+
+def load_previous_output(output_path) -> Dict[tuple, Dict]:
+    """Documents enrichis de l'exécution précédente, indexés par (patch, hash des changements)"""
+    if output_path is None or not os.path.exists(output_path):
+        return {}
+    try:
+        if not codec.is_array(output_path):
+            return {}
+        return {
+            (patch_key(doc), changes_hash(doc)): doc
+            for doc in codec.iter_array(output_path) if isinstance(doc, dict) and patch_key(doc)
+        }
+    except (ValueError, OSError):
+        return {}
+
+
+def iter_batches(items, size: int = BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def analyze_incremental(patches: List[Dict], previous: Dict[tuple, Dict], manifest: EnrichmentManifest,
+                        executor=None, workers: int = 1) -> List[Dict]:
+    """N'analyse que les patches nouveaux ou modifiés ; réutilise les autres tels quels.
+
+    Un patch réutilisé reprend ses champs sources et les sections
+    enrichies du document précédent (ai_analysis, ACID, alertes,
+    innovations), dont la validité est suivie par chaque étape.
+    """
+    fingerprint = stage_fingerprint()
+    analyzed = [None] * len(patches)
+    pending = []
+
+    for i, patch in enumerate(patches):
+        previous_doc = previous.get((patch_key(patch), changes_hash(patch)))
+        if previous_doc is not None and manifest.is_current("etape2", patch, fingerprint):
+            reused = dict(patch)
+            for key, value in previous_doc.items():
+                reused.setdefault(key, value)
+            analyzed[i] = reused
+            manifest.reused += 1
         else:
-            print(f"❌ Format inconnu : {filename}")
-            continue
+            pending.append(i)
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(analyzed_data, f, indent=2, ensure_ascii=False)
+    for i, doc in zip(pending, analyze_patches([patches[i] for i in pending], executor, workers)):
+        analyzed[i] = doc
+        manifest.mark("etape2", doc, fingerprint)
+    manifest.processed += len(pending)
 
-        print(f"✅ Analyse IA terminée : {filename}")
+    return analyzed
+
+
+def process_files(workers: int = 1, incremental: bool = True):
+    executor = make_executor(workers)
+    manifest = EnrichmentManifest() if incremental else None
+
+    try:
+        for input_path in codec.dataset_files(INPUT_DIR):
+            filename = input_path.name
+            name = codec.dataset_name(input_path)
+            output_path = codec.dataset_path(OUTPUT_DIR, name)
+
+            # Cas 1 : liste de patches, lue et écrite en flux
+            if codec.is_array(input_path):
+                previous = load_previous_output(codec.find_dataset(OUTPUT_DIR, name)) if manifest is not None else None
+                with codec.open_writer(output_path) as writer:
+                    for batch in iter_batches(codec.iter_array(input_path)):
+                        if manifest is not None:
+                            writer.write_all(analyze_incremental(batch, previous, manifest, executor, workers))
+                        else:
+                            writer.write_all(analyze_patches(batch, executor, workers))
+
+            else:
+                data = codec.load(input_path)
+
+                # Cas 2 : un seul patch
+                if not isinstance(data, dict):
+                    print(f"❌ Format inconnu : {filename}")
+                    continue
+
+                codec.dump(analyze_patch(data), output_path)
+
+            print(f"✅ Analyse IA terminée : {filename}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if manifest is not None:
+        manifest.save()
+        print(manifest.report("etape2"))
 
 # ==============================
 # POINT D'ENTRÉE
 # ==============================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse IA des patchs (sources/ → output/)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="nombre de processus pour analyser les patches (défaut : 1, série)")
+    parser.add_argument("--classifier", choices=["keyword", "model"], default="keyword",
+                        help="vote par mots-clés (défaut) ou modèle Naive Bayes entraîné")
+    parser.add_argument("--model", default="nb_model.npz", help="fichier du modèle pour --classifier model")
+    parser.add_argument("--full", action="store_true",
+                        help="réanalyse tous les patches sans consulter enrichment_manifest.json")
+    parser.add_argument("--format", choices=list(codec.FORMATS), default=codec.FORMAT,
+                        help="format des fichiers écrits dans output/ (défaut : $PIPELINE_FORMAT ou json)")
+    args = parser.parse_args()
+    codec.set_format(args.format)
+
+    if args.classifier == "model":
+        from nb_classifier import load_model
+        CLASSIFIER = load_model(args.model)
+
     print("🚀 Démarrage analyse IA des patchs...\n")
-    process_files()
+    enable_cache()
+    process_files(workers=args.workers, incremental=not args.full)
+    close_cache()
     print("\n🎯 Analyse terminée. Fichiers enrichis dans /output")
@@ -0,0 +1,84 @@
+"""
+Traitement parallèle des fichiers de output/ pour ACID.py, alert.py et
+innovation.py.
+
+Chaque fichier est confié à un processus worker qui le relit et le
+réécrit en flux (un document à la fois) : la mémoire reste bornée à un
+fichier en cours par worker. Le worker renvoie les totaux de l'étape
+(fonctionnalités ACID, alertes, innovations) avec ses marques du
+manifeste d'enrichissement et ses compteurs, pour que le processus
+principal n'ait pas à relire le fichier.
+
+Les messages d'un worker sont capturés et affichés fichier par fichier,
+dans l'ordre de la liste, comme en série.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import stage_metrics
+from scanner import current_cache, enable_cache
+
+
+def default_workers() -> int:
+    """Un worker par cœur de la machine"""
+    return os.cpu_count() or 1
+
+
+def _process_file(args):
+    """Traite un fichier dans un processus worker"""
+    adder_class, output_dir, incremental, file_path, use_cache = args
+    adder = adder_class(output_dir, incremental=incremental, workers=1)
+    cache = enable_cache() if use_cache else None
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    counters = dict(stage_metrics.COUNTERS)
+
+    log = io.StringIO()
+    with redirect_stdout(log):
+        totals = adder.process_json_file(file_path)
+
+    manifest = {}
+    if adder.manifest is not None:
+        manifest = {
+            "seen": dict(adder.manifest.seen),
+            "reused": adder.manifest.reused,
+            "processed": adder.manifest.processed,
+        }
+    if cache is not None:
+        cache.flush()
+        hits, misses = cache.hits - hits, cache.misses - misses
+    counters = {key: value - counters[key] for key, value in stage_metrics.COUNTERS.items()}
+    return log.getvalue(), totals, manifest, counters, hits, misses
+
+
+def process_files(adder, files: List[Path], workers: int = 1) -> Iterator[Tuple[Path, Optional[Dict[str, int]]]]:
+    """(fichier, totaux ou None) pour chaque fichier, traité par adder.process_json_file"""
+    if workers <= 1 or len(files) < 2:
+        for file_path in files:
+            print(f"\n📁 Traitement de: {file_path.name}")
+            yield file_path, adder.process_json_file(file_path)
+        return
+
+    cache = current_cache()
+    if cache is not None:
+        # Les workers ouvrent leur propre connexion : rien ne doit rester verrouillé ici
+        cache.flush()
+    jobs = [
+        (type(adder), str(adder.output_dir), adder.manifest is not None, file_path, cache is not None)
+        for file_path in files
+    ]
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+        for file_path, (log, totals, manifest, counters, hits, misses) in zip(files, executor.map(_process_file, jobs)):
+            print(f"\n📁 Traitement de: {file_path.name}")
+            print(log, end="")
+            if adder.manifest is not None:
+                adder.manifest.merge(**manifest)
+            stage_metrics.count(**counters)
+            if cache is not None:
+                cache.hits += hits
+                cache.misses += misses
+            yield file_path, totals
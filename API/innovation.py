@@ -6,174 +6,156 @@ Script pour générer des synthèses automatiques sur les innovations
 
 import json
 import os
-import shutil
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 import re
 
+import codec
+from backup_store import BackupStore
+from enrichment_manifest import EnrichmentManifest
+from file_pool import default_workers, process_files
+from scanner import SECTION_FORMAT, close_cache, enable_cache, get_scanner, iter_descriptions, scan_change
+
+# Catégories d'innovations avec mots-clés
+INNOVATION_CATEGORIES = {
+    "vector_search": {
+        "keywords": [
+            'vector', 'embedding', 'similarity', 'nearest neighbor', 'ann', 'approximate nearest',
+            'vector search', 'vector index', 'vector similarity', 'embedding search',
+            'faiss', 'hnsw', 'lsh', 'ivf', 'pq', 'product quantization',
+            'semantic search', 'vector database', 'vector storage', 'vector operations',
+            'dot product', 'cosine similarity', 'euclidean distance', 'manhattan distance',
+            'vector indexing', 'vector query', 'vector filter', 'vector aggregation',
+            'vector index type', 'vector distance', 'vector function', 'vector operator',
+            'vector storage engine', 'vector compression', 'vector encoding', 'vector decoding',
+            'vector normalization', 'vector quantization', 'vector clustering', 'vector partitioning'
+        ],
+        "description": "Recherche vectorielle et similarité sémantique",
+        "examples": ["Vector indexing", "Embedding similarity search", "ANN algorithms"]
+    },
+    "memory_acceleration": {
+        "keywords": [
+            'memory', 'cache', 'acceleration', 'ram', 'buffer', 'pool', 'allocation',
+            'memory optimization', 'memory management', 'memory pool', 'memory cache',
+            'in-memory', 'memory-mapped', 'mmap', 'shared memory', 'memory mapping',
+            'garbage collection', 'gc', 'heap', 'stack', 'memory leak', 'memory footprint',
+            'memory compression', 'memory deduplication', 'memory prefetching',
+            'tlb', 'translation lookaside buffer', 'memory hierarchy', 'memory bandwidth',
+            'memory allocator', 'memory arena', 'memory region', 'memory segment',
+            'memory controller', 'memory channel', 'memory bank', 'memory tier',
+            'memory tiering', 'memory hotness', 'memory cooling', 'memory eviction',
+            'memory reclamation', 'memory recycling', 'memory pooling', 'memory caching',
+            'fast memory', 'slow memory', 'persistent memory', 'non-volatile memory'
+        ],
+        "description": "Accélération mémoire et optimisation cache",
+        "examples": ["Memory pool optimization", "Cache acceleration", "Memory-mapped files"]
+    },
+    "ai_ml_integration": {
+        "keywords": [
+            'ai', 'ml', 'machine learning', 'artificial intelligence', 'neural network',
+            'deep learning', 'model', 'inference', 'training', 'prediction',
+            'tensorflow', 'pytorch', 'onnx', 'model serving', 'ml pipeline',
+            'feature store', 'model registry', 'automl', 'mlops', 'model deployment',
+            'gpu', 'cuda', 'tensor', 'vectorization', 'batch processing', 'distributed training'
+        ],
+        "description": "Intégration IA/ML et machine learning",
+        "examples": ["ML model integration", "AI-powered features", "Neural network inference"]
+    },
+    "distributed_computing": {
+        "keywords": [
+            'distributed', 'cluster', 'shard', 'partition', 'replica', 'consensus',
+            'raft', 'paxos', 'gossip', 'leader election', 'load balancing',
+            'horizontal scaling', 'vertical scaling', 'elastic scaling', 'auto-scaling',
+            'microservices', 'service mesh', 'kubernetes', 'docker', 'container',
+            'parallel processing', 'concurrent', 'async', 'event-driven', 'stream processing'
+        ],
+        "description": "Calcul distribué et scalabilité",
+        "examples": ["Distributed consensus", "Horizontal scaling", "Load balancing"]
+    },
+    "quantum_computing": {
+        "keywords": [
+            'quantum', 'qubit', 'quantum computing', 'quantum algorithm', 'quantum circuit',
+            'quantum gate', 'quantum entanglement', 'quantum superposition',
+            'quantum annealing', 'quantum cryptography', 'quantum key distribution',
+            'quantum simulation', 'quantum optimization', 'quantum machine learning'
+        ],
+        "description": "Informatique quantique",
+        "examples": ["Quantum algorithms", "Qubit operations", "Quantum cryptography"]
+    },
+    "blockchain_web3": {
+        "keywords": [
+            'blockchain', 'web3', 'smart contract', 'decentralized', 'dapp', 'cryptocurrency',
+            'nft', 'token', 'wallet', 'consensus', 'proof of work', 'proof of stake',
+            'defi', 'dao', 'smart contract', 'ethereum', 'solidity', 'smart contract execution',
+            'distributed ledger', 'crypto', 'mining', 'staking', 'validation'
+        ],
+        "description": "Blockchain et technologies Web3",
+        "examples": ["Smart contracts", "DeFi protocols", "NFT storage"]
+    },
+    "edge_computing": {
+        "keywords": [
+            'edge', 'edge computing', 'iot', 'internet of things', 'edge device',
+            'fog computing', 'edge analytics', 'edge ai', 'edge inference',
+            'real-time processing', 'low latency', 'edge gateway', 'edge node',
+            'embedded systems', 'microcontroller', 'sensor', 'actuator', 'edge ml'
+        ],
+        "description": "Edge computing et IoT",
+        "examples": ["Edge AI inference", "IoT data processing", "Real-time analytics"]
+    },
+    "security_privacy": {
+        "keywords": [
+            'security', 'privacy', 'encryption', 'decryption', 'cryptography', 'zero-knowledge',
+            'homomorphic encryption', 'differential privacy', 'secure multi-party computation',
+            'privacy-preserving', 'anonymous', 'pseudonymous', 'confidential',
+            'access control', 'authentication', 'authorization', 'biometric', 'multi-factor',
+            'zero-trust', 'security by design', 'privacy by design'
+        ],
+        "description": "Sécurité avancée et protection de la vie privée",
+        "examples": ["Zero-knowledge proofs", "Homomorphic encryption", "Privacy-preserving ML"]
+    }
+}
+
 class InnovationSummaryGenerator:
-    def __init__(self, output_dir: str = "output"):
+    def __init__(self, output_dir: str = "output", incremental: bool = True, workers: Optional[int] = None):
         self.output_dir = Path(output_dir)
-        self.backup_dir = Path("output_backup_innovations")
-        
-        # Catégories d'innovations avec mots-clés
-        self.innovation_categories = {
-            "vector_search": {
-                "keywords": [
-                    'vector', 'embedding', 'similarity', 'nearest neighbor', 'ann', 'approximate nearest',
-                    'vector search', 'vector index', 'vector similarity', 'embedding search',
-                    'faiss', 'hnsw', 'lsh', 'ivf', 'pq', 'product quantization',
-                    'semantic search', 'vector database', 'vector storage', 'vector operations',
-                    'dot product', 'cosine similarity', 'euclidean distance', 'manhattan distance',
-                    'vector indexing', 'vector query', 'vector filter', 'vector aggregation',
-                    'vector index type', 'vector distance', 'vector function', 'vector operator',
-                    'vector storage engine', 'vector compression', 'vector encoding', 'vector decoding',
-                    'vector normalization', 'vector quantization', 'vector clustering', 'vector partitioning'
-                ],
-                "description": "Recherche vectorielle et similarité sémantique",
-                "examples": ["Vector indexing", "Embedding similarity search", "ANN algorithms"]
-            },
-            "memory_acceleration": {
-                "keywords": [
-                    'memory', 'cache', 'acceleration', 'ram', 'buffer', 'pool', 'allocation',
-                    'memory optimization', 'memory management', 'memory pool', 'memory cache',
-                    'in-memory', 'memory-mapped', 'mmap', 'shared memory', 'memory mapping',
-                    'garbage collection', 'gc', 'heap', 'stack', 'memory leak', 'memory footprint',
-                    'memory compression', 'memory deduplication', 'memory prefetching',
-                    'tlb', 'translation lookaside buffer', 'memory hierarchy', 'memory bandwidth',
-                    'memory allocator', 'memory arena', 'memory region', 'memory segment',
-                    'memory controller', 'memory channel', 'memory bank', 'memory tier',
-                    'memory tiering', 'memory hotness', 'memory cooling', 'memory eviction',
-                    'memory reclamation', 'memory recycling', 'memory pooling', 'memory caching',
-                    'fast memory', 'slow memory', 'persistent memory', 'non-volatile memory'
-                ],
-                "description": "Accélération mémoire et optimisation cache",
-                "examples": ["Memory pool optimization", "Cache acceleration", "Memory-mapped files"]
-            },
-            "ai_ml_integration": {
-                "keywords": [
-                    'ai', 'ml', 'machine learning', 'artificial intelligence', 'neural network',
-                    'deep learning', 'model', 'inference', 'training', 'prediction',
-                    'tensorflow', 'pytorch', 'onnx', 'model serving', 'ml pipeline',
-                    'feature store', 'model registry', 'automl', 'mlops', 'model deployment',
-                    'gpu', 'cuda', 'tensor', 'vectorization', 'batch processing', 'distributed training'
-                ],
-                "description": "Intégration IA/ML et machine learning",
-                "examples": ["ML model integration", "AI-powered features", "Neural network inference"]
-            },
-            "distributed_computing": {
-                "keywords": [
-                    'distributed', 'cluster', 'shard', 'partition', 'replica', 'consensus',
-                    'raft', 'paxos', 'gossip', 'leader election', 'load balancing',
-                    'horizontal scaling', 'vertical scaling', 'elastic scaling', 'auto-scaling',
-                    'microservices', 'service mesh', 'kubernetes', 'docker', 'container',
-                    'parallel processing', 'concurrent', 'async', 'event-driven', 'stream processing'
-                ],
-                "description": "Calcul distribué et scalabilité",
-                "examples": ["Distributed consensus", "Horizontal scaling", "Load balancing"]
-            },
-            "quantum_computing": {
-                "keywords": [
-                    'quantum', 'qubit', 'quantum computing', 'quantum algorithm', 'quantum circuit',
-                    'quantum gate', 'quantum entanglement', 'quantum superposition',
-                    'quantum annealing', 'quantum cryptography', 'quantum key distribution',
-                    'quantum simulation', 'quantum optimization', 'quantum machine learning'
-                ],
-                "description": "Informatique quantique",
-                "examples": ["Quantum algorithms", "Qubit operations", "Quantum cryptography"]
-            },
-            "blockchain_web3": {
-                "keywords": [
-                    'blockchain', 'web3', 'smart contract', 'decentralized', 'dapp', 'cryptocurrency',
-                    'nft', 'token', 'wallet', 'consensus', 'proof of work', 'proof of stake',
-                    'defi', 'dao', 'smart contract', 'ethereum', 'solidity', 'smart contract execution',
-                    'distributed ledger', 'crypto', 'mining', 'staking', 'validation'
-                ],
-                "description": "Blockchain et technologies Web3",
-                "examples": ["Smart contracts", "DeFi protocols", "NFT storage"]
-            },
-            "edge_computing": {
-                "keywords": [
-                    'edge', 'edge computing', 'iot', 'internet of things', 'edge device',
-                    'fog computing', 'edge analytics', 'edge ai', 'edge inference',
-                    'real-time processing', 'low latency', 'edge gateway', 'edge node',
-                    'embedded systems', 'microcontroller', 'sensor', 'actuator', 'edge ml'
-                ],
-                "description": "Edge computing et IoT",
-                "examples": ["Edge AI inference", "IoT data processing", "Real-time analytics"]
-            },
-            "security_privacy": {
-                "keywords": [
-                    'security', 'privacy', 'encryption', 'decryption', 'cryptography', 'zero-knowledge',
-                    'homomorphic encryption', 'differential privacy', 'secure multi-party computation',
-                    'privacy-preserving', 'anonymous', 'pseudonymous', 'confidential',
-                    'access control', 'authentication', 'authorization', 'biometric', 'multi-factor',
-                    'zero-trust', 'security by design', 'privacy by design'
-                ],
-                "description": "Sécurité avancée et protection de la vie privée",
-                "examples": ["Zero-knowledge proofs", "Homomorphic encryption", "Privacy-preserving ML"]
-            }
-        }
+        # Ne retraiter que les patches nouveaux ou modifiés (voir enrichment_manifest.py)
+        self.manifest = EnrichmentManifest() if incremental else None
+        # Fichiers traités en parallèle (voir file_pool.py)
+        self.workers = workers or default_workers()
+        self.backup_store = BackupStore()
+        self.backup_stage = "innovation"
+        self.innovation_categories = INNOVATION_CATEGORIES
     
     def detect_innovations(self, text: str) -> List[str]:
-        """Détecte les catégories d'innovations dans un texte"""
-        detected = []
-        text_lower = text.lower()
-        
-        for category, config in self.innovation_categories.items():
-            # Compter le nombre de mots-clés trouvés pour cette catégorie
-            keyword_matches = 0
-            matched_keywords = []
-            
-            for keyword in config["keywords"]:
-                if keyword in text_lower:
-                    keyword_matches += 1
-                    matched_keywords.append(keyword)
-            
-            # Ajouter la catégorie seulement si on trouve au moins 2 mots-clés
-            # ou 1 mot-clé très spécifique (plus de 3 caractères)
-            if keyword_matches >= 2 or (keyword_matches >= 1 and any(len(kw) > 3 for kw in matched_keywords)):
-                detected.append(category)
+        """Détecte les catégories d'innovations dans un texte
         
-        return detected
+        Une catégorie est retenue avec au moins 2 mots-clés trouvés
+        ou 1 mot-clé très spécifique (plus de 3 caractères).
+        """
+        return list(scan_change(text)["innovations"])
     
-    def extract_innovations_from_changes(self, changes: List[str]) -> List[Dict]:
-        """Extrait les innovations des changements"""
+    def extract_innovations(self, version_data: Dict) -> List[Dict]:
+        """Innovations du patch, une par description (voir scanner.iter_descriptions)"""
         innovations = []
-        for change in changes:
-            detected_categories = self.detect_innovations(change)
+        for description, original_category in iter_descriptions(version_data):
+            detected_categories = self.detect_innovations(description)
             if detected_categories:
+                # Ne garder que les catégories détectées, pas les catégories "unknown"
+                if original_category and original_category.lower() != 'unknown':
+                    category = original_category
+                else:
+                    # Utiliser la première catégorie détectée comme catégorie principale
+                    category = detected_categories[0]
+                
                 innovations.append({
-                    "description": change,
+                    "description": description,
                     "categories": detected_categories,
-                    "source": "changes"
+                    "category": category,
+                    "source": "ai_analysis" if original_category is not None else "changes"
                 })
         return innovations
     
-    def extract_innovations_from_ai_analysis(self, ai_analysis: Dict) -> List[Dict]:
-        """Extrait les innovations de l'analyse IA"""
-        innovations = []
-        if 'details' in ai_analysis:
-            for detail in ai_analysis['details']:
-                detected_categories = self.detect_innovations(detail['description'])
-                if detected_categories:
-                    # Ne garder que les catégories détectées, pas les catégories "unknown"
-                    original_category = detail.get('category', '')
-                    if original_category.lower() != 'unknown':
-                        category = original_category
-                    else:
-                        # Utiliser la première catégorie détectée comme catégorie principale
-                        category = detected_categories[0]
-                    
-                    innovations.append({
-                        "description": detail['description'],
-                        "categories": detected_categories,
-                        "category": category,
-                        "source": "ai_analysis"
-                    })
-        return innovations
-    
     def generate_innovation_summary(self, innovations: List[Dict]) -> Dict:
         """Génère une synthèse des innovations"""
         # Compter par catégorie
@@ -271,16 +253,8 @@ class InnovationSummaryGenerator:
         """Traite les données d'une version pour ajouter les innovations"""
         modified_data = version_data.copy()
         
-        # Extraire les innovations
-        innovations = []
-        
-        # Depuis les changements
-        if 'changes' in version_data:
-            innovations.extend(self.extract_innovations_from_changes(version_data['changes']))
-        
-        # Depuis l'analyse IA
-        if 'ai_analysis' in version_data:
-            innovations.extend(self.extract_innovations_from_ai_analysis(version_data['ai_analysis']))
+        # Extraire les innovations (changements et analyse IA : mêmes lignes)
+        innovations = self.extract_innovations(version_data)
         
         # Générer la synthèse
         innovation_summary = self.generate_innovation_summary(innovations)
@@ -291,79 +265,110 @@ class InnovationSummaryGenerator:
         return modified_data
     
     def backup_output_directory(self):
-        """Crée une sauvegarde du dossier output"""
-        if self.backup_dir.exists():
-            shutil.rmtree(self.backup_dir)
-        shutil.copytree(self.output_dir, self.backup_dir)
-        print(f"Sauvegarde créée dans: {self.backup_dir}")
+        """Enregistre un instantané du dossier output (voir backup_store.py)"""
+        self.backup_store.snapshot(self.backup_stage, self.output_dir)
+    
+    def is_up_to_date(self, version_data: Dict) -> bool:
+        """Vrai si la section 'innovation_summary' est déjà à jour pour ces changements"""
+        if self.manifest is None or 'innovation_summary' not in version_data:
+            return False
+        if self.manifest.is_current('innovation', version_data, get_scanner().fingerprints['innovation'] + SECTION_FORMAT):
+            self.manifest.reused += 1
+            return True
+        return False
     
-    def process_json_file(self, file_path: Path) -> bool:
-        """Traite un fichier JSON individuel"""
+    def enrich_version(self, version_data: Dict) -> Dict:
+        """Enrichit un document ; le rend tel quel s'il n'a pas de 'database' ou est déjà à jour"""
+        if 'database' not in version_data or self.is_up_to_date(version_data):
+            return version_data
+        
+        modified_version = self.process_version_data(version_data)
+        if self.manifest is not None:
+            self.manifest.mark('innovation', modified_version, get_scanner().fingerprints['innovation'] + SECTION_FORMAT)
+            self.manifest.processed += 1
+        return modified_version
+    
+    def process_json_file(self, file_path: Path) -> Optional[Dict[str, int]]:
+        """Traite un fichier JSON individuel ; renvoie ses totaux s'il a été modifié, sinon None"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if not isinstance(data, list):
+            if not codec.is_array(file_path):
                 print(f"Le fichier {file_path.name} ne contient pas une liste")
-                return False
+                return None
             
             modified = False
-            for i, version_data in enumerate(data):
-                if 'database' not in version_data:
-                    continue
-                
-                # Traiter les données de la version
-                modified_version = self.process_version_data(version_data)
-                
-                # Vérifier si des modifications ont été apportées
-                if modified_version != version_data:
-                    data[i] = modified_version
-                    modified = True
-                    
-                    innovation_count = modified_version['innovation_summary']['total_innovations']
-                    categories_count = len(modified_version['innovation_summary']['categories_detected'])
+            totals = {"innovations": 0}
+            writer = codec.open_writer(file_path)
+            try:
+                for version_data in codec.iter_array(file_path):
+                    modified_version = self.enrich_version(version_data)
+                    if 'innovation_summary' in modified_version:
+                        totals["innovations"] += modified_version['innovation_summary']['total_innovations']
                     
-                    if innovation_count > 0:
-                        version_name = version_data.get('patch_version', version_data.get('major_version', 'unknown'))
-                        print(f"  {version_name}: {innovation_count} innovations dans {categories_count} catégories")
+                    # Vérifier si des modifications ont été apportées
+                    if modified_version is not version_data and modified_version != version_data:
+                        modified = True
                         
-                        # Afficher les catégories principales
-                        top_categories = sorted(
-                            modified_version['innovation_summary']['category_counts'].items(),
-                            key=lambda x: x[1],
-                            reverse=True
-                        )[:3]
+                        innovation_count = modified_version['innovation_summary']['total_innovations']
+                        categories_count = len(modified_version['innovation_summary']['categories_detected'])
                         
-                        for cat, count in top_categories:
-                            print(f"    🚀 {cat}: {count}")
+                        if innovation_count > 0:
+                            version_name = version_data.get('patch_version', version_data.get('major_version', 'unknown'))
+                            print(f"  {version_name}: {innovation_count} innovations dans {categories_count} catégories")
+                            
+                            # Afficher les catégories principales
+                            top_categories = sorted(
+                                modified_version['innovation_summary']['category_counts'].items(),
+                                key=lambda x: x[1],
+                                reverse=True
+                            )[:3]
+                            
+                            for cat, count in top_categories:
+                                print(f"    🚀 {cat}: {count}")
+                    
+                    writer.write(modified_version)
+            except Exception:
+                writer.abort()
+                raise
             
             # Sauvegarder les modifications
             if modified:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                writer.close()
                 print(f"✅ Fichier modifié: {file_path.name}")
-                return True
+                return totals
             else:
+                writer.abort()
                 print(f"ℹ️  Aucune innovation détectée: {file_path.name}")
-                return False
-                
+                return None
+        
         except Exception as e:
             print(f"❌ Erreur lors du traitement du fichier {file_path}: {e}")
-            return False
+            return None
+
+    def read_output_files(self) -> Iterator[Tuple[str, Any]]:
+        """(nom, contenu) de chaque fichier JSON du dossier output"""
+        for file_path in codec.dataset_files(self.output_dir):
+            try:
+                yield file_path.name, codec.load(file_path)
+            except Exception as e:
+                print(f"Erreur lors de la lecture de {file_path}: {e}")
     
-    def generate_global_summary(self):
-        """Génère une synthèse globale de toutes les innovations"""
+    def generate_global_summary(self, datasets: Optional[Iterable[Tuple[str, Any]]] = None):
+        """Génère une synthèse globale de toutes les innovations.
+        
+        datasets : paires (nom, documents) déjà en mémoire (pipeline.py) ;
+        par défaut les fichiers du dossier output sont relus.
+        """
         print("\n🌍 GÉNÉRATION DE LA SYNTHÈSE GLOBALE...")
         
         all_innovations = []
         database_summaries = {}
         
         # Parcourir tous les fichiers
-        for file_path in self.output_dir.glob("*.json"):
+        if datasets is None:
+            datasets = self.read_output_files()
+        
+        for name, data in datasets:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
                 db_name = None
                 for version_data in data:
                     if 'database' in version_data:
@@ -376,7 +381,7 @@ class InnovationSummaryGenerator:
                     all_innovations.extend(summary['category_details'].get('all', []))
                     
             except Exception as e:
-                print(f"Erreur lors de la lecture de {file_path}: {e}")
+                print(f"Erreur lors de la lecture de {name}: {e}")
         
         # Générer la synthèse globale
         global_summary = {
@@ -493,7 +498,7 @@ class InnovationSummaryGenerator:
             print(f"Le dossier {self.output_dir} n'existe pas.")
             return
         
-        json_files = list(self.output_dir.glob("*.json"))
+        json_files = codec.dataset_files(self.output_dir)
         if not json_files:
             print("Aucun fichier JSON trouvé dans le dossier output.")
             return
@@ -507,21 +512,10 @@ class InnovationSummaryGenerator:
         total_files_modified = 0
         total_innovations = 0
         
-        for file_path in json_files:
-            print(f"\n📁 Traitement de: {file_path.name}")
-            if self.process_json_file(file_path):
+        for file_path, totals in process_files(self, json_files, self.workers):
+            if totals is not None:
                 total_files_modified += 1
-                
-                # Compter les innovations dans ce fichier
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    for version_data in data:
-                        if 'innovation_summary' in version_data:
-                            total_innovations += version_data['innovation_summary']['total_innovations']
-                except:
-                    pass
+                total_innovations += totals["innovations"]
         
         print("\n" + "=" * 80)
         print("🚀 RÉSUMÉ DES INNOVATIONS")
@@ -529,7 +523,10 @@ class InnovationSummaryGenerator:
         print(f"Fichiers traités: {len(json_files)}")
         print(f"Fichiers avec innovations: {total_files_modified}")
         print(f"Total innovations détectées: {total_innovations}")
-        print(f"Sauvegarde disponible dans: {self.backup_dir}")
+        print(f"Sauvegarde disponible : python backup_store.py restore {self.backup_stage}")
+        if self.manifest is not None:
+            self.manifest.save()
+            print(self.manifest.report('innovation'))
         
         if total_files_modified > 0:
             print("\n✅ Tous les fichiers ont été mis à jour avec les synthèses d'innovations!")
@@ -564,7 +561,9 @@ def main():
         return
     
     generator = InnovationSummaryGenerator()
+    enable_cache()
     generator.process_all_files()
+    close_cache()
 
 if __name__ == "__main__":
     main()
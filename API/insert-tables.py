@@ -1,8 +1,10 @@
 import json
 import os
 from pathlib import Path
-from pymongo import MongoClient
-from mongo import MONGO_URI, client, db, collection_version
+import codec
+from projection import output_projection
+from storage import VERSION_KEY_FIELD, backend_name, close_repository, get_repository, version_sort_key
+from sync import content_hash, patch_fields, rebuild_version_stats
 
 def import_json_files_to_mongodb():
     """Importe tous les fichiers JSON du dossier output vers la collection versions MongoDB"""
@@ -13,7 +15,7 @@ def import_json_files_to_mongodb():
         print(f"Le dossier {output_dir} n'existe pas.")
         return
     
-    json_files = list(output_dir.glob("*.json"))
+    json_files = codec.dataset_files(output_dir)
     
     if not json_files:
         print(f"Aucun fichier JSON trouvé dans {output_dir}")
@@ -21,38 +23,49 @@ def import_json_files_to_mongodb():
     
     print(f"Importation de {len(json_files)} fichiers JSON vers MongoDB...")
     print(f"Base de données: VT")
-    print(f"Collection: versions")
+    print(f"Collection: versions (stockage: {backend_name()})")
     print("=" * 60)
     
     total_documents = 0
+    total_duplicates = 0
+    # Même projection que sync.py : les hashes stockés valent ceux de la prochaine synchronisation
+    projection = output_projection()
+    # Clés déjà importées : seule la première copie d'un patch est gardée, comme dans sync.py
+    seen_keys = set()
     
     try:
+        repository = get_repository()
+        
         # Vider la collection existante (optionnel - commenter si vous voulez ajouter sans remplacer)
         print("🗑️  Vidage de la collection 'versions'...")
-        result = collection_version.delete_many({})
-        print(f"   {result.deleted_count} documents supprimés")
+        deleted_count = repository.delete_all()
+        print(f"   {deleted_count} documents supprimés")
         
         for json_file in json_files:
             print(f"\n📄 Traitement de: {json_file.name}")
             
             try:
-                # Lire le fichier JSON
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Vérifier si les données sont une liste ou un dictionnaire
-                if isinstance(data, list):
-                    documents = data
-                elif isinstance(data, dict):
-                    documents = [data]
-                else:
-                    print(f"   ⚠️  Format de données non supporté dans {json_file.name}")
-                    continue
+                documents = []
+                # Lire le fichier (JSON ou format binaire, voir codec.py) document par document
+                for doc in projection.iter(codec.iter_items(json_file)):
+                    if not isinstance(doc, dict):
+                        print(f"   ⚠️  Format de données non supporté dans {json_file.name}")
+                        break
+                    key = (doc.get('database'), doc.get('patch_version'))
+                    if not all(key):
+                        continue
+                    if key in seen_keys:
+                        total_duplicates += 1
+                        continue
+                    seen_keys.add(key)
+                    
+                    # Clé de tri et hash de contenu, comme sync.py : seuls les patches modifiés seront réécrits ensuite
+                    doc = {**doc, VERSION_KEY_FIELD: version_sort_key(key[1])}
+                    documents.append(patch_fields(doc, content_hash(doc)))
                 
                 # Insérer les documents dans MongoDB
                 if documents:
-                    result = collection_version.insert_many(documents)
-                    documents_count = len(result.inserted_ids)
+                    documents_count = repository.insert_patches(documents)
                     total_documents += documents_count
                     print(f"   ✅ {documents_count} documents insérés")
                 else:
@@ -64,18 +77,21 @@ def import_json_files_to_mongodb():
         print(f"\n" + "=" * 60)
         print(f"🎉 Importation terminée!")
         print(f"📊 Total de documents insérés: {total_documents}")
+        if total_duplicates:
+            print(f"🔁 Doublons ignorés (première copie conservée): {total_duplicates}")
+        
+        # Index créés après l'import : l'index unique (database, patch_version) se construit sur des clés sans doublon
+        repository.ensure_indexes()
         
         # Vérification
-        count_in_db = collection_version.count_documents({})
+        count_in_db = repository.count()
         print(f"📋 Documents dans la collection 'versions': {count_in_db}")
         
+        # Totaux matérialisés recalculés pour la collection réimportée
+        rebuild_version_stats()
+        
     except Exception as e:
         print(f"❌ Erreur lors de la connexion à MongoDB: {e}")
-    
-    finally:
-        # Fermer la connexion
-        client.close()
-        print("🔌 Connexion MongoDB fermée")
 
 def show_collection_stats():
     """Affiche des statistiques sur la collection versions"""
@@ -83,25 +99,23 @@ def show_collection_stats():
         print("\n📊 Statistiques de la collection 'versions':")
         print("-" * 40)
         
-        total_count = collection_version.count_documents({})
+        repository = get_repository()
+        total_count = repository.count()
         print(f"Total documents: {total_count}")
         
         if total_count > 0:
             # Compter par type de base de données
-            pipeline = [
-                {"$group": {"_id": "$database", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}}
-            ]
-            db_stats = list(collection_version.aggregate(pipeline))
+            db_stats = repository.count_by_database()
             
             print("\nRépartition par base de données:")
-            for stat in db_stats:
-                print(f"  {stat['_id']}: {stat['count']} documents")
+            for db_name, count in db_stats:
+                print(f"  {db_name}: {count} documents")
             
             # Afficher un exemple de document
-            sample = collection_version.find_one()
+            # Un seul document lu, pas toute la base
+            sample = repository.find_one_by_tech(db_stats[0][0])
             print(f"\nExemple de document (base: {sample.get('database', 'N/A')}):")
-            print(json.dumps(sample, indent=2, ensure_ascii=False))
+            print(json.dumps(sample, indent=2, ensure_ascii=False, default=str))
             
     except Exception as e:
         print(f"❌ Erreur lors de l'affichage des statistiques: {e}")
@@ -110,5 +124,10 @@ if __name__ == "__main__":
     print("📥 Importation des fichiers JSON vers MongoDB")
     print("=" * 60)
     
-    import_json_files_to_mongodb()
-    show_collection_stats()
+    try:
+        import_json_files_to_mongodb()
+        show_collection_stats()
+    finally:
+        # Fermer la connexion (un seul client pour l'import et les statistiques)
+        close_repository()
+        print("🔌 Connexion MongoDB fermée")
@@ -6,9 +6,10 @@ import os
 
 # Importer les coordonnées MongoDB depuis mongo.py
 try:
-    from mongo import MONGO_URI
+    from mongo import MONGO_URI, close_client, get_client
     connection_string = MONGO_URI
 except ImportError:
+    get_client = None
     # Fallback vers localhost si mongo.py n'existe pas
     connection_string = "mongodb://localhost:27017/"
     print("⚠️ mongo.py non trouvé, utilisation de localhost par défaut")
@@ -30,7 +31,11 @@ class MongoDBInserter:
     def connect(self):
         """Établit la connexion à MongoDB"""
         try:
-            self.client = MongoClient(self.connection_string)
+            if get_client is not None and self.connection_string == MONGO_URI:
+                # Client partagé du processus (pool, compression et délais de config.py)
+                self.client = get_client()
+            else:
+                self.client = MongoClient(self.connection_string)
             # Test la connexion
             self.client.admin.command('ping')
             self.db = self.client[self.database_name]
@@ -178,7 +183,10 @@ class MongoDBInserter:
     def close(self):
         """Ferme la connexion à MongoDB"""
         if self.client:
-            self.client.close()
+            if get_client is not None and self.connection_string == MONGO_URI:
+                close_client()
+            else:
+                self.client.close()
             print("🔌 Connexion à MongoDB fermée")
 
 def main():
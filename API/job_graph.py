@@ -0,0 +1,132 @@
+"""
+Exécution d'un graphe de tâches (DAG) avec une limite de parallélisme.
+
+Chaque tâche lance un script (voir scheduler.run_script) dès que toutes
+ses dépendances sont terminées. Les tâches indépendantes tournent en
+parallèle, dans la limite de max_parallel : la durée totale est bornée
+par la chaîne la plus lente, et non par la somme des chaînes.
+
+Une tâche `required=False` (un scraper) qui échoue n'empêche pas ses
+dépendantes de tourner : elles repartent des fichiers déjà présents,
+comme l'ancienne boucle séquentielle. Une tâche requise qui échoue
+annule ses dépendantes ; les autres branches continuent. Une tâche
+`partial=True` (la jointure) tourne malgré tout, avec ce que les
+dépendances réussies ont produit.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class Task:
+    def __init__(self, name: str, script: str, args: Sequence[str] = (),
+                 deps: Sequence[str] = (), phase: str = "pipeline", required: bool = True,
+                 inputs: Sequence[str] = (), outputs: Sequence[str] = (), partial: bool = False):
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.deps = list(deps)
+        self.phase = phase
+        self.required = required
+        # Lancée dès que ses dépendances sont terminées, même en échec
+        self.partial = partial
+        # Fichiers lus et écrits : sans entrées déclarées (scrapers), la
+        # tâche est toujours relancée (voir change_manifest.py)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+    def __repr__(self):
+        return f"Task({self.name!r}, deps={self.deps})"
+
+
+class JobGraph:
+    def __init__(self, tasks: List[Task]):
+        self.tasks: Dict[str, Task] = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"Tâche en double : {task.name}")
+            self.tasks[task.name] = task
+
+        for task in tasks:
+            for dep in task.deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"{task.name} dépend d'une tâche inconnue : {dep}")
+        self.order()  # vérifie l'absence de cycle
+
+    def order(self) -> List[str]:
+        """Ordre topologique (ordre de déclaration à égalité)"""
+        remaining = {name: set(task.deps) for name, task in self.tasks.items()}
+        ordered = []
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Cycle dans le graphe : {sorted(remaining)}")
+            for name in ready:
+                ordered.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return ordered
+
+    def run(self, execute: Callable[[Task], bool], max_parallel: int = 3,
+            log: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
+        """Exécute le graphe ; renvoie {tâche: 'ok' | 'failed' | 'skipped'}.
+
+        execute(task) lance la tâche et renvoie True si elle a réussi.
+        """
+        log = log or print
+        status: Dict[str, str] = {}
+        running = {}
+        start = time.perf_counter()
+
+        def failed_deps(task: Task) -> List[str]:
+            return [dep for dep in task.deps
+                    if status.get(dep) in ("failed", "skipped") and self.tasks[dep].required]
+
+        def ready(task: Task) -> bool:
+            return all(dep in status for dep in task.deps)
+
+        # Les tâches les plus en aval passent d'abord : une base déjà scrapée
+        # est enrichie avant de lancer le scraper suivant
+        order = self.order()
+        depth: Dict[str, int] = {}
+        for name in order:
+            depth[name] = 1 + max((depth[dep] for dep in self.tasks[name].deps), default=-1)
+        priority = sorted(order, key=lambda name: (-depth[name], order.index(name)))
+        max_parallel = max(1, max_parallel)
+
+        with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+            while len(status) < len(self.tasks):
+                for name in priority:
+                    task = self.tasks[name]
+                    if name in status or name in running.values() or not ready(task):
+                        continue
+                    failed = failed_deps(task)
+                    if failed and not task.partial:
+                        status[name] = "skipped"
+                        log(f"⏭️  Annulée : {name} (dépendance en échec)")
+                        continue
+                    if len(running) >= max_parallel:
+                        break
+                    if failed:
+                        log(f"⚠️  {name} lancée sans : {', '.join(failed)} (sorties précédentes conservées)")
+                    running[pool.submit(execute, task)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        log(f"❌ {name} : {e}")
+                        ok = False
+                    status[name] = "ok" if ok else "failed"
+
+        log(f"🏁 Graphe terminé en {time.perf_counter() - start:.1f}s : "
+            f"{sum(s == 'ok' for s in status.values())} ok, "
+            f"{sum(s == 'failed' for s in status.values())} échec(s), "
+            f"{sum(s == 'skipped' for s in status.values())} annulée(s)")
+        return status
@@ -0,0 +1,159 @@
+"""
+Lecture et écriture en flux des fichiers JSON du pipeline.
+
+Les fichiers de sources/ et output/ sont des tableaux JSON de patches.
+Plutôt que json.load/json.dump sur tout le fichier, les étapes lisent
+un patch à la fois et écrivent les résultats au fur et à mesure : la
+mémoire reste proportionnelle à un patch, quelle que soit la taille du
+fichier.
+
+JsonArrayWriter produit exactement le même texte que
+json.dump(liste, f, indent=2, ensure_ascii=False). Il écrit dans un
+fichier temporaire remplacé à la fermeture, ce qui permet de réécrire
+un fichier pendant qu'on le lit.
+"""
+
+import json
+import os
+from typing import Any, Iterable, Iterator
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def _first_char(path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return ""
+            stripped = chunk.lstrip(_WHITESPACE)
+            if stripped:
+                return stripped[0]
+
+
+def is_json_array(path) -> bool:
+    """Vrai si le fichier contient un tableau JSON au premier niveau"""
+    return _first_char(path) == "["
+
+
+def iter_json_array(path) -> Iterator[Any]:
+    """Itère sur les éléments d'un tableau JSON de premier niveau, un par un"""
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, pos, eof
+            # Lecture au moins aussi grande que le reste du tampon : un élément
+            # plus gros qu'un bloc n'est redécodé qu'un nombre logarithmique de fois
+            chunk = f.read(max(CHUNK_SIZE, len(buffer) - pos))
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != "[":
+            raise ValueError(f"{path} : un tableau JSON est attendu")
+        pos += 1
+
+        skip_whitespace()
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+
+        while True:
+            skip_whitespace()
+            while True:
+                try:
+                    item, end = _decoder.raw_decode(buffer, pos)
+                    # Un scalaire coupé en fin de tampon peut sembler complet
+                    if end < len(buffer) or eof:
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+            pos = end
+            yield item
+
+            skip_whitespace()
+            if pos >= len(buffer):
+                raise ValueError(f"{path} : tableau JSON non terminé")
+            if buffer[pos] == ",":
+                pos += 1
+            elif buffer[pos] == "]":
+                return
+            else:
+                raise ValueError(f"{path} : séparateur inattendu {buffer[pos]!r}")
+
+
+def iter_json_items(path) -> Iterator[Any]:
+    """Éléments d'un tableau JSON, ou la valeur unique si ce n'est pas un tableau"""
+    if is_json_array(path):
+        yield from iter_json_array(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield json.load(f)
+
+
+class JsonArrayWriter:
+    """Écrit un tableau JSON élément par élément (format identique à indent=2)"""
+
+    def __init__(self, path, indent: int = 2):
+        self.path = str(path)
+        self.tmp_path = self.path + ".tmp"
+        self.indent = indent
+        self.count = 0
+        self.bytes_written = 0
+        # Binaire : chaque morceau est encodé une seule fois, sa taille sert au compteur
+        self._file = open(self.tmp_path, "wb")
+        self._write("[")
+
+    def _write(self, text: str):
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def write(self, item: Any):
+        text = json.dumps(item, indent=self.indent, ensure_ascii=False)
+        # Les retours à la ligne ne peuvent apparaître qu'entre les jetons JSON
+        text = text.replace("\n", "\n" + " " * self.indent)
+        self._write(("," if self.count else "") + "\n" + " " * self.indent + text)
+        self.count += 1
+
+    def write_all(self, items: Iterable[Any]):
+        for item in items:
+            self.write(item)
+
+    def close(self):
+        self._write("\n]" if self.count else "]")
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Abandonne l'écriture : le fichier d'origine reste intact"""
+        self._file.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
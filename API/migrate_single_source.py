@@ -0,0 +1,89 @@
+"""
+Migration des fichiers de output/ vers les sections à source unique.
+
+Avant, ACID.py, alert.py et innovation.py parcouraient à la fois
+'changes' et ai_analysis.details, qui contiennent les mêmes lignes :
+chaque description figurait deux fois dans acid_consistency_features,
+alerts et innovation_summary. Les enrichisseurs parcourent désormais
+chaque description une seule fois (voir scanner.iter_descriptions).
+
+Le changement de format est inscrit dans l'empreinte du manifeste
+d'enrichissement : relancer les trois enrichisseurs suffit à recalculer
+tous les documents existants (à partir de ai_analysis.details, la clé
+'changes' ayant déjà été supprimée). Chaque enrichisseur enregistre un
+instantané avant d'écrire (python backup_store.py restore <étape>).
+
+Usage :
+    python migrate_single_source.py [--output-dir output] [--workers N] [--mongo]
+
+--mongo renvoie ensuite les documents migrés vers le stockage (MongoDB
+ou VT_STORAGE) par le chemin de sync.py : les patches dont les sections
+ont changé sont réécrits avec leur nouveau content_hash et version_stats
+est ajustée en conséquence.
+"""
+
+import argparse
+from pathlib import Path
+from typing import Dict
+
+import codec
+from ACID import AcidConsistencyAdderSimple
+from alert import AlertsAdder
+from innovation import InnovationSummaryGenerator
+from projection import output_projection
+from scanner import close_cache, enable_cache
+
+
+def file_sizes(output_dir: Path) -> Dict[str, int]:
+    return {path.name: path.stat().st_size for path in codec.dataset_files(output_dir)}
+
+
+def migrate_files(output_dir: Path, workers=None):
+    before = file_sizes(output_dir)
+
+    enable_cache()
+    for adder_class in (AcidConsistencyAdderSimple, AlertsAdder, InnovationSummaryGenerator):
+        adder_class(str(output_dir), workers=workers).process_all_files()
+    close_cache()
+
+    after = file_sizes(output_dir)
+    print("\n" + "=" * 60)
+    print("📉 TAILLE DES FICHIERS")
+    print("=" * 60)
+    for name in sorted(after):
+        old, new = before.get(name, 0), after[name]
+        gain = (1 - new / old) * 100 if old else 0
+        print(f"  {name:<32} {old / 1024:>9.0f} Ko → {new / 1024:>9.0f} Ko  (-{gain:.1f}%)")
+    old_total, new_total = sum(before.values()), sum(after.values())
+    print(f"  {'TOTAL':<32} {old_total / 1024:>9.0f} Ko → {new_total / 1024:>9.0f} Ko  "
+          f"(-{(1 - new_total / old_total) * 100 if old_total else 0:.1f}%)")
+
+
+def migrate_mongo(output_dir: Path):
+    """Réécrit les patches déjà synchronisés dont les sections ont changé
+
+    Même chemin que sync.py (upserts, content_hash, $inc de version_stats) :
+    la synchronisation suivante et /stats partent de données à jour.
+    """
+    import sync  # pymongo n'est nécessaire que pour cette étape
+
+    projection = output_projection()
+    sync.sync_new_patches({path.name: projection.iter(codec.iter_items(path))
+                           for path in codec.dataset_files(output_dir)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcule les sections ACID, alertes et innovations sans doublons")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--workers", type=int, help="processus pour les fichiers (défaut : un par cœur)")
+    parser.add_argument("--mongo", action="store_true",
+                        help="met aussi à jour les documents synchronisés (MongoDB ou VT_STORAGE)")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    if not output_dir.exists():
+        print(f"Le dossier {output_dir} n'existe pas.")
+    else:
+        migrate_files(output_dir, args.workers)
+        if args.mongo:
+            migrate_mongo(output_dir)
@@ -0,0 +1,200 @@
+"""
+Classifieur statistique (Naive Bayes multinomial, NumPy uniquement)
+alternatif au vote par mots-clés de etape2.
+
+- Features : tokens ``\\w+`` hachés (crc32) dans un espace fixe,
+  aucun vocabulaire à maintenir.
+- Entraînement : labels ai_analysis.details des fichiers outputfinal/*.json.
+- Modèle : un fichier .npz compact (log-priors + log-vraisemblances),
+  chargé en quelques millisecondes.
+- Prédiction : un seul produit creux × dense par lot.
+
+Le mode mots-clés reste le mode par défaut et le repli si le modèle
+est absent.
+
+Usage :
+    python nb_classifier.py train            # entraîne et sauvegarde le modèle
+    python nb_classifier.py report           # accord et débit vs mots-clés
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from etape2 import CATEGORIES, TOKEN_RE, classify_many
+
+TRAINING_DIR = "outputfinal"
+MODEL_FILE = "nb_model.npz"
+N_FEATURES = 2 ** 16
+LABELS = list(CATEGORIES) + ["other"]
+
+
+# ==============================
+# FEATURES HACHÉES
+# ==============================
+def hashed_features(texts: List[str], n_features: int = N_FEATURES):
+    """Matrice creuse document × feature au format COO (rows, cols, counts)"""
+    rows, cols = [], []
+    for i, text in enumerate(texts):
+        for token in TOKEN_RE.findall(text.lower()):
+            rows.append(i)
+            cols.append(zlib.crc32(token.encode("utf-8")) % n_features)
+
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+
+    # Fusion des doublons (document, feature) → comptes
+    keys = np.asarray(rows, dtype=np.int64) * n_features + np.asarray(cols, dtype=np.int64)
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys // n_features, keys % n_features, counts.astype(np.float32)
+
+
+# ==============================
+# NAIVE BAYES MULTINOMIAL
+# ==============================
+class NaiveBayesClassifier:
+    def __init__(self, labels=None, log_prior=None, log_likelihood=None, n_features: int = N_FEATURES):
+        self.labels = list(labels or LABELS)
+        self.n_features = n_features
+        self.log_prior = log_prior
+        self.log_likelihood = log_likelihood  # (n_features, n_classes)
+        self.fingerprint = self._fingerprint() if log_likelihood is not None else None
+
+    def _fingerprint(self) -> str:
+        """Empreinte des paramètres (labels + tableaux) : identique après save/load"""
+        digest = hashlib.sha1("\n".join(self.labels).encode("utf-8"))
+        digest.update(np.ascontiguousarray(self.log_prior, dtype=np.float32).tobytes())
+        digest.update(np.ascontiguousarray(self.log_likelihood, dtype=np.float32).tobytes())
+        return "model:" + digest.hexdigest()
+
+    def fit(self, texts: List[str], labels: List[str], alpha: float = 1.0) -> "NaiveBayesClassifier":
+        index = {label: k for k, label in enumerate(self.labels)}
+        y = np.asarray([index[label] for label in labels], dtype=np.int64)
+        rows, cols, counts = hashed_features(texts, self.n_features)
+
+        class_counts = np.bincount(y, minlength=len(self.labels)).astype(np.float64)
+        feature_counts = np.zeros((self.n_features, len(self.labels)), dtype=np.float64)
+        np.add.at(feature_counts, (cols, y[rows]), counts)
+
+        smoothed = feature_counts + alpha
+        self.log_likelihood = (np.log(smoothed) - np.log(smoothed.sum(axis=0))).astype(np.float32)
+        self.log_prior = np.log((class_counts + alpha) / (class_counts.sum() + alpha * len(self.labels))).astype(np.float32)
+        self.fingerprint = self._fingerprint()
+        return self
+
+    def predict(self, texts: List[str]) -> List[str]:
+        if not texts:
+            return []
+        rows, cols, counts = hashed_features(texts, self.n_features)
+        scores = np.tile(self.log_prior, (len(texts), 1))
+        np.add.at(scores, rows, counts[:, None] * self.log_likelihood[cols])
+        return [self.labels[k] for k in scores.argmax(axis=1)]
+
+    def save(self, path: str = MODEL_FILE):
+        np.savez_compressed(
+            path,
+            labels=np.asarray(self.labels),
+            log_prior=self.log_prior,
+            log_likelihood=self.log_likelihood,
+        )
+
+    @classmethod
+    def load(cls, path: str = MODEL_FILE) -> "NaiveBayesClassifier":
+        with np.load(path) as data:
+            log_likelihood = data["log_likelihood"]
+            model = cls(
+                labels=data["labels"].tolist(),
+                log_prior=data["log_prior"],
+                log_likelihood=log_likelihood,
+                n_features=log_likelihood.shape[0],
+            )
+        return model
+
+
+def load_model(path: str = MODEL_FILE):
+    """Charge le modèle, ou None (repli sur le mode mots-clés) s'il n'existe pas"""
+    if not os.path.exists(path):
+        print(f"⚠️  Modèle {path} introuvable : repli sur la classification par mots-clés")
+        return None
+    return NaiveBayesClassifier.load(path)
+
+
+# ==============================
+# DONNÉES D'ENTRAÎNEMENT
+# ==============================
+def load_labeled_changes(directory: str = TRAINING_DIR):
+    texts, labels = [], []
+    for file_path in sorted(Path(directory).glob("*.json")):
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            for detail in item.get("ai_analysis", {}).get("details", []):
+                if detail.get("category") in LABELS:
+                    texts.append(detail["description"])
+                    labels.append(detail["category"])
+    return texts, labels
+
+
+def train(path: str = MODEL_FILE):
+    texts, labels = load_labeled_changes()
+    start = time.perf_counter()
+    model = NaiveBayesClassifier().fit(texts, labels)
+    model.save(path)
+    print(f"✅ Modèle entraîné sur {len(texts)} changements en {time.perf_counter() - start:.2f}s")
+    print(f"💾 Sauvegardé dans: {path} ({os.path.getsize(path) / 1024:.0f} Ko)")
+
+
+def report(path: str = MODEL_FILE):
+    """Compare accord et débit entre le modèle et le vote par mots-clés"""
+    texts, labels = load_labeled_changes()
+
+    start = time.perf_counter()
+    model = NaiveBayesClassifier.load(path)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = model.predict(texts)
+    model_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    keyword = classify_many(texts)
+    keyword_time = time.perf_counter() - start
+
+    agreement = sum(p == k for p, k in zip(predicted, keyword)) / len(texts) * 100
+    vs_labels = sum(p == l for p, l in zip(predicted, labels)) / len(texts) * 100
+
+    result = {
+        "changes": len(texts),
+        "model_load_ms": round(load_time * 1000, 2),
+        "agreement_with_keywords_pct": round(agreement, 2),
+        "agreement_with_stored_labels_pct": round(vs_labels, 2),
+        "model_lines_per_sec": round(len(texts) / model_time) if model_time else None,
+        "keyword_lines_per_sec": round(len(texts) / keyword_time) if keyword_time else None,
+    }
+
+    print("📊 MODÈLE vs MOTS-CLÉS")
+    print("=" * 50)
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classifieur Naive Bayes des changements")
+    parser.add_argument("command", choices=["train", "report"])
+    parser.add_argument("--model", default=MODEL_FILE)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.model)
+    else:
+        report(args.model)
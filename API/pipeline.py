@@ -0,0 +1,289 @@
+"""
+Pipeline fusionné : sources/ → output/ (→ MongoDB) dans un seul processus.
+
+Enchaînés par le scheduler, clean.py, etape2.py, ACID.py, alert.py,
+innovation.py, remove-changes.py et sync.py démarrent chacun un
+interpréteur et relisent puis réécrivent tout le dossier output. Ici,
+les patches sont chargés une seule fois et traversent les étapes en
+mémoire :
+
+    clean → classify → acid → alerts → innovation → write → sync
+
+Les fichiers de sortie ne sont écrits qu'une fois, à la fin. La
+projection de sortie (voir projection.py : retrait de 'changes') est
+appliquée pendant l'écriture et l'envoi à MongoDB, sans copier les
+documents. Le temps de
+chaque étape est affiché ; --dump-dir conserve l'état des données après
+chaque étape pour le débogage.
+
+Le scheduler lance une chaîne par base en parallèle (--dataset, sans
+synchronisation), puis une jointure (--join) qui relit output/, produit
+la synthèse globale des innovations et synchronise MongoDB.
+
+Usage :
+    python pipeline.py                          # pipeline complet
+    python pipeline.py --no-sync                # sans MongoDB
+    python pipeline.py --dump-dir pipeline_debug
+    python pipeline.py --workers 4 --full
+    python pipeline.py --dataset tidb-versions --no-sync
+    python pipeline.py --join
+"""
+
+import argparse
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import codec
+import etape2
+from ACID import AcidConsistencyAdderSimple
+from alert import AlertsAdder
+from backup_store import BackupStore
+from clean import clean_documents
+from enrichment_manifest import EnrichmentManifest
+from innovation import InnovationSummaryGenerator
+from projection import Projection, output_projection
+import stage_metrics
+from scanner import close_cache, enable_cache
+
+# Jeux de données de sources/ nettoyés par clean.py
+CLEAN_FILES = ["mongodb-versions"]
+
+# nom du jeu de données (fichier sans extension) → liste de patches
+# (ou patch unique pour les fichiers objet)
+Datasets = Dict[str, Any]
+
+
+def count_documents(datasets: Datasets) -> int:
+    return sum(len(data) if isinstance(data, list) else 1 for data in datasets.values())
+
+
+def write_datasets(datasets: Datasets, directory: str, projection: Optional[Projection] = None):
+    """Écrit chaque jeu de données dans le format choisi (voir codec.py), projeté à la volée"""
+    os.makedirs(directory, exist_ok=True)
+    for name, data in datasets.items():
+        path = codec.dataset_path(directory, name)
+        if not projection:
+            codec.dump(data, path)
+            continue
+
+        projection.reset()
+        if isinstance(data, list):
+            with codec.open_writer(path) as writer:
+                writer.write_all(projection.iter(data))
+        else:
+            codec.dump(projection.apply(data), path)
+        if projection.dropped:
+            print(projection.report(path.name))
+
+
+class FusedPipeline:
+    def __init__(self, input_dir: str = etape2.INPUT_DIR, output_dir: str = etape2.OUTPUT_DIR,
+                 workers: int = 1, incremental: bool = True, sync: bool = True,
+                 dump_dir: Optional[str] = None, datasets: Optional[Iterable[str]] = None,
+                 join: bool = False):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.workers = workers
+        self.sync_enabled = sync
+        self.dump_dir = dump_dir
+        # Jeux de données traités (None = tous) ; la synthèse globale
+        # des innovations n'a de sens que sur l'ensemble des bases
+        self.only = set(datasets) if datasets else None
+        self.join = join
+        # Un seul manifeste partagé : chaque étape y suit ses propres hashes
+        self.manifest = EnrichmentManifest() if incremental else None
+        self.projection = output_projection()
+        self.timings: List[Tuple[str, float, int]] = []
+
+    # ==============================
+    # ÉTAPES
+    # ==============================
+    def load(self, datasets: Datasets, directory: Optional[str] = None) -> Datasets:
+        for path in codec.dataset_files(directory or self.input_dir):
+            if self.only is not None and codec.dataset_name(path) not in self.only:
+                continue
+            data = codec.load(path)
+            if not isinstance(data, (list, dict)):
+                print(f"❌ Format inconnu : {path.name}")
+                continue
+            datasets[codec.dataset_name(path)] = data
+        return datasets
+
+    def clean(self, datasets: Datasets) -> Datasets:
+        for name in CLEAN_FILES:
+            if isinstance(datasets.get(name), list):
+                datasets[name] = list(clean_documents(datasets[name]))
+        return datasets
+
+    def classify(self, datasets: Datasets) -> Datasets:
+        executor = etape2.make_executor(self.workers)
+        try:
+            for name, data in datasets.items():
+                if not isinstance(data, list):
+                    datasets[name] = etape2.analyze_patch(data)
+                elif self.manifest is not None:
+                    previous = etape2.load_previous_output(codec.find_dataset(self.output_dir, name))
+                    datasets[name] = etape2.analyze_incremental(data, previous, self.manifest, executor, self.workers)
+                else:
+                    datasets[name] = etape2.analyze_patches(data, executor, self.workers)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return datasets
+
+    def enrich(self, datasets: Datasets, adder) -> Datasets:
+        """Applique un enrichisseur (ACID, alertes, innovations) aux fichiers tableau"""
+        adder.manifest = self.manifest
+        for name, data in datasets.items():
+            if isinstance(data, list):
+                datasets[name] = [adder.enrich_version(version_data) for version_data in data]
+        return datasets
+
+    def acid(self, datasets: Datasets) -> Datasets:
+        return self.enrich(datasets, AcidConsistencyAdderSimple(self.output_dir, incremental=False))
+
+    def alerts(self, datasets: Datasets) -> Datasets:
+        return self.enrich(datasets, AlertsAdder(self.output_dir, incremental=False))
+
+    def innovation(self, datasets: Datasets) -> Datasets:
+        generator = InnovationSummaryGenerator(self.output_dir, incremental=False)
+        self.enrich(datasets, generator)
+        if self.only is None:
+            generator.generate_global_summary(datasets.items())
+        return datasets
+
+    def load_output(self, datasets: Datasets) -> Datasets:
+        return self.load(datasets, self.output_dir)
+
+    def innovation_summary(self, datasets: Datasets) -> Datasets:
+        InnovationSummaryGenerator(self.output_dir, incremental=False).generate_global_summary(datasets.items())
+        return datasets
+
+    def write(self, datasets: Datasets) -> Datasets:
+        if os.path.isdir(self.output_dir):
+            if self.only is None:
+                BackupStore().snapshot("pipeline", self.output_dir)
+            else:
+                paths = [codec.find_dataset(self.output_dir, name) for name in sorted(self.only)]
+                names = [path.name for path in paths if path is not None]
+                BackupStore().snapshot("pipeline-" + "+".join(sorted(self.only)), self.output_dir, names)
+        write_datasets(datasets, self.output_dir, self.projection)
+        if self.manifest is not None:
+            self.manifest.save()
+        print(f"💾 {len(datasets)} fichier(s) écrit(s) dans: {self.output_dir}")
+        return datasets
+
+    def sync(self, datasets: Datasets) -> Datasets:
+        import sync  # pymongo n'est nécessaire que pour cette étape
+
+        try:
+            sync.sync_new_patches(
+                {name: self.projection.iter(data if isinstance(data, list) else [data])
+                 for name, data in datasets.items()},
+                close_client=False,
+            )
+            sync.show_sync_stats()
+            sync.check_duplicates()
+            sync.generate_comprehensive_stats()
+        finally:
+            sync.close_repository()
+        return datasets
+
+    # ==============================
+    # EXÉCUTION
+    # ==============================
+    def stages(self):
+        if self.join:
+            stages = [
+                ("load_output", self.load_output),
+                ("innovation_summary", self.innovation_summary),
+            ]
+            if self.sync_enabled:
+                stages.append(("sync", self.sync))
+            return stages
+
+        stages = [
+            ("load", self.load),
+            ("clean", self.clean),
+            ("classify", self.classify),
+            ("acid", self.acid),
+            ("alerts", self.alerts),
+            ("innovation", self.innovation),
+            ("write", self.write),
+        ]
+        if self.sync_enabled:
+            stages.append(("sync", self.sync))
+        return stages
+
+    def run(self) -> Datasets:
+        manifest_stages = {"classify": "etape2", "acid": "acid", "alerts": "alerts", "innovation": "innovation"}
+        datasets: Datasets = {}
+
+        for index, (name, stage) in enumerate(self.stages()):
+            print(f"\n▶️  Étape {name}")
+            if self.manifest is not None:
+                self.manifest.reused = self.manifest.processed = 0
+
+            start = time.perf_counter()
+            datasets = stage(datasets)
+            elapsed = time.perf_counter() - start
+            self.timings.append((name, elapsed, count_documents(datasets)))
+            stage_metrics.record_substage(name, elapsed, self.timings[-1][2])
+
+            if self.manifest is not None and name in manifest_stages:
+                print(self.manifest.report(manifest_stages[name]))
+            if self.dump_dir and name not in ("write", "sync"):
+                write_datasets(datasets, os.path.join(self.dump_dir, f"{index:02d}_{name}"))
+
+        self.print_timings()
+        return datasets
+
+    def print_timings(self):
+        print("\n" + "=" * 50)
+        print("⏱️  TEMPS PAR ÉTAPE")
+        print("=" * 50)
+        for name, elapsed, documents in self.timings:
+            print(f"  {name:<14} {elapsed:8.2f}s   {documents} documents")
+        print(f"  {'TOTAL':<14} {sum(t for _, t, _ in self.timings):8.2f}s")
+
+
+# ==============================
+# POINT D'ENTRÉE
+# ==============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline fusionné en mémoire (sources/ → output/ → MongoDB)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="nombre de processus pour la classification (défaut : 1, série)")
+    parser.add_argument("--classifier", choices=["keyword", "model"], default="keyword",
+                        help="vote par mots-clés (défaut) ou modèle Naive Bayes entraîné")
+    parser.add_argument("--model", default="nb_model.npz", help="fichier du modèle pour --classifier model")
+    parser.add_argument("--full", action="store_true",
+                        help="retraite tous les patches sans consulter enrichment_manifest.json")
+    parser.add_argument("--format", choices=list(codec.FORMATS), default=codec.FORMAT,
+                        help="format des fichiers écrits dans output/ (défaut : $PIPELINE_FORMAT ou json)")
+    parser.add_argument("--no-sync", action="store_true", help="n'envoie rien vers MongoDB")
+    parser.add_argument("--dump-dir", help="écrit l'état des fichiers après chaque étape dans ce dossier")
+    parser.add_argument("--dataset", action="append",
+                        help="ne traite que ce jeu de données (ex. tidb-versions) ; répétable")
+    parser.add_argument("--join", action="store_true",
+                        help="relit output/ : synthèse globale des innovations et synchronisation seulement")
+    args = parser.parse_args()
+    codec.set_format(args.format)
+
+    if args.classifier == "model":
+        from nb_classifier import load_model
+        etape2.CLASSIFIER = load_model(args.model)
+
+    print("🚀 Démarrage du pipeline fusionné...")
+    enable_cache()
+    FusedPipeline(
+        workers=args.workers,
+        incremental=not args.full,
+        sync=not args.no_sync,
+        dump_dir=args.dump_dir,
+        datasets=args.dataset,
+        join=args.join,
+    ).run()
+    close_cache()
+    print("\n🎯 Pipeline terminé. Fichiers enrichis dans /output")
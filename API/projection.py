@@ -0,0 +1,131 @@
+"""
+Projection déclarative des documents : champs retirés ou conservés.
+
+La projection est appliquée au moment d'écrire un document (fichier de
+output/ ou lot MongoDB), sans copie profonde : seuls les dictionnaires
+situés sur le chemin d'un champ retiré sont recopiés (copie
+superficielle), le reste de l'arbre est partagé avec le document
+d'origine.
+
+Un champ est un chemin pointé ; une liste rencontrée en chemin est
+parcourue élément par élément :
+
+    Projection(drop=["changes"])                    # clé de premier niveau
+    Projection(drop=["alerts.alerts.type"])         # dans chaque alerte
+    Projection(keep=["database", "patch_version", "ai_analysis.summary"])
+
+Les octets économisés sont estimés d'après la taille JSON des valeurs
+retirées.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Champs retirés des documents écrits dans output/ et envoyés à MongoDB :
+# 'changes' est repris à l'identique par ai_analysis.details
+OUTPUT_PROJECTION = {"drop": ["changes"]}
+
+
+def _tree(fields: Iterable[str]) -> Dict:
+    """["a.b", "c"] → {"a": {"b": True}, "c": True}"""
+    tree: Dict = {}
+    for field in fields:
+        node = tree
+        parts = field.split(".")
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[parts[-1]] = True
+    return tree
+
+
+def _encoded_size(key: str, value: Any) -> int:
+    # "clé": valeur, → guillemets, deux-points et séparateur
+    return len(key.encode("utf-8")) + 4 + len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class Projection:
+    def __init__(self, drop: Iterable[str] = (), keep: Optional[Iterable[str]] = None):
+        self.drop_fields: List[str] = list(drop)
+        self.keep_fields: Optional[List[str]] = list(keep) if keep is not None else None
+        self.drop_tree = _tree(self.drop_fields)
+        self.keep_tree = _tree(self.keep_fields) if self.keep_fields is not None else None
+        self.dropped = 0
+        self.saved_bytes = 0
+
+    @classmethod
+    def from_spec(cls, spec: Dict) -> "Projection":
+        return cls(spec.get("drop", ()), spec.get("keep"))
+
+    def __bool__(self):
+        return bool(self.drop_tree) or self.keep_tree is not None
+
+    def __repr__(self):
+        return f"Projection(drop={self.drop_fields}, keep={self.keep_fields})"
+
+    # ==============================
+    # APPLICATION
+    # ==============================
+    def _drop(self, obj: Any, tree: Dict) -> Any:
+        if isinstance(obj, list):
+            return [self._drop(item, tree) for item in obj]
+        if not isinstance(obj, dict):
+            return obj
+
+        projected = None
+        for key, sub in tree.items():
+            if key not in obj:
+                continue
+            if projected is None:
+                projected = dict(obj)
+            if sub is True:
+                self.dropped += 1
+                self.saved_bytes += _encoded_size(key, projected.pop(key))
+            else:
+                projected[key] = self._drop(obj[key], sub)
+        return obj if projected is None else projected
+
+    def _keep(self, obj: Any, tree: Dict) -> Any:
+        if isinstance(obj, list):
+            return [self._keep(item, tree) for item in obj]
+        if not isinstance(obj, dict):
+            return obj
+
+        projected = {}
+        for key, value in obj.items():
+            sub = tree.get(key)
+            if sub is None:
+                self.dropped += 1
+                self.saved_bytes += _encoded_size(key, value)
+            else:
+                projected[key] = value if sub is True else self._keep(value, sub)
+        return projected
+
+    def apply(self, doc: Any) -> Any:
+        """Document projeté ; l'original n'est pas modifié"""
+        if self.keep_tree is not None:
+            doc = self._keep(doc, self.keep_tree)
+        if self.drop_tree:
+            doc = self._drop(doc, self.drop_tree)
+        return doc
+
+    def iter(self, docs: Iterable[Any]) -> Iterator[Any]:
+        for doc in docs:
+            yield self.apply(doc)
+
+    # ==============================
+    # COMPTEURS
+    # ==============================
+    def reset(self):
+        self.dropped = 0
+        self.saved_bytes = 0
+
+    def report(self, name: str) -> str:
+        return f"✂️  {name} : {self.dropped} champ(s) retiré(s), ~{self.saved_bytes / 1024:.0f} Ko économisés"
+
+
+def output_projection() -> Projection:
+    return Projection.from_spec(OUTPUT_PROJECTION)
@@ -1,87 +1,85 @@
-import json
-import os
+import argparse
 from pathlib import Path
 
-def remove_changes_key_from_json_files():
-    """Supprime la clé 'changes' de tous les fichiers JSON dans le dossier output"""
-    
+import codec
+from projection import OUTPUT_PROJECTION, Projection
+
+def remove_changes_key_from_json_files(projection=None):
+    """Applique la projection (par défaut : retire 'changes') à tous les fichiers du dossier output"""
+
     output_dir = Path("output")
-    
+    projection = projection or Projection.from_spec(OUTPUT_PROJECTION)
+
     if not output_dir.exists():
         print(f"Le dossier {output_dir} n'existe pas.")
         return
-    
-    json_files = list(output_dir.glob("*.json"))
-    
+
+    json_files = codec.dataset_files(output_dir)
+
     if not json_files:
         print(f"Aucun fichier JSON trouvé dans {output_dir}")
         return
-    
-    print(f"Traitement de {len(json_files)} fichiers JSON...")
-    
+
+    print(f"Traitement de {len(json_files)} fichiers JSON ({projection})...")
+
     for json_file in json_files:
         print(f"\nTraitement de: {json_file.name}")
-        
+
         try:
-            # Lire le fichier JSON
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Compter les occurrences de la clé 'changes' avant suppression
-            changes_count = count_nested_keys(data, 'changes')
-            print(f"  Clés 'changes' trouvées: {changes_count}")
-            
-            # Supprimer récursivement toutes les clés 'changes'
-            data_modified = remove_key_recursively(data, 'changes')
-            
-            # Compter les occurrences après suppression pour vérification
-            changes_count_after = count_nested_keys(data_modified, 'changes')
-            
-            if changes_count > 0:
-                # Écrire le fichier modifié
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(data_modified, f, indent=2, ensure_ascii=False)
-                
-                print(f"  ✅ {changes_count} clé(s) 'changes' supprimée(s)")
+            if codec.is_array(json_file):
+                dropped = project_streaming(json_file, projection)
+            else:
+                dropped = project_whole_file(json_file, projection)
+
+            if dropped > 0:
+                print(f"  {projection.report(json_file.name)}")
                 print(f"  Fichier sauvegardé: {json_file}")
             else:
-                print(f"  ℹ️  Aucune clé 'changes' à supprimer")
-                
+                print(f"  ℹ️  Aucun champ à retirer")
+
         except Exception as e:
             print(f"  ❌ Erreur lors du traitement de {json_file}: {e}")
 
-def remove_key_recursively(obj, key_to_remove):
-    """Supprime récursivement une clé d'un objet JSON imbriqué"""
-    if isinstance(obj, dict):
-        # Créer une copie du dictionnaire sans la clé à supprimer
-        new_dict = {}
-        for key, value in obj.items():
-            if key != key_to_remove:
-                # Appliquer récursivement sur les valeurs
-                new_dict[key] = remove_key_recursively(value, key_to_remove)
-        return new_dict
-    elif isinstance(obj, list):
-        # Appliquer récursivement sur chaque élément de la liste
-        return [remove_key_recursively(item, key_to_remove) for item in obj]
+def project_streaming(json_file, projection):
+    """Projette une liste de patches lue et réécrite document par document"""
+    projection.reset()
+    writer = codec.open_writer(json_file)
+
+    try:
+        writer.write_all(projection.iter(codec.iter_array(json_file)))
+    except Exception:
+        writer.abort()
+        raise
+
+    if projection.dropped > 0:
+        writer.close()
     else:
-        # Retourner les valeurs primitives inchangées
-        return obj
-
-def count_nested_keys(obj, key_to_count):
-    """Compte le nombre d'occurrences d'une clé dans un objet JSON imbriqué"""
-    count = 0
-    if isinstance(obj, dict):
-        for key, value in obj.items():
-            if key == key_to_count:
-                count += 1
-            count += count_nested_keys(value, key_to_count)
-    elif isinstance(obj, list):
-        for item in obj:
-            count += count_nested_keys(item, key_to_count)
-    return count
+        # Rien à retirer : le fichier d'origine reste intact
+        writer.abort()
+
+    return projection.dropped
+
+def project_whole_file(json_file, projection):
+    """Cas d'un fichier qui n'est pas un tableau (objet unique)"""
+    projection.reset()
+    projected = projection.apply(codec.load(json_file))
+
+    if projection.dropped > 0:
+        codec.dump(projected, json_file)
+
+    return projection.dropped
 
 if __name__ == "__main__":
-    print("🗑️  Suppression de la clé 'changes' des fichiers JSON")
+    parser = argparse.ArgumentParser(description="Retire des champs des fichiers du dossier output")
+    parser.add_argument("--drop", action="append", help="champ à retirer (chemin pointé) ; répétable")
+    parser.add_argument("--keep", action="append", help="champ à conserver, tous les autres sont retirés ; répétable")
+    args = parser.parse_args()
+
+    projection = None
+    if args.drop or args.keep:
+        projection = Projection(args.drop or (), args.keep)
+
+    print("🗑️  Projection des fichiers JSON (par défaut : suppression de la clé 'changes')")
     print("=" * 50)
-    remove_changes_key_from_json_files()
+    remove_changes_key_from_json_files(projection)
     print("\n✅ Opération terminée!")
@@ -0,0 +1,113 @@
+"""
+Cache persistant des enregistrements du scanner (voir scanner.py).
+
+Les anciennes notes de patch ne changent jamais : d'une exécution à
+l'autre, la plupart des lignes ont déjà été classées. Chaque ligne est
+identifiée par le hash de sa description normalisée (minuscules) et
+chaque partie de l'enregistrement est stockée séparément avec
+l'empreinte du dictionnaire qui l'a produite :
+
+    category   → CATEGORIES (etape2)
+    acid       → ACID_KEYWORDS
+    alert      → mots-clés d'alerte et de niveau
+    innovation → INNOVATION_CATEGORIES
+
+Modifier une liste de mots-clés n'invalide donc que les entrées de la
+partie concernée : seules les parties périmées sont recalculées (voir
+scanner.scan_change), les autres sont relues du cache.
+"""
+
+import hashlib
+import json
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+CACHE_FILE = "scan_cache.sqlite"
+
+# Champs de l'enregistrement portés par chaque partie
+PARTS = {
+    "category": ["category"],
+    "acid": ["acid"],
+    "alert": ["alert_level", "alert_types"],
+    "innovation": ["innovations"],
+}
+
+
+def fingerprint(data) -> str:
+    """Empreinte stable d'un dictionnaire de mots-clés (l'ordre compte)"""
+    return hashlib.sha1(json.dumps(data, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def description_hash(text: str) -> str:
+    return hashlib.sha1(text.lower().encode("utf-8")).hexdigest()
+
+
+class ScanCache:
+    def __init__(self, fingerprints: Dict[str, str], path: str = CACHE_FILE, commit_every: int = 5000):
+        self.path = path
+        self.fingerprints = fingerprints
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.pending = 0
+
+        # timeout : plusieurs processus (etape2 --workers) peuvent écrire en même temps
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " hash TEXT NOT NULL,"
+            " part TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (hash, part)) WITHOUT ROWID"
+        )
+
+    def get(self, text: str) -> Tuple[Dict, List[str]]:
+        """(champs des parties à jour, parties à recalculer) ; hit si aucune partie n'est périmée"""
+        rows = self.conn.execute(
+            "SELECT part, fingerprint, value FROM entries WHERE hash = ?",
+            (description_hash(text),)
+        ).fetchall()
+
+        record = {}
+        current = set()
+        for part, fp, value in rows:
+            if part in PARTS and self.fingerprints.get(part) == fp:
+                record.update(json.loads(value))
+                current.add(part)
+
+        stale = [part for part in PARTS if part not in current]
+        if stale:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record, stale
+
+    def put(self, text: str, record: Dict, parts: Optional[List[str]] = None):
+        """Enregistre les parties données (toutes par défaut) avec l'empreinte courante"""
+        key = description_hash(text)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO entries (hash, part, fingerprint, value) VALUES (?, ?, ?, ?)",
+            [
+                (key, part, self.fingerprints[part],
+                 json.dumps({field: record[field] for field in PARTS[part]}, ensure_ascii=False))
+                for part in (parts or PARTS)
+            ]
+        )
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.conn.commit()
+            self.pending = 0
+
+    def flush(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0
+        return f"💾 Cache de classification : {self.hits} hits, {self.misses} misses ({rate:.1f}% de hits)"
+
+    def close(self):
+        self.flush()
+        self.conn.close()
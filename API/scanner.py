@@ -0,0 +1,265 @@
+"""
+Scanner unique des lignes de changement.
+
+Chaque description est mise en minuscules et parcourue une seule fois
+pour produire un enregistrement partagé par toutes les étapes
+d'enrichissement :
+
+    {
+        "category": "bug_fix",              # etape2 (mots entiers)
+        "acid": True,                        # ACID.py (sous-chaînes)
+        "alert_level": "critical",           # alert.py
+        "alert_types": ["critical_change"],  # alert.py
+        "innovations": ["vector_search"],    # innovation.py
+    }
+
+Les mots-clés ACID, alertes et innovations sont recherchés comme
+sous-chaînes (``keyword in text``) : ils sont fusionnés dans une seule
+regex en trie, appliquée en lookahead pour trouver aussi les
+correspondances qui se chevauchent. Le coût par ligne dépend donc de
+la longueur de la ligne et non plus du nombre de dictionnaires.
+"""
+
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from scan_cache import CACHE_FILE, PARTS, ScanCache, fingerprint
+
+# ==============================
+# RECHERCHE DE SOUS-CHAÎNES EN UN PASSAGE
+# ==============================
+def _trie_pattern(words: List[str]) -> str:
+    """Construit une alternance en trie, la plus longue correspondance d'abord"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Quantificateur gourmand : la branche la plus longue est essayée en premier
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class SubstringMatcher:
+    """Trouve tous les mots-clés présents comme sous-chaînes d'un texte.
+
+    Le lookahead ``(?=(...))`` teste chaque position du texte et renvoie
+    le plus long mot-clé qui y commence ; les mots-clés qui en sont des
+    préfixes stricts commencent à la même position et sont ajoutés via
+    une table précalculée.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted(set(keywords))
+        self.pattern = re.compile("(?=(" + _trie_pattern(self.keywords) + "))") if self.keywords else None
+        self.prefixes = {
+            kw: [other for other in self.keywords if other != kw and kw.startswith(other)]
+            for kw in self.keywords
+        }
+
+    def find(self, text: str) -> Set[str]:
+        if self.pattern is None:
+            return set()
+        found = set()
+        for match in self.pattern.finditer(text):
+            kw = match.group(1)
+            if kw not in found:
+                found.add(kw)
+                found.update(self.prefixes[kw])
+        return found
+
+
+# ==============================
+# SCANNER PARTAGÉ
+# ==============================
+class ChangeScanner:
+    def __init__(self, category_matcher, acid_keywords: List[str], alert_keywords: Dict[str, List[str]],
+                 alert_level_keywords: Dict[str, List[str]], innovation_categories: Dict[str, Dict]):
+        self.category_matcher = category_matcher
+        self.alert_keywords = alert_keywords
+        self.alert_level_keywords = alert_level_keywords
+
+        # mot-clé → groupes auxquels il appartient (avec multiplicité pour les innovations)
+        self.acid_keywords = set(acid_keywords)
+        self.alert_groups = defaultdict(set)
+        for alert_type, keywords in alert_keywords.items():
+            for kw in keywords:
+                self.alert_groups[kw].add(alert_type)
+        self.level_groups = defaultdict(set)
+        for level, keywords in alert_level_keywords.items():
+            for kw in keywords:
+                self.level_groups[kw].add(level)
+        self.innovation_categories = list(innovation_categories)
+        self.innovation_groups = defaultdict(lambda: defaultdict(int))
+        for category, config in innovation_categories.items():
+            for kw in config["keywords"]:
+                self.innovation_groups[kw][category] += 1
+
+        self.substrings = SubstringMatcher(
+            list(self.acid_keywords) + list(self.alert_groups) + list(self.level_groups) + list(self.innovation_groups)
+        )
+
+    def _alert_level(self, found: Set[str], alert_types: List[str]):
+        matched_levels = set()
+        for kw in found:
+            matched_levels.update(self.level_groups.get(kw, ()))
+        for level in self.alert_level_keywords:
+            if level in matched_levels:
+                return level
+        if alert_types:
+            return 'low'
+        return None
+
+    def _innovations(self, found: Set[str]) -> List[str]:
+        matches = defaultdict(int)
+        specific = set()
+        for kw in found:
+            for category, n in self.innovation_groups.get(kw, {}).items():
+                matches[category] += n
+                if len(kw) > 3:
+                    specific.add(category)
+        # Au moins 2 mots-clés ou 1 mot-clé très spécifique (plus de 3 caractères)
+        return [
+            category for category in self.innovation_categories
+            if matches[category] >= 2 or (matches[category] >= 1 and category in specific)
+        ]
+
+    def scan(self, text: str, parts=PARTS) -> Dict:
+        """Enregistrement de la ligne, limité aux parties demandées (voir scan_cache.PARTS).
+
+        La recherche de sous-chaînes (ACID, alertes, innovations) n'est
+        faite que si l'une de ces parties est demandée.
+        """
+        text_lower = text.lower()
+        record = {}
+        if "category" in parts:
+            record["category"] = self.category_matcher.classify(text_lower)
+        if not any(part in parts for part in ("acid", "alert", "innovation")):
+            return record
+
+        found = self.substrings.find(text_lower)
+        if "acid" in parts:
+            record["acid"] = not found.isdisjoint(self.acid_keywords)
+        if "alert" in parts:
+            matched_alerts = set()
+            for kw in found:
+                matched_alerts.update(self.alert_groups.get(kw, ()))
+            alert_types = [t for t in self.alert_keywords if t in matched_alerts]
+            record["alert_level"] = self._alert_level(found, alert_types)
+            record["alert_types"] = alert_types
+        if "innovation" in parts:
+            record["innovations"] = self._innovations(found)
+        return record
+
+
+# Format des sections enrichies : une entrée par description (voir
+# iter_descriptions). Ajouté à l'empreinte du manifeste d'enrichissement
+# pour que les documents de l'ancien format soient recalculés.
+SECTION_FORMAT = ":single-source"
+
+
+def iter_descriptions(version_data: Dict) -> Iterator[Tuple[str, Optional[str]]]:
+    """(description, catégorie etape2) de chaque ligne de changement, une seule fois.
+
+    ai_analysis.details reprend exactement la liste 'changes' avec la
+    catégorie de chaque ligne : les détails sont parcourus d'abord, puis
+    les changements qui n'y figurent pas (patch non classé, catégorie
+    None). Les descriptions en double ne sont rendues qu'une fois.
+    """
+    seen = set()
+    for detail in version_data.get('ai_analysis', {}).get('details', []):
+        description = detail.get('description')
+        if isinstance(description, str) and description not in seen:
+            seen.add(description)
+            yield description, detail.get('category')
+    for change in version_data.get('changes', []):
+        if isinstance(change, str) and change not in seen:
+            seen.add(change)
+            yield change, None
+
+
+_SCANNER = None
+_CACHE: Optional[ScanCache] = None
+_CACHE_PID: Optional[int] = None
+# Cache hérité du parent par fork : gardé en vie mais jamais utilisé
+# (une connexion SQLite ne doit pas servir dans deux processus)
+_INHERITED: List[ScanCache] = []
+
+
+def get_scanner() -> ChangeScanner:
+    """Scanner construit une fois par processus à partir des dictionnaires des étapes"""
+    global _SCANNER
+    if _SCANNER is None:
+        from etape2 import CATEGORIES, MATCHER
+        from ACID import ACID_KEYWORDS
+        from alert import VULNERABILITY_KEYWORDS, PERFORMANCE_KEYWORDS, CRITICAL_KEYWORDS, ALERT_LEVEL_KEYWORDS
+        from innovation import INNOVATION_CATEGORIES
+
+        alert_keywords = {
+            'vulnerability': VULNERABILITY_KEYWORDS,
+            'performance': PERFORMANCE_KEYWORDS,
+            'critical_change': CRITICAL_KEYWORDS,
+        }
+        _SCANNER = ChangeScanner(MATCHER, ACID_KEYWORDS, alert_keywords, ALERT_LEVEL_KEYWORDS, INNOVATION_CATEGORIES)
+        _SCANNER.fingerprints = {
+            "category": fingerprint(CATEGORIES),
+            "acid": fingerprint(ACID_KEYWORDS),
+            "alert": fingerprint([alert_keywords, ALERT_LEVEL_KEYWORDS]),
+            "innovation": fingerprint({c: config["keywords"] for c, config in INNOVATION_CATEGORIES.items()}),
+        }
+    return _SCANNER
+
+
+def enable_cache(path: str = CACHE_FILE) -> ScanCache:
+    """Active le cache persistant pour les appels suivants à scan_change"""
+    global _CACHE, _CACHE_PID
+    if _CACHE is not None and _CACHE_PID != os.getpid():
+        _INHERITED.append(_CACHE)
+        _CACHE = None
+    if _CACHE is None:
+        _CACHE = ScanCache(get_scanner().fingerprints, path)
+        _CACHE_PID = os.getpid()
+    return _CACHE
+
+
+def current_cache() -> Optional[ScanCache]:
+    return _CACHE
+
+
+def close_cache():
+    """Enregistre le cache sur disque et affiche les compteurs hits/misses"""
+    global _CACHE
+    if _CACHE is not None:
+        print(_CACHE.report())
+        _CACHE.close()
+        _CACHE = None
+
+
+@lru_cache(maxsize=65536)
+def scan_change(text: str) -> Dict:
+    """Enregistrement d'une ligne, mémorisé pour les étapes du même processus.
+
+    Le dictionnaire renvoyé est partagé : ne pas le modifier.
+    """
+    if _CACHE is None:
+        return get_scanner().scan(text)
+
+    # Seules les parties dont le dictionnaire a changé sont recalculées
+    record, stale = _CACHE.get(text)
+    if stale:
+        record.update(get_scanner().scan(text, stale))
+        _CACHE.put(text, record, stale)
+    return record
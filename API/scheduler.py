@@ -1,22 +1,33 @@
+import argparse
 import schedule
 import time
 import subprocess
 import sys
 import os
+import tempfile
+import threading
 from datetime import datetime
 
+import codec
+import stage_metrics
+from change_manifest import ChangeManifest
+from job_graph import JobGraph, Task
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE = os.path.join(BASE_DIR, "scheduler.log")
 
-SCRAPERS = [
-    "../scrapping/db_scraper/db_scraper/spiders/Cassandra/Cassandra.py",
-    "../scrapping/db_scraper/db_scraper/spiders/mongodb/mongodb.py",
-    "../scrapping/db_scraper/db_scraper/spiders/redis/redis.py",
-    "../scrapping/db_scraper/db_scraper/spiders/tidb/tidb.py",
-    "../scrapping/db_scraper/db_scraper/spiders/yugabyte/yugabyte.py",
-    "../scrapping/db_scraper/db_scraper/spiders/Neo4j/Neo4j.py",
-    "../scrapping/db_scraper/db_scraper/spiders/cockroachdb/cockroachdb.py",
-]
+# Scraper de chaque jeu de données de sources/
+DATABASE_SCRAPERS = {
+    "cassandra-versions": "../scrapping/db_scraper/db_scraper/spiders/Cassandra/Cassandra.py",
+    "mongodb-versions": "../scrapping/db_scraper/db_scraper/spiders/mongodb/mongodb.py",
+    "redis-versions": "../scrapping/db_scraper/db_scraper/spiders/redis/redis.py",
+    "tidb-versions": "../scrapping/db_scraper/db_scraper/spiders/tidb/tidb.py",
+    "yugabyte-versions": "../scrapping/db_scraper/db_scraper/spiders/yugabyte/yugabyte.py",
+    "neo4j-versions": "../scrapping/db_scraper/db_scraper/spiders/Neo4j/Neo4j.py",
+    "cockroachdb-versions": "../scrapping/db_scraper/db_scraper/spiders/cockroachdb/cockroachdb.py",
+}
+
+SCRAPERS = list(DATABASE_SCRAPERS.values())
 
 PIPELINE = [
     "clean.py",
@@ -29,56 +40,208 @@ PIPELINE = [
     "sync.py",
 ]
 
+# Pipeline fusionné en mémoire (voir pipeline.py) : un seul processus
+# remplace clean → etape2 → ACID → alert → innovation → remove-changes → sync.
+# False = ancienne chaîne PIPELINE, un processus par script.
+FUSED_PIPELINE = True
+FUSED_PIPELINE_SCRIPTS = [
+    "pipeline.py",
+    "etape1.py",
+]
+
+# Job en graphe (voir build_job_graph) : chaque base enchaîne scraper →
+# enrichissement sans attendre les autres ; jointure avant la synchro.
+# False = phases séquentielles (tous les scrapers, puis le pipeline).
+DAG_JOB = True
+MAX_PARALLEL = int(os.environ.get("SCHEDULER_MAX_PARALLEL", "3"))
+SOURCES_DIR = os.path.join(BASE_DIR, "sources")
+
+# Code lu par chaque tâche : une modification relance la tâche même si
+# les données n'ont pas changé (voir change_manifest.py)
+PIPELINE_CODE = [
+    "pipeline.py", "clean.py", "etape2.py", "ACID.py", "alert.py", "innovation.py",
+    "projection.py", "codec.py", "json_stream.py", "scanner.py", "enrichment_manifest.py",
+]
+JOIN_CODE = ["pipeline.py", "innovation.py", "codec.py", "json_stream.py", "projection.py", "sync.py", "storage.py", "mongo.py"]
+REPORT_CODE = ["etape1.py", "codec.py", "json_stream.py"]
+
+# --force : relance toutes les étapes sans consulter le manifeste
+FORCE = False
+
 # ===================== LOG =====================
+_log_lock = threading.Lock()  # les tâches du graphe journalisent depuis plusieurs threads
+
 def log(msg):
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{ts}] {msg}"
-    print(line)
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+    with _log_lock:
+        print(line, flush=True)
+        with open(LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
 
 # ===================== RUN SCRIPT =====================
-def run_script(script_path, stop_on_error=True):
+def run_script(script_path, stop_on_error=True, phase="pipeline", run_id=None, args=(), label=None):
     full_path = os.path.join(BASE_DIR, script_path)
-    log(f"🚀 Lancement : {script_path}")
+    label = label or script_path
+    log(f"🚀 Lancement : {label}")
+
+    # L'enfant écrit ses compteurs (documents, octets) dans ce fichier
+    fd, report_path = tempfile.mkstemp(prefix="stage_metrics_", suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, **{stage_metrics.METRICS_ENV: report_path})
 
+    started = datetime.now()
+    wall_start = time.perf_counter()
     try:
-        subprocess.run(
-            [sys.executable, full_path],
-            check=True
-        )
-        log(f"✅ Terminé : {script_path}")
+        returncode, usage = stage_metrics.run_child([sys.executable, full_path, *args], env)
+    finally:
+        wall = time.perf_counter() - wall_start
+        report = stage_metrics.read_report(report_path)
+        os.remove(report_path)
 
-    except subprocess.CalledProcessError:
-        log(f"❌ ERREUR : {script_path}")
-        if stop_on_error:
-            raise
+    record = {
+        "run_id": run_id,
+        "phase": phase,
+        "stage": label,
+        "status": "ok" if returncode == 0 else f"exit {returncode}",
+        "started": started.isoformat(timespec="seconds"),
+        "wall_s": round(wall, 3),
+        "user_s": None,
+        "sys_s": None,
+        "max_rss_kb": None,
+        "blocks_in": None,
+        "blocks_out": None,
+    }
+    if usage is not None:
+        record.update({
+            "user_s": round(usage.ru_utime, 3),
+            "sys_s": round(usage.ru_stime, 3),
+            "max_rss_kb": usage.ru_maxrss,
+            "blocks_in": usage.ru_inblock,
+            "blocks_out": usage.ru_oublock,
+        })
+    record.update(report.get("counters", {}))
+    stage_metrics.append_record(record)
+
+    # Étapes internes du pipeline fusionné : une ligne chacune
+    for substage in report.get("substages", []):
+        stage_metrics.append_record({
+            "run_id": run_id,
+            "phase": phase,
+            "stage": f"{label}:{substage['stage']}",
+            "status": record["status"],
+            "started": record["started"],
+            "wall_s": substage["wall_s"],
+            "docs_out": substage["docs"],
+        })
+
+    if returncode == 0:
+        log(f"✅ Terminé : {label} ({wall:.1f}s, CPU {(record['user_s'] or 0) + (record['sys_s'] or 0):.1f}s)")
+        return True
+
+    log(f"❌ ERREUR : {label}")
+    if stop_on_error:
+        raise subprocess.CalledProcessError(returncode, full_path)
+    return False
 
 # ===================== JOB =====================
+def build_job_graph():
+    """scrape:<base> → enrich:<base> pour chaque base, puis join (synthèse + synchro) → report
+
+    La jointure tourne même si l'enrichissement d'une base échoue : elle
+    relit output/, où le fichier de cette base est celui du dernier run
+    réussi (pipeline.py n'écrit qu'en fin de traitement). Le job est
+    quand même signalé en échec.
+    """
+    names = list(DATABASE_SCRAPERS)
+    if os.path.isdir(SOURCES_DIR):
+        # Jeux de données sans scraper : enrichis à partir du fichier existant
+        names += sorted({codec.dataset_name(p) for p in codec.dataset_files(SOURCES_DIR)} - set(names))
+
+    tasks = []
+    outputs = []
+    for name in names:
+        deps = []
+        if name in DATABASE_SCRAPERS:
+            tasks.append(Task(f"scrape:{name}", DATABASE_SCRAPERS[name], phase="scraping", required=False))
+            deps = [f"scrape:{name}"]
+        source = codec.find_dataset(SOURCES_DIR, name)
+        source = os.path.relpath(source, BASE_DIR) if source else os.path.join("sources", f"{name}.json")
+        output = os.path.relpath(codec.dataset_path(os.path.join(BASE_DIR, "output"), name), BASE_DIR)
+        outputs.append(output)
+        tasks.append(Task(f"enrich:{name}", "pipeline.py", ["--dataset", name, "--no-sync"], deps=deps,
+                          inputs=[source, *PIPELINE_CODE], outputs=[output]))
+
+    tasks.append(Task("join", "pipeline.py", ["--join"], deps=[f"enrich:{name}" for name in names],
+                      inputs=outputs + JOIN_CODE, outputs=["global_innovation_summary.json"], partial=True))
+    tasks.append(Task("report", "etape1.py", deps=["join"],
+                      inputs=outputs + REPORT_CODE, outputs=["latest_versions_with_classification.json"]))
+    return JobGraph(tasks)
+
+def run_task(task, run_id, manifest=None):
+    """Lance la tâche, sauf si ses entrées n'ont pas changé depuis sa dernière réussite"""
+    if manifest is None or not task.inputs:
+        return run_script(task.script, stop_on_error=False, phase=task.phase,
+                          run_id=run_id, args=task.args, label=task.name)
+
+    # Le format d'écriture change le contenu des sorties : il fait partie de la clé
+    key = " ".join([task.script, *task.args, codec.FORMAT])
+    inputs = manifest.fingerprint(task.inputs)
+    if not FORCE and manifest.is_current(task.name, inputs, task.outputs, key):
+        manifest.touch(task.outputs)
+        log(f"⏩ Inchangée : {task.name} (entrées identiques au dernier run)")
+        stage_metrics.append_record({"run_id": run_id, "phase": task.phase, "stage": task.name,
+                                     "status": "unchanged", "wall_s": 0.0})
+        return True
+
+    ok = run_script(task.script, stop_on_error=False, phase=task.phase,
+                    run_id=run_id, args=task.args, label=task.name)
+    if ok:
+        manifest.record(task.name, inputs, task.outputs, key)
+    return ok
+
 def job():
-    log("===== JOB DÉMARRÉ =====")
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    log(f"===== JOB DÉMARRÉ ({run_id}) =====")
+
+    if DAG_JOB:
+        log(f"GRAPHE : scrapers et pipelines par base, {MAX_PARALLEL} tâche(s) en parallèle")
+        graph = build_job_graph()
+        manifest = ChangeManifest(base_dir=BASE_DIR)
+        status = graph.run(lambda task: run_task(task, run_id, manifest), MAX_PARALLEL, log)
+        failed = [name for name, state in status.items() if state != "ok" and graph.tasks[name].required]
+        log("===== JOB TERMINÉ =====\n")
+        if failed:
+            raise RuntimeError(f"Étapes en échec ou annulées : {', '.join(failed)}")
+        return
 
     log("PHASE 1 : SCRAPPING")
     for s in SCRAPERS:
-        run_script(s, stop_on_error=False)
+        run_script(s, stop_on_error=False, phase="scraping", run_id=run_id)
 
     log("PHASE 2 : PIPELINE")
-    for p in PIPELINE:
-        run_script(p, stop_on_error=True)
+    for p in (FUSED_PIPELINE_SCRIPTS if FUSED_PIPELINE else PIPELINE):
+        run_script(p, stop_on_error=True, phase="pipeline", run_id=run_id)
 
     log("===== JOB TERMINÉ =====\n")
 
 # ===================== SCHEDULE =====================
-# Lancer toutes les 12 heures
-schedule.every(12).hours.do(job)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrapers et pipeline toutes les 12 heures")
+    parser.add_argument("--force", action="store_true",
+                        help="relance toutes les étapes, même si leurs entrées n'ont pas changé")
+    FORCE = parser.parse_args().force
+
+    # Lancer toutes les 12 heures
+    schedule.every(12).hours.do(job)
 
-log("⏱️ Scheduler lancé pour toutes les 12 heures...")
+    log("⏱️ Scheduler lancé pour toutes les 12 heures...")
 
-# ───── PREMIER RUN IMMÉDIAT ─────
-log("⏳ Exécution immédiate du pipeline...")
-job()
+    # ───── PREMIER RUN IMMÉDIAT ─────
+    log("⏳ Exécution immédiate du pipeline...")
+    job()
 
-# ───── BOUCLE DE SCHEDULER ─────
-while True:
-    schedule.run_pending()
-    time.sleep(30)
+    # ───── BOUCLE DE SCHEDULER ─────
+    while True:
+        schedule.run_pending()
+        time.sleep(30)
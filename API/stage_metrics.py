@@ -0,0 +1,194 @@
+"""
+Mesures par étape du scheduler (scrapers et pipeline).
+
+Côté scheduler, chaque script lancé produit une ligne JSON dans
+scheduler_metrics.jsonl : durée, CPU user/sys, blocs disque et pic de
+mémoire RSS de l'enfant (rusage de l'enfant seul via os.wait4, juste
+même quand plusieurs étapes tournent en parallèle), documents lus/écrits
+et octets lus/écrits. Une étape sautée par le manifeste de changements
+(change_manifest.py) est notée "unchanged" et n'entre pas dans la référence.
+
+Côté script, codec.py compte les documents et octets lus/écrits et
+pipeline.py le temps de chaque étape interne. Si la variable
+STAGE_METRICS_FILE est définie (par le scheduler), ces compteurs y sont
+écrits à la fin du processus.
+
+Usage :
+    python stage_metrics.py summary [--baseline 5] [--threshold 0.25]
+"""
+
+import argparse
+import atexit
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows : pas de getrusage, seules les durées sont mesurées
+    resource = None
+
+METRICS_ENV = "STAGE_METRICS_FILE"
+METRICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheduler_metrics.jsonl")
+
+COUNTERS = {"docs_in": 0, "docs_out": 0, "bytes_read": 0, "bytes_written": 0}
+SUBSTAGES: List[Dict] = []
+
+# Mesures comparées par la commande summary
+COMPARED = ("wall_s", "cpu_s", "max_rss_kb")
+# Écart absolu minimal pour signaler une régression (évite le bruit des étapes courtes)
+MIN_DELTA = {"wall_s": 1.0, "cpu_s": 1.0, "max_rss_kb": 20 * 1024}
+
+
+# ==============================
+# COMPTEURS (CÔTÉ SCRIPT)
+# ==============================
+def count(**increments):
+    for key, value in increments.items():
+        COUNTERS[key] += value
+
+
+def record_substage(name: str, wall_s: float, docs: Optional[int] = None):
+    SUBSTAGES.append({"stage": name, "wall_s": round(wall_s, 3), "docs": docs})
+
+
+def _write_report():
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"counters": COUNTERS, "substages": SUBSTAGES}, f)
+
+
+atexit.register(_write_report)
+
+
+def read_report(path: str) -> Dict:
+    """Compteurs écrits par l'enfant, ou rien s'il n'utilise pas codec.py"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+# ==============================
+# LANCEMENT D'UN ENFANT
+# ==============================
+def run_child(cmd, env=None, cwd=None, stdout=None):
+    """Lance l'enfant ; renvoie (code de retour, rusage de l'enfant ou None).
+
+    wait4 donne la consommation de cet enfant seul (processus workers
+    compris) : contrairement aux deltas de getrusage(RUSAGE_CHILDREN), la
+    mesure reste juste quand plusieurs étapes tournent en parallèle, et
+    ru_maxrss est bien le pic de l'étape et non celui de tous les enfants.
+    """
+    if resource is None or not hasattr(os, "wait4"):
+        return subprocess.run(cmd, env=env, cwd=cwd, stdout=stdout).returncode, None
+
+    proc = subprocess.Popen(cmd, env=env, cwd=cwd, stdout=stdout)
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, usage
+
+
+# ==============================
+# JOURNAL (CÔTÉ SCHEDULER)
+# ==============================
+def append_record(record: Dict, path: str = METRICS_FILE):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_runs(path: str = METRICS_FILE) -> "OrderedDict[str, Dict[str, Dict]]":
+    """run_id → {étape: mesure}, dans l'ordre des exécutions"""
+    runs: "OrderedDict[str, Dict[str, Dict]]" = OrderedDict()
+    if not os.path.exists(path):
+        return runs
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            record["cpu_s"] = (record.get("user_s") or 0) + (record.get("sys_s") or 0)
+            runs.setdefault(record["run_id"], {})[record["stage"]] = record
+    return runs
+
+
+def summarize(path: str = METRICS_FILE, baseline: int = 5, threshold: float = 0.25) -> List[Dict]:
+    """Compare la dernière exécution à la médiane des `baseline` précédentes"""
+    runs = load_runs(path)
+    if not runs:
+        print(f"Aucune mesure dans {path}")
+        return []
+
+    run_ids = list(runs)
+    latest_id = run_ids[-1]
+    history = defaultdict(lambda: defaultdict(list))
+    for run_id in run_ids[:-1][-baseline:]:
+        for stage, record in runs[run_id].items():
+            if record.get("status") != "ok":
+                continue
+            for metric in COMPARED:
+                if record.get(metric) is not None:
+                    history[stage][metric].append(record[metric])
+
+    regressions = []
+    print(f"📊 Exécution {latest_id} comparée aux {min(baseline, len(run_ids) - 1)} précédente(s)")
+    print("=" * 86)
+    print(f"{'étape':<40}{'durée (s)':>12}{'base (s)':>10}{'CPU (s)':>10}{'RSS (Mo)':>10}  statut")
+    for stage, record in runs[latest_id].items():
+        flags = []
+        for metric in COMPARED:
+            values = history[stage][metric]
+            current = record.get(metric)
+            if not values or current is None:
+                continue
+            reference = statistics.median(values)
+            if current > reference * (1 + threshold) and current - reference >= MIN_DELTA[metric]:
+                flags.append(metric)
+                regressions.append({"stage": stage, "metric": metric, "current": current, "baseline": reference})
+
+        base_wall = history[stage]["wall_s"]
+        rss = record.get("max_rss_kb")
+        if record.get("status") == "unchanged":
+            status = "⏩ inchangée"
+        elif record.get("status") != "ok":
+            status = "❌ " + record.get("status", "")
+        else:
+            status = "⚠️  régression : " + ", ".join(flags) if flags else "✅"
+        print(f"{stage[-40:]:<40}{record.get('wall_s', 0):>12.2f}"
+              f"{statistics.median(base_wall) if base_wall else float('nan'):>10.2f}"
+              f"{record['cpu_s']:>10.2f}{(rss or 0) / 1024:>10.1f}  {status}")
+
+    print("=" * 86)
+    if regressions:
+        print(f"⚠️  {len(regressions)} régression(s) au-delà de {threshold:.0%}")
+    else:
+        print("✅ Aucune régression")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesures des étapes du scheduler")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary_parser = subparsers.add_parser("summary", help="compare la dernière exécution à la référence")
+    summary_parser.add_argument("--file", default=METRICS_FILE)
+    summary_parser.add_argument("--baseline", type=int, default=5, help="nombre d'exécutions de référence")
+    summary_parser.add_argument("--threshold", type=float, default=0.25, help="hausse relative tolérée")
+    args = parser.parse_args()
+
+    sys.exit(1 if summarize(args.file, args.baseline, args.threshold) else 0)
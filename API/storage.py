@@ -0,0 +1,866 @@
+"""
+Stockage des patches synchronisés : une interface, deux backends.
+
+    MongoRepository    collections versions et version_stats (mongo.py)
+    SQLiteRepository   base embarquée (sqlite3 de la bibliothèque standard),
+                       dans un fichier ou en mémoire, sans serveur ni réseau
+
+sync.py, insert-tables.py et les vues Django passent par get_repository().
+Le backend vient de config.STORAGE_BACKEND ("mongo", "sqlite" ou
+"memory"), remplacé par la variable d'environnement VT_STORAGE si elle
+est définie ; le fichier SQLite de config.STORAGE_SQLITE_PATH ou de
+VT_STORAGE_PATH. Le backend embarqué fait tourner l'API et le pipeline
+hors ligne, et sert de référence aux mesures du chemin MongoDB
+(bench_pipeline.py --storage).
+
+Les statistiques suivent les mêmes règles dans les deux backends :
+agrégation côté serveur pour MongoDB (database_stats_pipeline),
+patch_summary() en Python pour SQLite.
+
+ensure_indexes() crée les index (idempotent) ; sync.py l'appelle avant
+d'écrire et l'application Django au démarrage (apps.py). index_report()
+relance les requêtes de l'API avec explain et signale celles qui
+parcourent encore toute la collection ou trient en mémoire.
+
+Usage :
+    VT_STORAGE=sqlite python sync.py
+    VT_STORAGE=sqlite python ../manage.py runserver
+    python storage.py ensure-indexes
+    python storage.py check-indexes
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .config import STATS_ALL_VERSIONS, STORAGE_BACKEND, STORAGE_SQLITE_PATH, SYNC_WRITE_CONCERN
+except ImportError:  # scripts lancés depuis API/ : import direct
+    from config import STATS_ALL_VERSIONS, STORAGE_BACKEND, STORAGE_SQLITE_PATH, SYNC_WRITE_CONCERN
+
+BACKEND_ENV = "VT_STORAGE"
+PATH_ENV = "VT_STORAGE_PATH"
+
+CONTENT_HASH_FIELD = "content_hash"
+# Clé de tri des versions ("8.4.10" après "8.4.9"), calculée par version_sort_key
+VERSION_KEY_FIELD = "version_sort_key"
+
+PATCH_INDEX_NAME = "database_patch_version_unique"
+STATS_INDEX_NAME = "database_major_version_unique"
+# Index couvrant de la lecture des hashes : (clé, hash) sans lire les documents
+HASH_INDEX_NAME = "database_patch_version_content_hash"
+
+# Index secondaires de la collection versions : {nom: (clés, options)}
+# (database) seul est servi par le préfixe de l'index unique (database, patch_version)
+VERSION_INDEXES = {
+    "database_version_sort_key": ([("database", 1), (VERSION_KEY_FIELD, -1)], {}),
+    "date": ([("date", 1)], {}),
+    "alerts_level": ([("alerts.alerts.level", 1)], {}),
+    "change_descriptions_text": ([("ai_analysis.details.description", "text")], {"default_language": "english"}),
+}
+# Collection tables (insert_to_mongodb.py) : lectures par _type puis par base
+TABLE_INDEXES = {
+    "type_database": ([("_type", 1), ("database", 1)], {}),
+}
+
+# Champs lus sur les patches remplacés pour retirer leur contribution aux totaux
+STATS_SOURCE_FIELDS = {
+    "_id": 0,
+    "database": 1,
+    "patch_version": 1,
+    "major_version": 1,
+    "ai_analysis.dominant_type": 1,
+    "ai_analysis.summary": 1,
+    "acid_consistency_features": 1,
+    "alerts": 1,
+}
+
+
+class PartialWriteError(Exception):
+    """Écriture groupée appliquée en partie seulement"""
+
+    def __init__(self, errors: int):
+        super().__init__(f"{errors} erreur(s) d'écriture")
+        self.errors = errors
+
+
+# ==============================
+# RÈGLES DE COMPTAGE
+# ==============================
+def _or_na(value):
+    return "N/A" if value is None else value
+
+
+def version_sort_key(patch_version) -> str:
+    """'8.4.10' → '000008.000004.000010' : l'ordre des chaînes suit l'ordre des versions"""
+    parts = re.findall(r"\d+|[A-Za-z]+", str(patch_version))
+    return ".".join(part.zfill(6) if part.isdigit() else part.lower() for part in parts)
+
+
+def patch_summary(doc: Dict) -> Dict:
+    """Ligne d'un patch dans database_statistics.json (mêmes règles que database_stats_pipeline)"""
+    ai_analysis = doc.get('ai_analysis') or {}
+    summary = ai_analysis.get('summary') or {}
+
+    acid_features = doc.get('acid_consistency_features')
+    if isinstance(acid_features, dict):
+        acid_count = len([k for k, v in acid_features.items() if v])
+    elif isinstance(acid_features, list):
+        acid_count = len(acid_features)
+    else:
+        acid_count = 0
+
+    alerts = doc.get('alerts')
+    alerts_count = (len(alerts) if isinstance(alerts, list) else 1) if alerts else 0
+
+    innovation_count = summary.get('new_feature') if isinstance(summary, dict) else None
+
+    return {
+        "patch_version": _or_na(doc.get('patch_version')),
+        "date": _or_na(doc.get('date')),
+        "ai_analysis": {key: ai_analysis[key] for key in ("dominant_type", "summary") if key in ai_analysis},
+        "acid_consistency": {"features_count": acid_count, "features": acid_features} if acid_features else {},
+        "innovation_count": innovation_count if innovation_count is not None else 0,
+        "alerts_count": alerts_count,
+    }
+
+
+def patch_counters(doc: Dict) -> Dict[str, int]:
+    """Contribution d'un patch aux totaux de version_stats"""
+    row = patch_summary(doc)
+    counters = {
+        "patches_count": 1,
+        "total_innovation": row["innovation_count"],
+        "total_acid_features": row["acid_consistency"].get("features_count", 0),
+        "total_alerts": row["alerts_count"],
+    }
+    dominant_type = row["ai_analysis"].get("dominant_type")
+    if dominant_type is not None:
+        counters[f"ai_types_distribution.{dominant_type}"] = 1
+    return counters
+
+
+def _truthy(expr):
+    """Vrai au sens Python : ni absent, ni null, ni 0, ni False, ni chaîne, liste ou objet vide"""
+    return {"$not": {"$in": [{"$ifNull": [expr, None]}, [None, False, 0, "", [], {}]]}}
+
+# Champs non vides d'acid_consistency_features (objet) ou nombre d'éléments (liste)
+ACID_FEATURES_COUNT = {"$switch": {
+    "branches": [
+        {"case": {"$eq": [{"$type": "$acid_consistency_features"}, "object"]},
+         "then": {"$size": {"$filter": {
+             "input": {"$objectToArray": "$acid_consistency_features"},
+             "as": "field",
+             "cond": _truthy("$$field.v"),
+         }}}},
+        {"case": {"$isArray": "$acid_consistency_features"},
+         "then": {"$size": "$acid_consistency_features"}},
+    ],
+    "default": 0,
+}}
+
+# Une liste d'alertes compte pour sa taille, un objet d'alertes non vide pour 1
+ALERTS_COUNT = {"$cond": [
+    _truthy("$alerts"),
+    {"$cond": [{"$isArray": "$alerts"}, {"$size": "$alerts"}, 1]},
+    0,
+]}
+
+
+def database_stats_pipeline():
+    """Pipeline d'agrégation de database_statistics.json : un document par base
+
+    Le $project ne garde de chaque patch que les champs du rapport
+    (compteurs, résumé ai_analysis, features ACID ; ni
+    ai_analysis.details, ni listes d'alertes) ; les totaux par version
+    majeure puis par base sont calculés par $group.
+    """
+    return [
+        {"$project": {
+            "_id": 0,
+            "database": 1,
+            "major_version": {"$ifNull": ["$major_version", "N/A"]},
+            "patch": {
+                "patch_version": {"$ifNull": ["$patch_version", "N/A"]},
+                "date": {"$ifNull": ["$date", "N/A"]},
+                "ai_analysis": {
+                    "dominant_type": "$ai_analysis.dominant_type",
+                    "summary": "$ai_analysis.summary",
+                },
+                "acid_consistency": {"$cond": [
+                    _truthy("$acid_consistency_features"),
+                    {"features_count": ACID_FEATURES_COUNT, "features": "$acid_consistency_features"},
+                    {"$literal": {}},
+                ]},
+                "innovation_count": {"$ifNull": ["$ai_analysis.summary.new_feature", 0]},
+                "alerts_count": ALERTS_COUNT,
+            },
+        }},
+        {"$group": {
+            "_id": {"database": "$database", "major_version": "$major_version"},
+            "patches": {"$push": "$patch"},
+            "patches_count": {"$sum": 1},
+            "total_innovation": {"$sum": "$patch.innovation_count"},
+            "total_acid_features": {"$sum": "$patch.acid_consistency.features_count"},
+            "total_alerts": {"$sum": "$patch.alerts_count"},
+            "dominant_types": {"$push": "$patch.ai_analysis.dominant_type"},
+        }},
+        {"$sort": {"_id.database": 1, "_id.major_version": 1}},
+        {"$group": {
+            "_id": "$_id.database",
+            "major_versions": {"$push": "$_id.major_version"},
+            "total_patches": {"$sum": "$patches_count"},
+            "versions": {"$push": {
+                "major_version": "$_id.major_version",
+                "patches_count": "$patches_count",
+                "patches": "$patches",
+                "version_totals": {
+                    "total_innovation": "$total_innovation",
+                    "total_acid_features": "$total_acid_features",
+                    "total_alerts": "$total_alerts",
+                },
+            }},
+            "total_innovation": {"$sum": "$total_innovation"},
+            "total_acid_features": {"$sum": "$total_acid_features"},
+            "total_alerts": {"$sum": "$total_alerts"},
+            "dominant_types": {"$push": "$dominant_types"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def _increments(bucket: Dict[str, int]) -> Dict[str, int]:
+    """Champs du $inc : aucun si rien ne change, sinon les totaux même nuls (documents complets dès leur création)"""
+    if not any(bucket.values()):
+        return {}
+    return {field: value for field, value in bucket.items() if value or "." not in field}
+
+
+def _apply_increments(doc: Dict, increments: Dict[str, int]):
+    """$inc sur un dictionnaire (chemins pointés) ; un type retombé à zéro est retiré"""
+    for field, delta in increments.items():
+        *parents, last = field.split(".")
+        node = doc
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[last] = node.get(last, 0) + delta
+        if parents and node[last] == 0:
+            del node[last]
+
+
+# ==============================
+# INTERFACE
+# ==============================
+class VersionRepository:
+    """Opérations de stockage utilisées par sync.py, insert-tables.py et l'API"""
+
+    name = ""
+
+    def ensure_indexes(self) -> bool:
+        """Index nécessaires aux upserts et aux lectures (idempotent)"""
+        raise NotImplementedError
+
+    # --- lecture ---
+    def find_by_tech(self, tech: str) -> List[Dict]:
+        """Documents d'une base, sans _id"""
+        raise NotImplementedError
+
+    def find_one_by_tech(self, tech: str) -> Optional[Dict]:
+        """Premier document d'une base, sans _id (None si la base est vide)"""
+        raise NotImplementedError
+
+    def patch_hashes(self, database: str) -> Dict[str, Optional[str]]:
+        """{patch_version: content_hash} d'une base"""
+        raise NotImplementedError
+
+    def find_patches(self, database: str, versions: List[str]) -> List[Dict]:
+        """Champs de comptage (STATS_SOURCE_FIELDS) des patches demandés"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def count_by_database(self) -> List[Tuple[str, int]]:
+        """[(base, nombre de documents)], du plus grand au plus petit"""
+        raise NotImplementedError
+
+    def latest_patch(self, database: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def duplicates(self) -> List[Tuple[Dict, int]]:
+        """[({database, patch_version}, occurrences)] des clés présentes plusieurs fois"""
+        raise NotImplementedError
+
+    def index_report(self, database: str = "mongodb") -> List[Dict]:
+        """Plan (explain) des requêtes de l'API et de sync.py : {query, status, indexes, covered}
+
+        status vaut "ok", "scan" (parcours complet) ou "sort" (tri en mémoire).
+        """
+        raise NotImplementedError
+
+    # --- écriture ---
+    def upsert_patches(self, docs: List[Dict]) -> Tuple[int, int]:
+        """Crée ou met à jour les patches (clé database, patch_version) ; renvoie (nouveaux, modifiés)"""
+        raise NotImplementedError
+
+    def insert_patches(self, docs: List[Dict]) -> int:
+        raise NotImplementedError
+
+    def delete_all(self) -> int:
+        raise NotImplementedError
+
+    # --- statistiques ---
+    def database_stats(self) -> Iterator[Dict]:
+        """Un document agrégé par base, au format de database_stats_pipeline"""
+        raise NotImplementedError
+
+    def stats_count(self) -> int:
+        raise NotImplementedError
+
+    def get_stats(self, database: str, major_version=STATS_ALL_VERSIONS) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def increment_stats(self, deltas: Dict[Tuple, Dict[str, int]]):
+        """$inc des deltas {(database, major_version): {champ: delta}} ; les versions vidées sont retirées"""
+        raise NotImplementedError
+
+    def replace_stats(self, documents: List[Dict]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ==============================
+# MONGODB
+# ==============================
+class MongoRepository(VersionRepository):
+    name = "mongo"
+
+    def __init__(self):
+        try:
+            from . import mongo
+        except ImportError:
+            import mongo
+        self.mongo = mongo
+        self.versions = mongo.collection_version
+        self.stats = mongo.collection_version_stats
+
+    def ensure_indexes(self) -> bool:
+        from pymongo import ASCENDING
+        from pymongo.errors import DuplicateKeyError
+
+        self.stats.create_index(
+            [("database", ASCENDING), ("major_version", ASCENDING)],
+            unique=True,
+            name=STATS_INDEX_NAME,
+        )
+        self.versions.create_index(
+            [("database", ASCENDING), ("patch_version", ASCENDING), (CONTENT_HASH_FIELD, ASCENDING)],
+            name=HASH_INDEX_NAME,
+        )
+        _create_indexes(self.versions, VERSION_INDEXES)
+        _create_indexes(self.mongo.collection, TABLE_INDEXES)
+        try:
+            self.versions.create_index(
+                [("database", ASCENDING), ("patch_version", ASCENDING)],
+                unique=True,
+                name=PATCH_INDEX_NAME,
+            )
+            return True
+        except DuplicateKeyError:
+            print("⚠️  Doublons (database, patch_version) dans la base : index unique non créé")
+            print("   Lancez check_duplicates() et supprimez-les ; les upserts restent possibles")
+            return False
+
+    def find_by_tech(self, tech):
+        return list(self.versions.find({"database": tech}, {"_id": 0}))
+
+    def find_one_by_tech(self, tech):
+        return self.versions.find_one({"database": tech}, {"_id": 0})
+
+    def patch_hashes(self, database):
+        # Lu dans l'index couvrant seulement
+        cursor = self.versions.find(
+            {"database": database},
+            {"_id": 0, "patch_version": 1, CONTENT_HASH_FIELD: 1},
+        ).hint(HASH_INDEX_NAME)
+        return {doc.get('patch_version'): doc.get(CONTENT_HASH_FIELD) for doc in cursor}
+
+    def find_patches(self, database, versions):
+        return list(self.versions.find(
+            {"database": database, "patch_version": {"$in": versions}},
+            STATS_SOURCE_FIELDS,
+        ))
+
+    def count(self):
+        # Métadonnées de la collection, sans parcours
+        return self.versions.estimated_document_count()
+
+    def count_by_database(self):
+        pipeline = [
+            {"$group": {"_id": "$database", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}}
+        ]
+        return [(stat['_id'], stat['count']) for stat in self.versions.aggregate(pipeline)]
+
+    def latest_patch(self, database):
+        # Tri sur la clé de version : "8.4.10" après "8.4.9", servi par (database, version_sort_key)
+        latest = self.versions.find_one({"database": database}, {"_id": 0, "patch_version": 1},
+                                        sort=[(VERSION_KEY_FIELD, -1)])
+        return latest.get('patch_version', 'N/A') if latest else None
+
+    def duplicates(self):
+        pipeline = [
+            {"$group": {
+                "_id": {"database": "$database", "patch_version": "$patch_version"},
+                "count": {"$sum": 1},
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+        return [(dup['_id'], dup['count']) for dup in self.versions.aggregate(pipeline)]
+
+    def upsert_patches(self, docs):
+        from pymongo import UpdateOne, WriteConcern
+        from pymongo.errors import BulkWriteError
+
+        requests = [
+            UpdateOne(
+                {"database": doc['database'], "patch_version": doc['patch_version']},
+                {"$set": doc},
+                upsert=True,
+            )
+            for doc in docs
+        ]
+        collection = self.versions.with_options(write_concern=WriteConcern(**SYNC_WRITE_CONCERN))
+        try:
+            result = collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            raise PartialWriteError(len(e.details.get('writeErrors', []))) from e
+        if not result.acknowledged:
+            return 0, 0
+        return result.upserted_count, result.modified_count
+
+    def insert_patches(self, docs):
+        return len(self.versions.insert_many(docs).inserted_ids)
+
+    def delete_all(self):
+        return self.versions.delete_many({}).deleted_count
+
+    def database_stats(self):
+        return self.versions.aggregate(database_stats_pipeline(), allowDiskUse=True)
+
+    def stats_count(self):
+        return self.stats.estimated_document_count()
+
+    def get_stats(self, database, major_version=STATS_ALL_VERSIONS):
+        # Une lecture par l'index unique (database, major_version)
+        return self.stats.find_one({"database": database, "major_version": major_version}, {"_id": 0})
+
+    def increment_stats(self, deltas):
+        from pymongo import UpdateOne
+
+        requests = []
+        for (database, major_version), bucket in deltas.items():
+            increments = _increments(bucket)
+            if increments:
+                requests.append(UpdateOne(
+                    {"database": database, "major_version": major_version},
+                    {"$inc": increments},
+                    upsert=True,
+                ))
+        if not requests:
+            return
+        self.stats.bulk_write(requests, ordered=False)
+
+        # Type retombé à zéro : clé retirée de ai_types_distribution, comme dans un document recalculé
+        zeroed = [
+            UpdateOne({"database": database, "major_version": major_version, field: 0}, {"$unset": {field: ""}})
+            for (database, major_version), bucket in deltas.items()
+            for field, delta in bucket.items() if delta < 0 and "." in field
+        ]
+        if zeroed:
+            self.stats.bulk_write(zeroed, ordered=False)
+
+        # Version majeure vidée (patch déplacé vers une autre version) : document retiré
+        emptied = [{"database": database, "major_version": major_version}
+                   for (database, major_version), bucket in deltas.items() if bucket.get("patches_count", 0) < 0]
+        if emptied:
+            self.stats.delete_many({"$or": emptied, "patches_count": {"$lte": 0}})
+
+    def replace_stats(self, documents):
+        self.stats.delete_many({})
+        if documents:
+            self.stats.insert_many(documents)
+
+    def index_report(self, database="mongodb"):
+        queries = {
+            "api_get_versions": self.versions.find({"database": database}, {"_id": 0}),
+            "api_get_stats": self.stats.find({"database": database, "major_version": STATS_ALL_VERSIONS}, {"_id": 0}),
+            "sync.patch_hashes": self.versions.find(
+                {"database": database}, {"_id": 0, "patch_version": 1, CONTENT_HASH_FIELD: 1}).hint(HASH_INDEX_NAME),
+            "sync.find_patches": self.versions.find(
+                {"database": database, "patch_version": {"$in": ["0"]}}, STATS_SOURCE_FIELDS),
+            "show_sync_stats.latest_patch": self.versions.find(
+                {"database": database}, {"_id": 0, "patch_version": 1}).sort(VERSION_KEY_FIELD, -1).limit(1),
+            "insert_to_mongodb.tables": self.mongo.collection.find(
+                {"_type": "database"}, {"database": 1, "major_version": 1, "patch_version": 1}),
+        }
+        report = []
+        for query, cursor in queries.items():
+            stages = _plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
+            names = [stage.get("stage") for stage in stages]
+            indexes = [stage["indexName"] for stage in stages if stage.get("indexName")]
+            if "COLLSCAN" in names:
+                status = "scan"
+            elif "SORT" in names:
+                status = "sort"
+            else:
+                status = "ok"
+            report.append({"query": query, "status": status, "indexes": indexes,
+                           "covered": bool(indexes) and "FETCH" not in names})
+        return report
+
+    def close(self):
+        self.mongo.close_client()
+
+
+def _create_indexes(collection, specs: Dict):
+    """Crée les index {nom: (clés, options)} ; un index existant sous le même nom est laissé tel quel"""
+    from pymongo.errors import OperationFailure
+
+    for name, (keys, options) in specs.items():
+        try:
+            collection.create_index(keys, name=name, **options)
+        except OperationFailure as e:
+            # Options différentes, ou un autre index texte déjà présent (un seul par collection)
+            print(f"⚠️  Index {name} non créé : {e}")
+
+
+def _plan_stages(plan: Dict) -> List[Dict]:
+    """Étapes d'un winningPlan explain, de la racine aux feuilles"""
+    plan = plan.get("queryPlan", plan)  # moteur SBE : plan classique sous queryPlan
+    stages = [plan]
+    for child in [plan.get("inputStage"), *plan.get("inputStages", [])]:
+        if child:
+            stages += _plan_stages(child)
+    return stages
+
+
+# ==============================
+# SQLITE (EMBARQUÉ)
+# ==============================
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    database TEXT NOT NULL,
+    patch_version TEXT NOT NULL,
+    content_hash TEXT,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (database, patch_version)
+);
+CREATE TABLE IF NOT EXISTS version_stats (
+    database TEXT NOT NULL,
+    major_version TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (database, major_version)
+);
+"""
+
+# Les clés primaires servent (database, patch_version) et (database, major_version).
+# (database) seul rend les lignes d'une base dans l'ordre du rowid (find_by_tech) sans tri.
+# Tableaux (alerts.alerts.level) et recherche plein texte : MongoDB seulement.
+SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS versions_database ON versions (database);
+CREATE INDEX IF NOT EXISTS versions_database_version_sort_key
+    ON versions (database, json_extract(doc, '$.version_sort_key'));
+CREATE INDEX IF NOT EXISTS versions_date ON versions (json_extract(doc, '$.date'));
+"""
+
+
+def _encode(doc: Dict) -> str:
+    return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class SQLiteRepository(VersionRepository):
+    """Documents stockés en JSON, clé (database, patch_version) ; ":memory:" pour une base éphémère"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = STORAGE_SQLITE_PATH):
+        self.path = path
+        # Les vues Django servent depuis plusieurs threads : une connexion, un verrou
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def _query(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(sql, tuple(params)).fetchall()
+
+    def ensure_indexes(self):
+        with self.lock, self.conn:
+            self.conn.executescript(SQLITE_INDEXES)
+        return True
+
+    def find_by_tech(self, tech):
+        return [json.loads(doc) for (doc,) in
+                self._query("SELECT doc FROM versions WHERE database = ? ORDER BY rowid", (tech,))]
+
+    def find_one_by_tech(self, tech):
+        rows = self._query("SELECT doc FROM versions WHERE database = ? ORDER BY rowid LIMIT 1", (tech,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def patch_hashes(self, database):
+        return dict(self._query("SELECT patch_version, content_hash FROM versions WHERE database = ?", (database,)))
+
+    def find_patches(self, database, versions):
+        if not versions:
+            return []
+        placeholders = ", ".join("?" * len(versions))
+        rows = self._query(
+            f"SELECT doc FROM versions WHERE database = ? AND patch_version IN ({placeholders})",
+            [database, *versions],
+        )
+        return [json.loads(doc) for (doc,) in rows]
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM versions")[0][0]
+
+    def count_by_database(self):
+        return self._query("SELECT database, COUNT(*) FROM versions GROUP BY database ORDER BY COUNT(*) DESC")
+
+    def latest_patch(self, database):
+        rows = self._query(
+            "SELECT patch_version FROM versions WHERE database = ? "
+            "ORDER BY json_extract(doc, '$.version_sort_key') DESC LIMIT 1",
+            (database,),
+        )
+        return rows[0][0] if rows else None
+
+    def duplicates(self):
+        # Clé primaire (database, patch_version) : pas de doublon possible
+        return []
+
+    def upsert_patches(self, docs):
+        new_count = updated_count = 0
+        with self.lock, self.conn:
+            for doc in docs:
+                key = (doc['database'], doc['patch_version'])
+                row = self.conn.execute(
+                    "SELECT doc FROM versions WHERE database = ? AND patch_version = ?", key
+                ).fetchone()
+                if row is None:
+                    merged = doc
+                    new_count += 1
+                else:
+                    # Même sémantique que $set : les champs absents de doc sont conservés
+                    merged = {**json.loads(row[0]), **doc}
+                encoded = _encode(merged)
+                if row is not None:
+                    if encoded == row[0]:
+                        continue
+                    updated_count += 1
+                self.conn.execute(
+                    "INSERT INTO versions (database, patch_version, content_hash, doc) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (database, patch_version) DO UPDATE SET "
+                    "content_hash = excluded.content_hash, doc = excluded.doc",
+                    (*key, merged.get(CONTENT_HASH_FIELD), encoded),
+                )
+        return new_count, updated_count
+
+    def insert_patches(self, docs):
+        docs = [doc for doc in docs if doc.get('database') and doc.get('patch_version')]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO versions (database, patch_version, content_hash, doc) VALUES (?, ?, ?, ?)",
+                [(doc['database'], doc['patch_version'], doc.get(CONTENT_HASH_FIELD), _encode(doc)) for doc in docs],
+            )
+        return len(docs)
+
+    def delete_all(self):
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM versions").rowcount
+
+    def database_stats(self):
+        # {base: {version majeure: [lignes]}}, dans l'ordre d'insertion
+        grouped: Dict[str, Dict] = {}
+        for (doc,) in self._query("SELECT doc FROM versions ORDER BY rowid"):
+            doc = json.loads(doc)
+            major_version = _or_na(doc.get('major_version'))
+            grouped.setdefault(doc['database'], {}).setdefault(major_version, []).append(patch_summary(doc))
+
+        for database in sorted(grouped):
+            group = {
+                "_id": database,
+                "major_versions": [],
+                "total_patches": 0,
+                "versions": [],
+                "total_innovation": 0,
+                "total_acid_features": 0,
+                "total_alerts": 0,
+                "dominant_types": [],
+            }
+            for major_version in sorted(grouped[database], key=str):
+                patches = grouped[database][major_version]
+                totals = {
+                    "total_innovation": sum(patch["innovation_count"] for patch in patches),
+                    "total_acid_features": sum(patch["acid_consistency"].get("features_count", 0) for patch in patches),
+                    "total_alerts": sum(patch["alerts_count"] for patch in patches),
+                }
+                group["major_versions"].append(major_version)
+                group["total_patches"] += len(patches)
+                group["versions"].append({
+                    "major_version": major_version,
+                    "patches_count": len(patches),
+                    "patches": patches,
+                    "version_totals": totals,
+                })
+                for field, value in totals.items():
+                    group[field] += value
+                group["dominant_types"].append([patch["ai_analysis"]["dominant_type"] for patch in patches
+                                                if "dominant_type" in patch["ai_analysis"]])
+            yield group
+
+    def stats_count(self):
+        return self._query("SELECT COUNT(*) FROM version_stats")[0][0]
+
+    def get_stats(self, database, major_version=STATS_ALL_VERSIONS):
+        rows = self._query("SELECT doc FROM version_stats WHERE database = ? AND major_version = ?",
+                           (database, major_version))
+        return json.loads(rows[0][0]) if rows else None
+
+    def increment_stats(self, deltas):
+        with self.lock, self.conn:
+            for (database, major_version), bucket in deltas.items():
+                increments = _increments(bucket)
+                if not increments:
+                    continue
+                row = self.conn.execute(
+                    "SELECT doc FROM version_stats WHERE database = ? AND major_version = ?",
+                    (database, major_version),
+                ).fetchone()
+                doc = json.loads(row[0]) if row else {"database": database, "major_version": major_version}
+                _apply_increments(doc, increments)
+
+                if bucket.get("patches_count", 0) < 0 and doc.get("patches_count", 0) <= 0:
+                    self.conn.execute("DELETE FROM version_stats WHERE database = ? AND major_version = ?",
+                                      (database, major_version))
+                else:
+                    self.conn.execute("INSERT OR REPLACE INTO version_stats (database, major_version, doc) "
+                                      "VALUES (?, ?, ?)", (database, major_version, _encode(doc)))
+
+    def replace_stats(self, documents):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM version_stats")
+            self.conn.executemany(
+                "INSERT INTO version_stats (database, major_version, doc) VALUES (?, ?, ?)",
+                [(doc["database"], doc["major_version"], _encode(doc)) for doc in documents],
+            )
+
+    def index_report(self, database="mongodb"):
+        queries = {
+            "api_get_versions": ("SELECT doc FROM versions WHERE database = ? ORDER BY rowid", (database,)),
+            "api_get_stats": ("SELECT doc FROM version_stats WHERE database = ? AND major_version = ?",
+                              (database, STATS_ALL_VERSIONS)),
+            "sync.patch_hashes": ("SELECT patch_version, content_hash FROM versions WHERE database = ?", (database,)),
+            "sync.find_patches": ("SELECT doc FROM versions WHERE database = ? AND patch_version IN (?)",
+                                  (database, "0")),
+            "show_sync_stats.latest_patch": (
+                "SELECT patch_version FROM versions WHERE database = ? "
+                "ORDER BY json_extract(doc, '$.version_sort_key') DESC LIMIT 1", (database,)),
+        }
+        report = []
+        for query, (sql, params) in queries.items():
+            details = [row[3] for row in self._query("EXPLAIN QUERY PLAN " + sql, params)]
+            if any(detail.startswith("SCAN") for detail in details):
+                status = "scan"
+            elif any("TEMP B-TREE" in detail for detail in details):
+                status = "sort"
+            else:
+                status = "ok"
+            indexes = [match.group(1) for match in (re.search(r"INDEX (\S+)", detail) for detail in details) if match]
+            report.append({"query": query, "status": status, "indexes": indexes,
+                           "covered": any("COVERING INDEX" in detail for detail in details)})
+        return report
+
+    def close(self):
+        self.conn.close()
+
+
+# ==============================
+# INSTANCE DU PROCESSUS
+# ==============================
+_repository: Optional[VersionRepository] = None
+_repository_lock = threading.Lock()
+
+
+def backend_name() -> str:
+    return os.environ.get(BACKEND_ENV) or STORAGE_BACKEND
+
+
+def open_repository(backend: Optional[str] = None, path: Optional[str] = None) -> VersionRepository:
+    """Nouveau dépôt du backend demandé (par défaut : celui de la configuration)"""
+    backend = backend or backend_name()
+    if backend == "mongo":
+        return MongoRepository()
+    if backend == "sqlite":
+        return SQLiteRepository(path or os.environ.get(PATH_ENV) or STORAGE_SQLITE_PATH)
+    if backend == "memory":
+        return SQLiteRepository(":memory:")
+    raise ValueError(f"Backend de stockage inconnu : {backend} (mongo, sqlite ou memory)")
+
+
+def get_repository() -> VersionRepository:
+    """Dépôt partagé du processus, ouvert au premier appel"""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = open_repository()
+        return _repository
+
+
+def close_repository():
+    global _repository
+    with _repository_lock:
+        if _repository is not None:
+            _repository.close()
+        _repository = None
+
+
+# ==============================
+# VÉRIFICATION DES INDEX
+# ==============================
+def check_indexes(database: str = "mongodb") -> bool:
+    """Affiche le plan des requêtes de l'API ; False si l'une d'elles n'est pas servie par un index"""
+    repository = get_repository()
+    report = repository.index_report(database)
+    print(f"🔎 Plans des requêtes ({repository.name}, base '{database}') :")
+    for entry in report:
+        icon = {"ok": "✅", "sort": "⚠️ ", "scan": "❌"}[entry["status"]]
+        indexes = ", ".join(entry["indexes"]) or "aucun index"
+        covered = " (couverte)" if entry["covered"] else ""
+        print(f"  {icon} {entry['query']:<30} {indexes}{covered}")
+    missing = [entry["query"] for entry in report if entry["status"] != "ok"]
+    if missing:
+        print(f"⚠️  {len(missing)} requête(s) non servie(s) par un index : lancez 'python storage.py ensure-indexes'")
+    return not missing
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check-indexes"
+    try:
+        if command == "ensure-indexes":
+            get_repository().ensure_indexes()
+            print(f"✅ Index en place ({backend_name()})")
+        elif command == "check-indexes":
+            sys.exit(0 if check_indexes(*sys.argv[2:3]) else 1)
+        else:
+            print("Usage : python storage.py [ensure-indexes | check-indexes [base]]")
+            sys.exit(2)
+    finally:
+        close_repository()
@@ -1,156 +1,341 @@
+import hashlib
 import json
+import time
 from pathlib import Path
-from pymongo import MongoClient
-from mongo import MONGO_URI, client, db, collection_version
+import codec
+import stage_metrics
+from config import STATS_ALL_VERSIONS, SYNC_BATCH_SIZE
+from projection import Projection, output_projection
+from storage import (CONTENT_HASH_FIELD, VERSION_KEY_FIELD, PartialWriteError, close_repository, get_repository,
+                     patch_counters, version_sort_key)
 
-def sync_new_patches():
-    """Compare les fichiers JSON avec la base de données et ajoute uniquement les nouveaux patches"""
+# Champs exclus du hash de contenu : horodatages recalculés à chaque enrichissement
+VOLATILE_FIELDS = Projection(drop=[
+    "_id",
+    CONTENT_HASH_FIELD,
+    "acid_consistency_features.extraction_date",
+    "alerts.extraction_date",
+    "innovation_summary.generation_date",
+])
+
+def content_hash(doc):
+    """Hash du contenu enrichi d'un patch, stable d'un run à l'autre si rien n'a changé"""
+    payload = json.dumps(VOLATILE_FIELDS.apply(doc), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def patch_fields(doc, digest=None):
+    """Champs écrits pour un patch : le document sans _id, avec son content_hash"""
+    fields = {key: value for key, value in doc.items() if key != '_id'}
+    fields[CONTENT_HASH_FIELD] = digest or content_hash(doc)
+    return fields
+
+# ==============================
+# STATISTIQUES MATÉRIALISÉES (version_stats)
+# ==============================
+def add_stats_delta(deltas, doc, sign):
+    """Ajoute (+1) ou retire (-1) la contribution d'un patch à sa version majeure et à sa base"""
+    major_version = doc.get('major_version')
+    if major_version is None:
+        major_version = "N/A"
+    
+    for key in ((doc['database'], major_version), (doc['database'], STATS_ALL_VERSIONS)):
+        bucket = deltas.setdefault(key, {})
+        for field, value in patch_counters(doc).items():
+            bucket[field] = bucket.get(field, 0) + sign * value
+
+def rebuild_version_stats():
+    """Recalcule entièrement version_stats depuis les patches stockés"""
+    repository = get_repository()
+    documents = []
+    for group in repository.database_stats():
+        database_stats = assemble_database_stats(group)
+        global_stats = database_stats["global_stats"]
+        documents.append({
+            "database": group["_id"],
+            "major_version": STATS_ALL_VERSIONS,
+            "patches_count": database_stats["total_patches"],
+            "total_innovation": global_stats["total_innovation"],
+            "total_acid_features": global_stats["total_acid_features"],
+            "total_alerts": global_stats["total_alerts"],
+            "ai_types_distribution": global_stats["ai_types_distribution"],
+        })
+        # Versions et types dominants sont poussés dans le même ordre par le $group
+        for version, types in zip(group["versions"], group["dominant_types"]):
+            ai_types_count = {}
+            for dominant_type in types:
+                ai_types_count[dominant_type] = ai_types_count.get(dominant_type, 0) + 1
+            documents.append({
+                "database": group["_id"],
+                "major_version": version["major_version"],
+                "patches_count": version["patches_count"],
+                **version["version_totals"],
+                "ai_types_distribution": ai_types_count,
+            })
+    
+    repository.replace_stats(documents)
+    print(f"📈 version_stats recalculée: {len(documents)} document(s)")
+
+def get_version_stats(database, major_version=STATS_ALL_VERSIONS):
+    """Totaux d'une base (ou d'une version majeure) : une lecture par l'index unique"""
+    return get_repository().get_stats(database, major_version)
+
+def sync_new_patches(datasets=None, close_client=True):
+    """Envoie les patches des fichiers JSON vers le stockage par upserts groupés
     
-    output_dir = Path("output")
+    Chaque document stocké porte le hash de son contenu enrichi
+    (content_hash). Seuls les couples (patch_version, content_hash) de
+    chaque base sont relus (index couvrant sous MongoDB) ; seuls les
+    patches nouveaux ou dont le hash a changé sont écrits, par lots de
+    SYNC_BATCH_SIZE upserts sur la clé (database, patch_version) (voir
+    storage.py pour la write concern et le backend).
     
-    if not output_dir.exists():
-        print(f"Le dossier {output_dir} n'existe pas.")
-        return
+    Les index sont créés au préalable (ensure_indexes, idempotent) ;
+    chaque patch porte sa clé de tri de version (version_sort_key).
     
-    json_files = list(output_dir.glob("*.json"))
+    Chaque lot écrit met à jour version_stats par $inc : contribution
+    des nouveaux documents moins celle des documents remplacés. Si
+    version_stats est vide alors que la collection ne l'est pas, ou si
+    une écriture groupée échoue, les totaux sont recalculés en fin de
+    synchronisation (rebuild_version_stats).
     
-    if not json_files:
-        print(f"Aucun fichier JSON trouvé dans {output_dir}")
-        return
+    Un même patch (database, patch_version) présent plusieurs fois dans
+    les données n'est envoyé qu'une fois : la première copie est gardée,
+    les suivantes sont ignorées et comptées comme doublons.
     
-    print("🔄 Synchronisation des nouveaux patches")
+    datasets : {nom: documents} déjà en mémoire (pipeline.py) ; par défaut
+    les fichiers du dossier output sont lus en flux.
+    
+    Renvoie les compteurs {new, updated, unchanged, duplicates}.
+    """
+    
+    if datasets is None:
+        output_dir = Path("output")
+        
+        if not output_dir.exists():
+            print(f"Le dossier {output_dir} n'existe pas.")
+            return
+        
+        json_files = codec.dataset_files(output_dir)
+        
+        if not json_files:
+            print(f"Aucun fichier JSON trouvé dans {output_dir}")
+            return
+        
+        # Projection de sortie (sans 'changes') appliquée pendant l'envoi
+        projection = output_projection()
+        datasets = {json_file.name: projection.iter(codec.iter_items(json_file)) for json_file in json_files}
+    
+    print("🔄 Synchronisation des patches (upserts groupés)")
     print("=" * 50)
     
     try:
-        # Récupérer tous les documents existants de la base de données
-        existing_patches = get_existing_patches()
-        print(f"📋 Patches existants dans la base: {len(existing_patches)}")
+        repository = get_repository()
+        repository.ensure_indexes()
         
         total_new_patches = 0
+        total_updated = 0
+        total_unchanged = 0
+        total_duplicates = 0
         total_processed = 0
         
-        for json_file in json_files:
-            print(f"\n📄 Traitement de: {json_file.name}")
+        # Totaux absents (première synchronisation depuis cette version) : recalcul complet à la fin
+        rebuild_stats = repository.stats_count() == 0 and repository.count() > 0
+        stats_deltas = {}
+        
+        # {base: {patch_version: content_hash}}, lu une fois par base rencontrée
+        stored_hashes = {}
+        # Clés déjà rencontrées pendant ce run : seule la première copie compte
+        seen_keys = set()
+        
+        for name, docs in datasets.items():
+            print(f"\n📄 Traitement de: {name}")
             
             try:
-                # Lire le fichier JSON
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                batch_docs = []
+                # {base: [patch_version]} des documents déjà stockés que le lot remplace
+                replaced = {}
+                new_count = 0
+                updated_count = 0
                 
-                # Normaliser en liste
-                if isinstance(data, dict):
-                    documents = [data]
-                elif isinstance(data, list):
-                    documents = data
-                else:
-                    print(f"   ⚠️  Format non supporté")
-                    continue
-                
-                new_patches = []
+                def flush():
+                    nonlocal new_count, updated_count
+                    if not rebuild_stats:
+                        for database, versions in replaced.items():
+                            for old_doc in repository.find_patches(database, versions):
+                                add_stats_delta(stats_deltas, old_doc, -1)
+                    written_new, written_updated = repository.upsert_patches(batch_docs)
+                    new_count += written_new
+                    updated_count += written_updated
+                    if not rebuild_stats:
+                        for new_doc in batch_docs:
+                            add_stats_delta(stats_deltas, new_doc, 1)
+                        repository.increment_stats(stats_deltas)
+                        stats_deltas.clear()
+                    batch_docs.clear()
+                    replaced.clear()
                 
-                for doc in documents:
+                # Lire le fichier JSON document par document
+                for doc in docs:
+                    if not isinstance(doc, dict):
+                        print(f"   ⚠️  Format non supporté")
+                        break
+                    
                     total_processed += 1
                     
-                    # Créer une clé unique pour comparaison
                     db_name = doc.get('database')
                     patch_version = doc.get('patch_version')
                     
                     if not db_name or not patch_version:
                         continue
                     
-                    unique_key = f"{db_name}_{patch_version}"
+                    # Copie suivante d'un patch déjà traité (même fichier ou autre fichier) : ignorée
+                    if (db_name, patch_version) in seen_keys:
+                        total_duplicates += 1
+                        continue
+                    seen_keys.add((db_name, patch_version))
+                    
+                    if db_name not in stored_hashes:
+                        stored_hashes[db_name] = repository.patch_hashes(db_name)
+                    
+                    # Clé de tri stockée avec le patch (index database, version_sort_key)
+                    doc = {**doc, VERSION_KEY_FIELD: version_sort_key(patch_version)}
+                    
+                    # Patch inchangé depuis la dernière synchronisation : rien à envoyer
+                    digest = content_hash(doc)
+                    if stored_hashes[db_name].get(patch_version) == digest:
+                        total_unchanged += 1
+                        continue
+                    
+                    if patch_version in stored_hashes[db_name]:
+                        replaced.setdefault(db_name, []).append(patch_version)
+                    stored_hashes[db_name][patch_version] = digest
                     
-                    # Vérifier si le patch existe déjà
-                    if unique_key not in existing_patches:
-                        new_patches.append(doc)
-                        existing_patches[unique_key] = doc
+                    batch_docs.append(patch_fields(doc, digest))
+                    if len(batch_docs) >= SYNC_BATCH_SIZE:
+                        flush()
+                
+                if batch_docs:
+                    flush()
                 
-                # Insérer uniquement les nouveaux patches
-                if new_patches:
-                    result = collection_version.insert_many(new_patches)
-                    new_count = len(result.inserted_ids)
-                    total_new_patches += new_count
-                    print(f"   ✅ {new_count} nouveaux patches ajoutés")
+                stage_metrics.count(docs_out=new_count + updated_count)
+                total_new_patches += new_count
+                total_updated += updated_count
+                if new_count or updated_count:
+                    print(f"   ✅ {new_count} nouveaux patches ajoutés, {updated_count} mis à jour")
                 else:
-                    print(f"   ℹ️  Aucun nouveau patch trouvé")
+                    print(f"   ℹ️  Aucun patch nouveau ou modifié")
                     
+            except PartialWriteError as e:
+                print(f"   ❌ Erreur d'écriture groupée: {e.errors} erreur(s)")
+                # Écritures partielles : deltas inconnus, version_stats sera recalculée
+                rebuild_stats = True
             except Exception as e:
                 print(f"   ❌ Erreur: {e}")
+                # Lot interrompu entre deux écritures : deltas incomplets, version_stats sera recalculée
+                rebuild_stats = True
         
         print(f"\n" + "=" * 50)
         print(f"🎉 Synchronisation terminée!")
         print(f"📊 Documents traités: {total_processed}")
         print(f"🆕 Nouveaux patches ajoutés: {total_new_patches}")
+        print(f"✏️  Patches mis à jour: {total_updated}")
+        print(f"⏩ Patches inchangés (non envoyés): {total_unchanged}")
+        if total_duplicates:
+            print(f"🔁 Doublons ignorés (première copie conservée): {total_duplicates}")
         
-        # Statistiques finales
-        final_count = collection_version.count_documents({})
+        # Statistiques finales (métadonnées de la collection, sans parcours)
+        final_count = repository.count()
         print(f"📋 Total documents dans la base: {final_count}")
         
+        if rebuild_stats:
+            rebuild_version_stats()
+        
+        return {
+            "new": total_new_patches,
+            "updated": total_updated,
+            "unchanged": total_unchanged,
+            "duplicates": total_duplicates,
+        }
+        
     except Exception as e:
         print(f"❌ Erreur lors de la synchronisation: {e}")
     
     finally:
-        client.close()
-        print("🔌 Connexion MongoDB fermée")
+        if close_client:
+            close_repository()
+            print("🔌 Connexion au stockage fermée")
 
-def get_existing_patches():
-    """Récupère tous les patches existants et les indexe par database_patch_version"""
-    existing_patches = {}
+# ==============================
+# STATISTIQUES (AGRÉGATION CÔTÉ SERVEUR)
+# ==============================
+def assemble_database_stats(group):
+    """Rapport d'une base à partir de son document agrégé"""
+    ai_types_count = {}
+    for types in group["dominant_types"]:
+        for dominant_type in types:
+            ai_types_count[dominant_type] = ai_types_count.get(dominant_type, 0) + 1
     
-    try:
-        # Récupérer tous les documents
-        cursor = collection_version.find({}, {"database": 1, "patch_version": 1})
-        
-        for doc in cursor:
-            db_name = doc.get('database')
-            patch_version = doc.get('patch_version')
-            
-            if db_name and patch_version:
-                unique_key = f"{db_name}_{patch_version}"
-                existing_patches[unique_key] = doc
-                
-    except Exception as e:
-        print(f"⚠️  Erreur lors de la récupération des patches existants: {e}")
+    versions = {}
+    for version in group["versions"]:
+        versions[version["major_version"]] = {
+            "patches_count": version["patches_count"],
+            "patches": {patch["patch_version"]: patch for patch in version["patches"]},
+            "version_totals": version["version_totals"],
+        }
     
-    return existing_patches
+    return {
+        "major_versions_count": len(group["major_versions"]),
+        "major_versions": group["major_versions"],
+        "total_patches": group["total_patches"],
+        "versions": versions,
+        "global_stats": {
+            "total_innovation": group["total_innovation"],
+            "total_acid_features": group["total_acid_features"],
+            "total_alerts": group["total_alerts"],
+            "ai_types_distribution": ai_types_count,
+        },
+    }
 
 def generate_comprehensive_stats():
-    """Génère un fichier JSON avec des statistiques complètes de la base de données"""
+    """Génère un fichier JSON avec des statistiques complètes de la base de données
+    
+    Sous MongoDB, une seule agrégation (storage.database_stats_pipeline)
+    calcule les compteurs côté serveur ; seuls ces compteurs transitent
+    sur le réseau.
+    """
     
     print("\n📊 Génération des statistiques complètes...")
     
     try:
-        # Statistiques globales
-        total_docs = collection_version.count_documents({})
-        
-        # Nombre de bases de données distinctes
-        databases = collection_version.distinct("database")
+        start = time.perf_counter()
         
         stats = {
             "summary": {
-                "total_databases": len(databases),
-                "total_versions": total_docs,
+                "total_databases": 0,
+                "total_versions": 0,
                 "generation_date": "2025-01-02"
             },
             "databases": {}
         }
         
-        # Statistiques par base de données
-        for db_name in databases:
-            db_stats = analyze_database(db_name)
-            stats["databases"][db_name] = db_stats
+        # Statistiques par base de données, un document agrégé par base
+        for group in get_repository().database_stats():
+            stats["databases"][group["_id"]] = assemble_database_stats(group)
+        
+        stats["summary"]["total_databases"] = len(stats["databases"])
+        stats["summary"]["total_versions"] = sum(db_stat["total_patches"] for db_stat in stats["databases"].values())
         
         # Sauvegarder les statistiques dans un fichier JSON
         output_file = "database_statistics.json"
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(stats, f, indent=2, ensure_ascii=False)
         
-        print(f"✅ Statistiques sauvegardées dans: {output_file}")
+        print(f"✅ Statistiques sauvegardées dans: {output_file} ({time.perf_counter() - start:.2f}s)")
         
         # Afficher un résumé
         print(f"\n📋 Résumé:")
-        print(f"  Bases de données: {len(databases)}")
-        print(f"  Total versions: {total_docs}")
+        print(f"  Bases de données: {stats['summary']['total_databases']}")
+        print(f"  Total versions: {stats['summary']['total_versions']}")
         
         for db_name, db_stat in stats["databases"].items():
             print(f"  {db_name}: {db_stat['major_versions_count']} versions majeures, {db_stat['total_patches']} patches")
@@ -161,210 +346,28 @@ def generate_comprehensive_stats():
         print(f"❌ Erreur lors de la génération des statistiques: {e}")
         return None
 
-def analyze_database(db_name):
-    """Analyse une base de données spécifique"""
-    
-    # Tous les documents pour cette base
-    docs = list(collection_version.find({"database": db_name}))
-    
-    # Versions majeures distinctes
-    major_versions = list(set(doc.get('major_version', 'N/A') for doc in docs))
-    major_versions.sort()
-    
-    # Grouper par version majeure
-    versions_grouped = {}
-    for doc in docs:
-        major_ver = doc.get('major_version', 'N/A')
-        if major_ver not in versions_grouped:
-            versions_grouped[major_ver] = []
-        versions_grouped[major_ver].append(doc)
-    
-    # Analyser chaque version majeure
-    versions_analysis = {}
-    total_patches = len(docs)
-    
-    for major_ver, patches in versions_grouped.items():
-        version_stats = analyze_major_version(major_ver, patches)
-        versions_analysis[major_ver] = version_stats
-    
-    # Statistiques globales pour la base de données
-    db_stats = {
-        "major_versions_count": len(major_versions),
-        "major_versions": major_versions,
-        "total_patches": total_patches,
-        "versions": versions_analysis,
-        "global_stats": calculate_global_stats(docs)
-    }
-    
-    return db_stats
-
-def analyze_major_version(major_version, patches):
-    """Analyse une version majeure spécifique"""
-    
-    patches_analysis = {}
-    
-    for patch in patches:
-        patch_version = patch.get('patch_version', 'N/A')
-        patch_stats = analyze_patch(patch)
-        patches_analysis[patch_version] = patch_stats
-    
-    # Calculer les statistiques globales pour cette version majeure
-    version_stats = {
-        "patches_count": len(patches),
-        "patches": patches_analysis,
-        "version_totals": calculate_version_totals(patches)
-    }
-    
-    return version_stats
-
-def analyze_patch(patch):
-    """Analyse un patch spécifique"""
-    
-    patch_stats = {
-        "patch_version": patch.get('patch_version', 'N/A'),
-        "date": patch.get('date', 'N/A'),
-        "ai_analysis": {},
-        "acid_consistency": {},
-        "innovation_count": 0,
-        "alerts_count": 0
-    }
-    
-    # Analyse AI
-    ai_analysis = patch.get('ai_analysis', {})
-    if ai_analysis:
-        if 'dominant_type' in ai_analysis:
-            patch_stats["ai_analysis"]["dominant_type"] = ai_analysis['dominant_type']
-        
-        if 'summary' in ai_analysis:
-            summary = ai_analysis['summary']
-            patch_stats["ai_analysis"]["summary"] = summary
-            
-            # Compter les innovations (new_feature)
-            if 'new_feature' in summary:
-                patch_stats["innovation_count"] = summary['new_feature']
-    
-    # ACID consistency
-    acid_features = patch.get('acid_consistency_features', {})
-    if acid_features:
-        # Compter les features ACID
-        acid_count = 0
-        if isinstance(acid_features, dict):
-            acid_count = len([k for k, v in acid_features.items() if v])
-        elif isinstance(acid_features, list):
-            acid_count = len(acid_features)
-        
-        patch_stats["acid_consistency"] = {
-            "features_count": acid_count,
-            "features": acid_features
-        }
-    
-    # Alerts
-    alerts = patch.get('alerts', [])
-    if alerts:
-        patch_stats["alerts_count"] = len(alerts) if isinstance(alerts, list) else 1
-    
-    return patch_stats
-
-def calculate_global_stats(docs):
-    """Calcule les statistiques globales pour une base de données"""
-    
-    total_innovation = 0
-    total_acid_features = 0
-    total_alerts = 0
-    
-    ai_types_count = {}
-    
-    for doc in docs:
-        # Innovation
-        ai_analysis = doc.get('ai_analysis', {})
-        if 'summary' in ai_analysis and 'new_feature' in ai_analysis['summary']:
-            total_innovation += ai_analysis['summary']['new_feature']
-        
-        # Type dominant
-        if 'dominant_type' in ai_analysis:
-            dominant_type = ai_analysis['dominant_type']
-            ai_types_count[dominant_type] = ai_types_count.get(dominant_type, 0) + 1
-        
-        # ACID features
-        acid_features = doc.get('acid_consistency_features', {})
-        if isinstance(acid_features, dict):
-            total_acid_features += len([k for k, v in acid_features.items() if v])
-        elif isinstance(acid_features, list):
-            total_acid_features += len(acid_features)
-        
-        # Alerts
-        alerts = doc.get('alerts', [])
-        if alerts:
-            total_alerts += len(alerts) if isinstance(alerts, list) else 1
-    
-    return {
-        "total_innovation": total_innovation,
-        "total_acid_features": total_acid_features,
-        "total_alerts": total_alerts,
-        "ai_types_distribution": ai_types_count
-    }
-
-def calculate_version_totals(patches):
-    """Calcule les totaux pour une version majeure"""
-    
-    total_innovation = 0
-    total_acid_features = 0
-    total_alerts = 0
-    
-    for patch in patches:
-        # Innovation
-        ai_analysis = patch.get('ai_analysis', {})
-        if 'summary' in ai_analysis and 'new_feature' in ai_analysis['summary']:
-            total_innovation += ai_analysis['summary']['new_feature']
-        
-        # ACID features
-        acid_features = patch.get('acid_consistency_features', {})
-        if isinstance(acid_features, dict):
-            total_acid_features += len([k for k, v in acid_features.items() if v])
-        elif isinstance(acid_features, list):
-            total_acid_features += len(acid_features)
-        
-        # Alerts
-        alerts = patch.get('alerts', [])
-        if alerts:
-            total_alerts += len(alerts) if isinstance(alerts, list) else 1
-    
-    return {
-        "total_innovation": total_innovation,
-        "total_acid_features": total_acid_features,
-        "total_alerts": total_alerts
-    }
-
 def show_sync_stats():
     """Affiche des statistiques détaillées après synchronisation"""
     try:
         print("\n📊 Statistiques après synchronisation:")
         print("-" * 40)
         
+        repository = get_repository()
+        
         # Total par base de données
-        pipeline = [
-            {"$group": {"_id": "$database", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        db_stats = list(collection_version.aggregate(pipeline))
+        db_stats = repository.count_by_database()
         
         print("Répartition par base de données:")
-        for stat in db_stats:
-            print(f"  {stat['_id']}: {stat['count']} versions")
+        for db_name, count in db_stats:
+            print(f"  {db_name}: {count} versions")
         
         # Versions les plus récentes par base de données
         print("\nDernières versions par base de données:")
-        for db_stat in db_stats:
-            db_name = db_stat['_id']
-            
-            # Trouver la version la plus récente pour cette base
-            latest = collection_version.find_one(
-                {"database": db_name},
-                sort=[("patch_version", -1)]
-            )
+        for db_name, _ in db_stats:
+            latest = repository.latest_patch(db_name)
             
             if latest:
-                print(f"  {db_name}: {latest.get('patch_version', 'N/A')}")
+                print(f"  {db_name}: {latest}")
                 
     except Exception as e:
         print(f"❌ Erreur lors de l'affichage des statistiques: {e}")
@@ -375,22 +378,12 @@ def check_duplicates():
         print("\n🔍 Vérification des doublons:")
         print("-" * 30)
         
-        # Pipeline pour trouver les doublons
-        pipeline = [
-            {"$group": {
-                "_id": {"database": "$database", "patch_version": "$patch_version"},
-                "count": {"$sum": 1},
-                "docs": {"$push": "$_id"}
-            }},
-            {"$match": {"count": {"$gt": 1}}}
-        ]
-        
-        duplicates = list(collection_version.aggregate(pipeline))
+        duplicates = get_repository().duplicates()
         
         if duplicates:
             print(f"⚠️  {len(duplicates)} doublons trouvés:")
-            for dup in duplicates[:5]:  # Limiter l'affichage
-                print(f"  {dup['_id']['database']} {dup['_id']['patch_version']}: {dup['count']} occurrences")
+            for key, count in duplicates[:5]:  # Limiter l'affichage
+                print(f"  {key['database']} {key['patch_version']}: {count} occurrences")
         else:
             print("✅ Aucun doublon trouvé")
             
@@ -401,14 +394,10 @@ if __name__ == "__main__":
     print("🔄 Synchronisation intelligente des patches")
     print("=" * 50)
     
-    sync_new_patches()
+    sync_new_patches(close_client=False)
     
-    # Afficher les statistiques (nécessite une nouvelle connexion)
+    # Statistiques sur le même stockage (storage.get_repository)
     try:
-        client = MongoClient(MONGO_URI)
-        db = client["VT"]
-        collection_version = db["versions"]
-        
         show_sync_stats()
         check_duplicates()
         
@@ -418,5 +407,4 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"⚠️  Impossible d'afficher les statistiques: {e}")
     finally:
-        if 'client' in locals():
-            client.close()
+        close_repository()
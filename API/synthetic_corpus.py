@@ -0,0 +1,125 @@
+"""
+Générateur de corpus synthétique pour mesurer le pipeline à grande échelle.
+
+Construit des fichiers sources/*.json N fois plus gros que les sources
+actuelles (mêmes bases, N fois plus de patches). Le texte des
+changements est tiré des données réelles de outputfinal/ :
+
+    - nombre d'entrées 'changes' par patch,
+    - nombre de lignes par entrée et de mots par ligne,
+    - vocabulaire, tiré selon la fréquence réelle des mots.
+
+Les mots-clés des étapes (ACID, alertes, innovations, catégories)
+apparaissent donc dans les mêmes proportions que dans le corpus réel.
+Les fichiers qui ne sont pas des listes de patches (cockroachdb) sont
+recopiés tels quels. La génération est déterministe pour une graine
+donnée.
+
+Usage :
+    python synthetic_corpus.py --scale 10 --target bench_runs/x10/sources
+"""
+
+import argparse
+import itertools
+import random
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+import codec
+
+REFERENCE_DIR = "outputfinal"
+SOURCES_DIR = "sources"
+
+
+class CorpusModel:
+    """Distributions observées dans les changements réels"""
+
+    def __init__(self, reference_dir: str = REFERENCE_DIR):
+        self.entries_per_patch: List[int] = []
+        self.lines_per_entry: List[int] = []
+        self.words_per_line: List[int] = []
+        vocabulary = Counter()
+
+        for path in codec.dataset_files(reference_dir):
+            if not codec.is_array(path):
+                continue
+            for doc in codec.iter_array(path):
+                changes = doc.get("changes") if isinstance(doc, dict) else None
+                if not changes:
+                    continue
+                self.entries_per_patch.append(len(changes))
+                for change in changes:
+                    lines = change.split("\n")
+                    self.lines_per_entry.append(len(lines))
+                    for line in lines:
+                        words = line.split()
+                        self.words_per_line.append(len(words))
+                        vocabulary.update(words)
+
+        if not vocabulary:
+            raise ValueError(f"Aucun changement trouvé dans {reference_dir}")
+        self.words = list(vocabulary)
+        self.cum_weights = list(itertools.accumulate(vocabulary[word] for word in self.words))
+
+    def change(self, rng: random.Random) -> str:
+        lines = []
+        for _ in range(rng.choice(self.lines_per_entry)):
+            count = rng.choice(self.words_per_line)
+            lines.append(" ".join(rng.choices(self.words, cum_weights=self.cum_weights, k=count)))
+        return "\n".join(lines)
+
+    def changes(self, rng: random.Random) -> List[str]:
+        return [self.change(rng) for _ in range(rng.choice(self.entries_per_patch))]
+
+
+def synthetic_patches(model: CorpusModel, real: List[Dict], count: int, rng: random.Random):
+    """`count` patches calqués sur ceux d'une source réelle (base, versions, dates)"""
+    templates = [doc for doc in real if isinstance(doc, dict) and doc.get("database")]
+    for i in range(count):
+        template = rng.choice(templates)
+        major = str(template.get("major_version", "0"))
+        yield {
+            "database": template["database"],
+            "major_version": major,
+            "patch_version": f"{major}.{1000 + i}",
+            "date": template.get("date"),
+            "changes": model.changes(rng),
+        }
+
+
+def generate(scale: int, target_dir, sources_dir: str = SOURCES_DIR, reference_dir: str = REFERENCE_DIR,
+             seed: int = 42, model: CorpusModel = None) -> Dict[str, int]:
+    """Écrit le corpus à l'échelle `scale` ; renvoie {fichier: nombre de patches}"""
+    model = model or CorpusModel(reference_dir)
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    counts = {}
+
+    for path in codec.dataset_files(sources_dir):
+        target = target_dir / path.name
+        if not codec.is_array(path):
+            shutil.copyfile(path, target)
+            counts[path.name] = 1
+            continue
+
+        real = list(codec.iter_array(path))
+        # Graine propre à chaque fichier : le contenu ne dépend pas de l'ordre des fichiers
+        rng = random.Random(f"{seed}:{path.name}:{scale}")
+        with codec.open_writer(target) as writer:
+            writer.write_all(synthetic_patches(model, real, len(real) * scale, rng))
+        counts[path.name] = writer.count
+        print(f"🧪 {path.name} : {writer.count} patches synthétiques (x{scale})")
+
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère des sources synthétiques à N fois la taille actuelle")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--target", required=True, help="dossier des sources générées")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate(args.scale, args.target, seed=args.seed)
@@ -1,13 +1,13 @@
 import json
 import os
-from etape2 import classify_change
+from etape2 import classify_change, classify_many
 
 def test_db_specific_improvement():
     """Teste l'amélioration spécifique pour Cassandra, MongoDB et CockroachDB"""
     
     # Fichiers à analyser
     files_to_test = {
-        "cassandra": "cassandra_versions.json",
+        "cassandra": "cassandra-versions.json",
         "mongodb": "mongodb-versions.json", 
         "cockroachdb": "cockroachdb-versions.json"
     }
@@ -30,6 +30,7 @@ def test_db_specific_improvement():
         total_other_before = 0
         total_other_after = 0
         total_changes = 0
+        other_descriptions = []
         
         for item in items:
             if "ai_analysis" in item and "details" in item["ai_analysis"]:
@@ -37,10 +38,12 @@ def test_db_specific_improvement():
                     total_changes += 1
                     if detail["category"] == "other":
                         total_other_before += 1
-                        # Tester avec la nouvelle classification
-                        new_category = classify_change(detail["description"])
-                        if new_category != "other":
-                            total_other_after += 1
+                        other_descriptions.append(detail["description"])
+        
+        # Tester avec la nouvelle classification (tout le fichier en un lot)
+        for new_category in classify_many(other_descriptions, engine="numpy"):
+            if new_category != "other":
+                total_other_after += 1
         
         reduction = total_other_before - total_other_after
         reduction_percent = (reduction / total_other_before * 100) if total_other_before > 0 else 0
@@ -1,6 +1,6 @@
 import json
 import os
-from etape2 import classify_change
+from etape2 import classify_change, classify_many
 
 def test_final_improvement():
     """Teste l'amélioration finale avec les mots-clés enrichis"""
@@ -10,6 +10,8 @@ def test_final_improvement():
     total_other_after = 0
     total_changes = 0
     
+    other_descriptions = []
+    
     print("📊 Analyse de l'impact final...")
     
     for filename in os.listdir("output"):
@@ -29,10 +31,12 @@ def test_final_improvement():
                     # Compter les "other" originaux
                     if detail["category"] == "other":
                         total_other_before += 1
-                        # Tester avec la nouvelle classification
-                        new_category = classify_change(detail["description"])
-                        if new_category != "other":
-                            total_other_after += 1
+                        other_descriptions.append(detail["description"])
+    
+    # Tester avec la nouvelle classification (tout le lot en un produit matriciel)
+    for new_category in classify_many(other_descriptions, engine="numpy"):
+        if new_category != "other":
+            total_other_after += 1
     
     reduction = total_other_before - total_other_after
     reduction_percent = (reduction / total_other_before * 100) if total_other_before > 0 else 0
@@ -1,6 +1,6 @@
 import json
 import os
-from etape2 import classify_change
+from etape2 import classify_change, classify_many
 
 def test_final_with_yugabyte():
     """Test final complet incluant les améliorations YugabyteDB"""
@@ -14,6 +14,9 @@ def test_final_with_yugabyte():
     total_other_after = 0
     total_changes = 0
     
+    # (base, description) des changements "other", reclassifiés en un seul lot
+    other_changes = []
+    
     # Analyser tous les fichiers
     for filename in os.listdir("output"):
         if not filename.endswith(".json"):
@@ -42,17 +45,19 @@ def test_final_with_yugabyte():
                     if detail["category"] == "other":
                         total_other_before += 1
                         db_stats[db_name]["other_before"] += 1
-                        
-                        # Tester avec la nouvelle classification
-                        new_category = classify_change(detail["description"])
-                        if new_category != "other":
-                            total_other_after += 1
-                            db_stats[db_name]["other_after"] += 1
-                        
-                        # Compter les nouvelles catégories
-                        if new_category not in db_stats[db_name]["categories"]:
-                            db_stats[db_name]["categories"][new_category] = 0
-                        db_stats[db_name]["categories"][new_category] += 1
+                        other_changes.append((db_name, detail["description"]))
+    
+    # Tester avec la nouvelle classification
+    new_categories = classify_many([description for _, description in other_changes], engine="numpy")
+    for (db_name, _), new_category in zip(other_changes, new_categories):
+        if new_category != "other":
+            total_other_after += 1
+            db_stats[db_name]["other_after"] += 1
+        
+        # Compter les nouvelles catégories
+        if new_category not in db_stats[db_name]["categories"]:
+            db_stats[db_name]["categories"][new_category] = 0
+        db_stats[db_name]["categories"][new_category] += 1
     
     reduction = total_other_before - total_other_after
     reduction_percent = (reduction / total_other_before * 100) if total_other_before > 0 else 0
@@ -104,6 +109,7 @@ def test_final_with_yugabyte():
     }
     
     # Recalculer les catégories globales
+    descriptions = []
     for filename in os.listdir("output"):
         if not filename.endswith(".json"):
             continue
@@ -117,8 +123,10 @@ def test_final_with_yugabyte():
         for item in items:
             if "ai_analysis" in item and "details" in item["ai_analysis"]:
                 for detail in item["ai_analysis"]["details"]:
-                    new_category = classify_change(detail["description"])
-                    global_categories[new_category] += 1
+                    descriptions.append(detail["description"])
+    
+    for new_category in classify_many(descriptions, engine="numpy"):
+        global_categories[new_category] += 1
     
     # Trier et afficher
     sorted_categories = sorted(global_categories.items(), key=lambda x: x[1], reverse=True)
@@ -1,6 +1,6 @@
 import json
 import os
-from etape2 import classify_change
+from etape2 import classify_change, classify_many
 
 def test_final_comprehensive_improvement():
     """Test final de toutes les améliorations apportées"""
@@ -12,6 +12,8 @@ def test_final_comprehensive_improvement():
     total_other_after = 0
     total_changes = 0
     
+    other_descriptions = []
+    
     # Analyser tous les fichiers
     for filename in os.listdir("output"):
         if not filename.endswith(".json"):
@@ -29,10 +31,12 @@ def test_final_comprehensive_improvement():
                     total_changes += 1
                     if detail["category"] == "other":
                         total_other_before += 1
-                        # Tester avec la nouvelle classification
-                        new_category = classify_change(detail["description"])
-                        if new_category != "other":
-                            total_other_after += 1
+                        other_descriptions.append(detail["description"])
+    
+    # Tester avec la nouvelle classification (tout le lot en un produit matriciel)
+    for new_category in classify_many(other_descriptions, engine="numpy"):
+        if new_category != "other":
+            total_other_after += 1
     
     reduction = total_other_before - total_other_after
     reduction_percent = (reduction / total_other_before * 100) if total_other_before > 0 else 0
@@ -58,6 +62,7 @@ def test_final_comprehensive_improvement():
         "other": 0
     }
     
+    descriptions = []
     for filename in os.listdir("output"):
         if not filename.endswith(".json"):
             continue
@@ -71,9 +76,11 @@ def test_final_comprehensive_improvement():
         for item in items:
             if "ai_analysis" in item and "details" in item["ai_analysis"]:
                 for detail in item["ai_analysis"]["details"]:
-                    # Reclassifier avec le nouveau système
-                    new_category = classify_change(detail["description"])
-                    category_counts[new_category] += 1
+                    descriptions.append(detail["description"])
+    
+    # Reclassifier avec le nouveau système
+    for new_category in classify_many(descriptions, engine="numpy"):
+        category_counts[new_category] += 1
     
     # Trier et afficher
     sorted_categories = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)
@@ -1,6 +1,6 @@
 import json
 import os
-from etape2 import classify_change, CATEGORIES
+from etape2 import classify_change, classify_many, CATEGORIES
 
 def test_improvement():
     """Teste l'amélioration de la classification avec les nouveaux mots-clés"""
@@ -39,6 +39,7 @@ def test_improvement():
     total_other_before = 0
     total_other_after = 0
     total_changes = 0
+    other_descriptions = []
     
     for filename in os.listdir("output"):
         if not filename.endswith(".json"):
@@ -56,10 +57,12 @@ def test_improvement():
                     total_changes += 1
                     if detail["category"] == "other":
                         total_other_before += 1
-                        # Tester si la nouvelle classification fonctionne
-                        new_category = classify_change(detail["description"])
-                        if new_category != "other":
-                            total_other_after += 1
+                        other_descriptions.append(detail["description"])
+    
+    # Tester si la nouvelle classification fonctionne (tout le lot en un produit matriciel)
+    for new_category in classify_many(other_descriptions, engine="numpy"):
+        if new_category != "other":
+            total_other_after += 1
     
     improvement = ((total_other_before - total_other_after) / total_other_before * 100) if total_other_before > 0 else 0
     
@@ -1,3 +1,1007 @@
-from django.test import TestCase
+"""
+Équivalences garanties par les optimisations du pipeline.
 
-# Create your tests here.
+Chaque test compare une implémentation optimisée à la version d'origine
+(une recherche par mot-clé) sur les lignes de changement réelles de
+sources/, ou deux chemins d'exécution qui doivent produire la même sortie.
+
+    python -m pytest -q
+"""
+
+import json
+import os
+import re
+import runpy
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parent
+SOURCES_DIR = API_DIR / "sources"
+
+# Cas limites : expression multi-mots, mot-clé collé, ponctuation, casse
+EDGE_CASES = [
+    "",
+    "FIX: crash in the query planner",
+    "freaking fixes everywhere",
+    "enhancescalability of io-bound disk I/O",
+    "CVE-2024-1234: remote code execution via crafted token",
+    "Refactors cleanup; adds new feature, major performance boost",
+    "garbage collection pauses reduced (gc)",
+    "Vector search with HNSW index and embeddings",
+]
+
+
+def load_changes(limit_per_file: int = 1500):
+    """Lignes de changement distinctes des sources (au plus limit_per_file par fichier)"""
+    texts = list(EDGE_CASES)
+    for path in sorted(SOURCES_DIR.glob("*.json")):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        changes = [change for doc in (data if isinstance(data, list) else [data]) if isinstance(doc, dict)
+                   for change in doc.get("changes", []) if isinstance(change, str)]
+        texts.extend(list(dict.fromkeys(changes))[:limit_per_file])
+    return texts
+
+
+@pytest.fixture(scope="module")
+def changes():
+    return load_changes()
+
+
+# ==============================
+# IMPLÉMENTATIONS D'ORIGINE
+# ==============================
+def reference_classifier(categories):
+    """classify_change d'origine : re.search(rf"\\b{kw}\\b") pour chaque mot-clé"""
+    patterns = [(category, re.compile(rf"\b{kw}\b")) for category, keywords in categories.items() for kw in keywords]
+
+    def classify(text):
+        text = text.lower()
+        scores = {}
+        for category, pattern in patterns:
+            if pattern.search(text):
+                scores[category] = scores.get(category, 0) + 1
+        if not scores:
+            return "other"
+        return max(scores, key=scores.get)
+
+    return classify
+
+
+def reference_scan(text):
+    """Enregistrement de scanner.scan_change recalculé avec les tests 'keyword in text' d'origine"""
+    from ACID import ACID_KEYWORDS
+    from alert import ALERT_LEVEL_KEYWORDS, CRITICAL_KEYWORDS, PERFORMANCE_KEYWORDS, VULNERABILITY_KEYWORDS
+    from innovation import INNOVATION_CATEGORIES
+
+    text_lower = text.lower()
+    alert_types = [
+        alert_type for alert_type, keywords in [
+            ('vulnerability', VULNERABILITY_KEYWORDS),
+            ('performance', PERFORMANCE_KEYWORDS),
+            ('critical_change', CRITICAL_KEYWORDS),
+        ]
+        if any(kw in text_lower for kw in keywords)
+    ]
+    alert_level = next((level for level, keywords in ALERT_LEVEL_KEYWORDS.items()
+                        if any(kw in text_lower for kw in keywords)), None)
+    if alert_level is None and alert_types:
+        alert_level = 'low'
+
+    innovations = []
+    for category, config in INNOVATION_CATEGORIES.items():
+        matched = [kw for kw in config["keywords"] if kw in text_lower]
+        if len(matched) >= 2 or (matched and any(len(kw) > 3 for kw in matched)):
+            innovations.append(category)
+
+    return {
+        "acid": any(kw in text_lower for kw in ACID_KEYWORDS),
+        "alert_level": alert_level,
+        "alert_types": alert_types,
+        "innovations": innovations,
+    }
+
+
+# ==============================
+# CLASSIFICATION (etape2)
+# ==============================
+def test_keyword_matcher_matches_regex_loop(changes):
+    from etape2 import CATEGORIES, classify_change
+
+    reference = reference_classifier(CATEGORIES)
+    mismatches = [text for text in changes if classify_change(text) != reference(text)]
+    assert not mismatches, mismatches[:5]
+
+
+def test_keyword_matcher_counts_duplicate_keywords():
+    from etape2 import KeywordMatcher
+
+    # "reduce" figure deux fois dans performance : deux voix, comme dans la boucle d'origine
+    categories = {"performance": ["reduce", "reduce"], "bug_fix": ["fix", "crash"]}
+    matcher = KeywordMatcher(categories)
+    assert matcher.scores("reduce crash") == {"performance": 2, "bug_fix": 1}
+    assert matcher.classify("reduce fix crash") == "performance"
+    assert matcher.classify("nothing here") == "other"
+
+
+def test_token_matrix_matches_classify_change(changes):
+    from batch_classifier import classify_texts
+    from etape2 import CATEGORIES, classify_change, classify_many
+
+    expected = [classify_change(text) for text in changes]
+    assert classify_texts(changes, CATEGORIES) == expected
+    assert classify_many(changes, engine="numpy") == expected
+
+
+def test_token_matrix_reclassifies_after_keyword_change(changes):
+    from batch_classifier import TokenMatrix
+    from etape2 import CATEGORIES
+
+    # Même matrice, dictionnaire ajusté : cas d'usage de enhance_keywords.py
+    adjusted = {category: list(keywords) for category, keywords in CATEGORIES.items()}
+    adjusted["testing"] += ["flaky", "ci pipeline"]
+    adjusted["bug_fix"].remove("fix")
+
+    matrix = TokenMatrix(changes)
+    assert matrix.classify(CATEGORIES) == [reference_classifier(CATEGORIES)(text) for text in changes]
+    assert matrix.classify(adjusted) == [reference_classifier(adjusted)(text) for text in changes]
+
+
+# ==============================
+# SCANNER PARTAGÉ (ACID, alertes, innovations)
+# ==============================
+def test_change_scanner_matches_substring_checks(changes):
+    from etape2 import classify_change
+    from scanner import get_scanner
+
+    scanner = get_scanner()
+    for text in changes:
+        record = scanner.scan(text)
+        assert record == {"category": classify_change(text), **reference_scan(text)}, text
+
+
+def test_substring_matcher_finds_overlapping_keywords():
+    from scanner import SubstringMatcher
+
+    matcher = SubstringMatcher(["gc", "garbage collection", "collection", "col", "rce", "source"])
+    assert matcher.find("garbage collection of resources") == {"garbage collection", "collection", "col", "rce", "source"}
+    assert matcher.find("nothing") == set()
+    assert SubstringMatcher([]).find("anything") == set()
+
+
+# ==============================
+# CACHE PERSISTANT DU SCANNER
+# ==============================
+def test_scan_cache_recomputes_only_stale_parts(tmp_path, monkeypatch):
+    import scanner
+    from scan_cache import PARTS, ScanCache
+
+    full_scanner = scanner.get_scanner()
+    fingerprints = dict(full_scanner.fingerprints)
+    requested = []
+
+    def spy_scan(text, parts=PARTS):
+        requested.append(sorted(parts))
+        return type(full_scanner).scan(full_scanner, text, parts)
+
+    def cached_scan(fingerprints, text):
+        """scan_change sans la mémoïsation du processus, sur un cache rouvert"""
+        cache = ScanCache(fingerprints, str(tmp_path / "scan_cache.sqlite"))
+        monkeypatch.setattr(scanner, "_CACHE", cache)
+        record = scanner.scan_change.__wrapped__(text)
+        cache.close()
+        return record, (cache.hits, cache.misses)
+
+    monkeypatch.setattr(full_scanner, "scan", spy_scan)
+    text = "Critical security fix: ACID transaction isolation with vector search embeddings"
+    expected = type(full_scanner).scan(full_scanner, text)
+
+    assert cached_scan(fingerprints, text) == (expected, (0, 1))
+    assert requested == [sorted(PARTS)]
+
+    # Mots-clés ACID modifiés : seule la partie acid est recalculée
+    requested.clear()
+    acid_changed = dict(fingerprints, acid="acid-v2")
+    assert cached_scan(acid_changed, text) == (expected, (0, 1))
+    assert requested == [["acid"]]
+    assert cached_scan(acid_changed, text) == (expected, (1, 0))
+    assert requested == [["acid"]]
+
+    # CATEGORIES modifié : pas de recherche de sous-chaînes
+    requested.clear()
+    assert cached_scan(dict(acid_changed, category="category-v2"), text) == (expected, (0, 1))
+    assert requested == [["category"]]
+
+
+def test_partial_scan_matches_full_scan(changes):
+    from scan_cache import PARTS
+    from scanner import get_scanner
+
+    scanner = get_scanner()
+    for text in changes[:500]:
+        full = scanner.scan(text)
+        merged = {}
+        for part in PARTS:
+            merged.update(scanner.scan(text, [part]))
+        assert merged == full, text
+
+
+# ==============================
+# CLASSIFIEUR STATISTIQUE (nb_classifier)
+# ==============================
+TRAINING_CHANGES = [
+    ("Fix crash when the planner reads an empty index", "bug_fix"),
+    ("Fix memory leak in the replication stream", "bug_fix"),
+    ("Improve query performance of range scans", "performance"),
+    ("Faster compaction and lower read latency", "performance"),
+    ("Add support for vector search", "new_feature"),
+    ("New command to export the schema", "new_feature"),
+    ("Patch CVE-2024-1234 in the authentication layer", "security"),
+    ("Upgrade the TLS library for a security vulnerability", "security"),
+]
+
+
+def test_naive_bayes_fit_save_load_round_trip(tmp_path, monkeypatch):
+    import etape2
+    from nb_classifier import NaiveBayesClassifier
+
+    texts, labels = map(list, zip(*TRAINING_CHANGES))
+    model = NaiveBayesClassifier().fit(texts, labels)
+    probes = texts + ["crash in the planner", "vector search export", "completely unrelated words"]
+    predicted = model.predict(probes)
+    assert predicted[:len(labels)] == labels
+
+    # Un modèle entraîné en mémoire a déjà son empreinte (workers, manifeste)
+    monkeypatch.setattr(etape2, "CLASSIFIER", None)
+    etape2._init_worker(model)
+    assert etape2.stage_fingerprint() == model.fingerprint
+
+    model.save(tmp_path / "model.npz")
+    loaded = NaiveBayesClassifier.load(tmp_path / "model.npz")
+    assert loaded.predict(probes) == predicted
+    assert loaded.fingerprint == model.fingerprint
+
+    retrained = NaiveBayesClassifier().fit(texts[:-1], labels[:-1])
+    assert retrained.fingerprint != model.fingerprint
+
+
+# ==============================
+# ENRICHISSEMENT INCRÉMENTAL (etape2 + manifeste)
+# ==============================
+def neo4j_patch(version="5.26.1", changes=("Fix crash in the query planner", "Improve read performance")):
+    return {"database": "Neo4j", "major_version": "5.26", "patch_version": version, "changes": list(changes)}
+
+
+def incremental_run(tmp_path, patches):
+    """Un passage d'etape2 en mode incrémental : (documents, manifeste) ; le précédent est relu sur disque"""
+    import codec
+    from enrichment_manifest import EnrichmentManifest
+    from etape2 import analyze_incremental, load_previous_output
+
+    output = tmp_path / "neo4j-versions.json"
+    manifest = EnrichmentManifest(str(tmp_path / "manifest.json"))
+    analyzed = analyze_incremental([dict(patch) for patch in patches], load_previous_output(output), manifest)
+    manifest.save()
+    codec.dump(analyzed, output)
+    return analyzed, manifest
+
+
+def mark_previous_output(tmp_path):
+    """Remplace ai_analysis du document enregistré : visible seulement s'il est réutilisé"""
+    output = tmp_path / "neo4j-versions.json"
+    docs = json.loads(output.read_text(encoding="utf-8"))
+    for doc in docs:
+        doc["ai_analysis"]["dominant_type"] = "reused"
+    output.write_text(json.dumps(docs, ensure_ascii=False), encoding="utf-8")
+
+
+def test_incremental_reuses_unchanged_patch(tmp_path):
+    first, manifest = incremental_run(tmp_path, [neo4j_patch()])
+    assert (manifest.processed, manifest.reused) == (1, 0)
+    assert first[0]["ai_analysis"]["dominant_type"] in ("bug_fix", "performance")
+
+    mark_previous_output(tmp_path)
+    second, manifest = incremental_run(tmp_path, [neo4j_patch()])
+    assert (manifest.processed, manifest.reused) == (0, 1)
+    assert second[0]["ai_analysis"]["dominant_type"] == "reused"
+
+
+def test_incremental_recomputes_changed_changes(tmp_path):
+    incremental_run(tmp_path, [neo4j_patch(), neo4j_patch("5.26.2")])
+    mark_previous_output(tmp_path)
+
+    changed = neo4j_patch("5.26.2", ["Fix crash in the query planner", "Add support for vector search"])
+    analyzed, manifest = incremental_run(tmp_path, [neo4j_patch(), changed])
+    assert (manifest.processed, manifest.reused) == (1, 1)
+    assert analyzed[0]["ai_analysis"]["dominant_type"] == "reused"
+    assert [d["description"] for d in analyzed[1]["ai_analysis"]["details"]] == changed["changes"]
+    assert analyzed[1]["ai_analysis"]["dominant_type"] != "reused"
+
+
+def test_incremental_fingerprint_change_invalidates_entries(tmp_path, monkeypatch):
+    import etape2
+    from nb_classifier import NaiveBayesClassifier
+    from scan_cache import fingerprint
+    from scanner import get_scanner
+
+    incremental_run(tmp_path, [neo4j_patch()])
+
+    # Dictionnaire CATEGORIES modifié
+    mark_previous_output(tmp_path)
+    adjusted = dict(etape2.CATEGORIES, testing=etape2.CATEGORIES["testing"] + ["flaky"])
+    with monkeypatch.context() as patched:
+        patched.setitem(get_scanner().fingerprints, "category", fingerprint(adjusted))
+        analyzed, manifest = incremental_run(tmp_path, [neo4j_patch()])
+    assert (manifest.processed, manifest.reused) == (1, 0)
+    assert analyzed[0]["ai_analysis"]["dominant_type"] != "reused"
+
+    # Modèle statistique à la place des mots-clés
+    mark_previous_output(tmp_path)
+    texts, labels = map(list, zip(*TRAINING_CHANGES))
+    monkeypatch.setattr(etape2, "CLASSIFIER", NaiveBayesClassifier().fit(texts, labels))
+    analyzed, manifest = incremental_run(tmp_path, [neo4j_patch()])
+    assert (manifest.processed, manifest.reused) == (1, 0)
+    assert analyzed[0]["ai_analysis"]["dominant_type"] != "reused"
+
+
+def test_manifest_save_keeps_other_databases(tmp_path):
+    from enrichment_manifest import EnrichmentManifest
+
+    path = str(tmp_path / "manifest.json")
+    neo4j, redis = neo4j_patch(), {"database": "Redis", "patch_version": "7.4.1", "changes": ["Fix crash"]}
+
+    # Deux processus ouverts en même temps, une base chacun
+    first, second = EnrichmentManifest(path), EnrichmentManifest(path)
+    first.mark("etape2", neo4j, "fp")
+    second.mark("etape2", redis, "fp")
+    first.save()
+    second.save()
+    assert EnrichmentManifest(path).is_current("etape2", neo4j, "fp")
+    assert EnrichmentManifest(path).is_current("etape2", redis, "fp")
+
+    # Marques d'un worker reprises par merge, puis remplacement des entrées Neo4j seulement
+    worker = EnrichmentManifest(path)
+    changed = dict(neo4j, changes=["Add support for vector search"])
+    worker.mark("etape2", changed, "fp")
+    rerun = EnrichmentManifest(path)
+    rerun.merge(worker.seen, processed=1)
+    rerun.save()
+
+    final = EnrichmentManifest(path)
+    assert rerun.processed == 1
+    assert final.is_current("etape2", changed, "fp")
+    assert not final.is_current("etape2", neo4j, "fp")
+    assert final.is_current("etape2", redis, "fp")
+
+
+# ==============================
+# JSON EN FLUX (json_stream)
+# ==============================
+JSON_ITEMS = [
+    {"database": "Neo4j", "changes": ["Fix crash", "Amélioration des performances — 10×"], "ai_analysis": {}},
+    {"nested": {"empty_list": [], "empty_dict": {}, "values": [1, 2.5, None, True, False]}},
+    "texte\navec retour à la ligne et \"guillemets\"",
+    [],
+    [[1, [2, {}]], {"a": [{"b": []}]}],
+    42,
+]
+
+
+@pytest.mark.parametrize("items", [[], JSON_ITEMS[:1], JSON_ITEMS], ids=["empty", "one", "mixed"])
+def test_json_array_writer_matches_json_dump(tmp_path, items):
+    from json_stream import JsonArrayWriter, iter_json_array
+
+    expected = tmp_path / "expected.json"
+    with open(expected, "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=2, ensure_ascii=False)
+
+    with JsonArrayWriter(tmp_path / "streamed.json") as writer:
+        writer.write_all(items)
+
+    streamed = (tmp_path / "streamed.json").read_bytes()
+    assert streamed == expected.read_bytes()
+    assert writer.bytes_written == len(streamed)
+    assert list(iter_json_array(tmp_path / "streamed.json")) == items
+
+
+# ==============================
+# SAUVEGARDES ADRESSÉES PAR CONTENU (backup_store)
+# ==============================
+def write_output_files(directory: Path):
+    """Petit dossier output/ : deux fichiers identiques, un différent"""
+    directory.mkdir(parents=True, exist_ok=True)
+    same = json.dumps(JSON_ITEMS, indent=2, ensure_ascii=False).encode("utf-8")
+    (directory / "neo4j-versions.json").write_bytes(same)
+    (directory / "neo4j-copy.json").write_bytes(same)
+    (directory / "redis-versions.mrec").write_bytes(bytes(range(256)) * 64)
+    return {path.name: path.read_bytes() for path in directory.iterdir()}
+
+
+@pytest.mark.parametrize("compression", ["gzip", "lzma"])
+def test_backup_restore_is_byte_identical(tmp_path, compression):
+    from backup_store import BackupStore
+
+    originals = write_output_files(tmp_path / "output")
+    store = BackupStore(str(tmp_path / "backups"), compression)
+    store.snapshot("clean", tmp_path / "output")
+
+    restored = store.restore("clean", tmp_path / "restored")
+    assert {path.name: path.read_bytes() for path in restored.iterdir()} == originals
+
+
+def test_backup_stores_identical_content_once(tmp_path):
+    from backup_store import BackupStore
+
+    write_output_files(tmp_path / "output")
+    store = BackupStore(str(tmp_path / "backups"))
+    first = store.snapshot("clean", tmp_path / "output")
+    objects = sorted(path.name for path in (tmp_path / "backups" / "objects").glob("*/*"))
+
+    # Deux fichiers identiques → un seul objet ; un second instantané n'écrit rien
+    assert len(first["files"]) == 3
+    assert len(objects) == 2
+    second = BackupStore(str(tmp_path / "backups")).snapshot("etape2", tmp_path / "output")
+    assert second["files"] == first["files"]
+    assert sorted(path.name for path in (tmp_path / "backups" / "objects").glob("*/*")) == objects
+
+
+# ==============================
+# FORMATS INTERMÉDIAIRES (codec)
+# ==============================
+@pytest.mark.parametrize("fmt", ["json", "marshal", "marshal-zlib", "marshal-lzma"])
+def test_codec_round_trip(tmp_path, fmt):
+    import codec
+
+    patches = JSON_ITEMS[:2] + [{"database": "Redis", "patch_version": "7.4.1", "changes": []}]
+    summary = {"generated_at": "2026-01-03", "databases": {"Neo4j": {"patches": 2}}}
+
+    path = codec.dataset_path(tmp_path, "neo4j-versions", fmt)
+    assert codec.format_of(path) == fmt and codec.dataset_name(path) == "neo4j-versions"
+    assert codec.dump(patches, path) == path.stat().st_size
+    assert codec.is_array(path)
+    assert codec.load(path) == patches
+    assert list(codec.iter_items(path)) == patches
+
+    # Écriture en flux, un patch à la fois
+    with codec.open_writer(path) as writer:
+        for patch in patches:
+            writer.write(patch)
+    assert list(codec.iter_array(path)) == patches
+
+    # Objet unique (global_innovation_summary, fichiers objet de sources/)
+    summary_path = codec.dataset_path(tmp_path, "summary", fmt)
+    codec.dump(summary, summary_path)
+    assert not codec.is_array(summary_path)
+    assert codec.load(summary_path) == summary
+    assert list(codec.iter_items(summary_path)) == [summary]
+
+
+def test_find_dataset_picks_written_format(tmp_path):
+    import codec
+
+    # Réécrire un jeu dans un autre format supprime l'ancien fichier
+    codec.dump([{"a": 1}], codec.dataset_path(tmp_path, "redis-versions", "json"))
+    codec.dump([{"a": 2}], codec.dataset_path(tmp_path, "redis-versions", "marshal-zlib"))
+    found = codec.find_dataset(tmp_path, "redis-versions")
+    assert found.name == "redis-versions.mrec.gz"
+    assert [path.name for path in tmp_path.iterdir()] == ["redis-versions.mrec.gz"]
+    assert codec.load(found) == [{"a": 2}]
+
+    # Deux formats présents (copie manuelle) : le plus récent l'emporte
+    with codec.RecordWriter(tmp_path / "redis-versions.mrec.xz") as writer:
+        writer.write({"a": 3})
+    os.utime(tmp_path / "redis-versions.mrec.gz", ns=(1, 1))
+    assert codec.find_dataset(tmp_path, "redis-versions").name == "redis-versions.mrec.xz"
+    assert [path.name for path in codec.dataset_files(tmp_path)] == ["redis-versions.mrec.xz"]
+    assert codec.find_dataset(tmp_path, "neo4j-versions") is None
+
+
+# ==============================
+# PIPELINE FUSIONNÉ
+# ==============================
+SAMPLE_SIZES = {"mongodb-versions": 8, "neo4j-versions": 14, "redis-versions": 20, "cockroachdb-versions": None}
+
+
+def write_sample_sources(directory: Path):
+    """Extrait réduit de sources/ : quelques patches par fichier, le fichier objet tel quel"""
+    directory.mkdir(parents=True)
+    for name, size in SAMPLE_SIZES.items():
+        data = json.loads((SOURCES_DIR / f"{name}.json").read_text(encoding="utf-8"))
+        if size is not None:
+            data = data[:size]
+        (directory / f"{name}.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+# Dates réécrites à chaque exécution : ignorées dans les comparaisons
+VOLATILE_DATES = {
+    "acid_consistency_features": "extraction_date",
+    "alerts": "extraction_date",
+    "innovation_summary": "generation_date",
+}
+
+
+def stable_output(directory: Path):
+    """{fichier: documents} sans les dates d'extraction/génération"""
+    result = {}
+    for path in sorted(directory.glob("*.json")):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        docs = []
+        for doc in (data if isinstance(data, list) else [data]):
+            doc = dict(doc)
+            for section, field in VOLATILE_DATES.items():
+                if isinstance(doc.get(section), dict):
+                    doc[section] = {key: value for key, value in doc[section].items() if key != field}
+            docs.append(doc)
+        result[path.name] = docs
+    return result
+
+
+def test_fused_pipeline_matches_stage_scripts(tmp_path, monkeypatch):
+    import etape2
+    from ACID import AcidConsistencyAdderSimple
+    from alert import AlertsAdder
+    from innovation import InnovationSummaryGenerator
+    from pipeline import FusedPipeline
+
+    monkeypatch.chdir(tmp_path)
+    write_sample_sources(tmp_path / "sources")
+
+    # Pipeline fusionné en premier : clean.py réécrit ensuite sources/ sur place
+    FusedPipeline(input_dir="sources", output_dir="fused", incremental=False, sync=False).run()
+
+    # Chaîne du scheduler : un script par étape, output/ relu et réécrit à chaque fois
+    (tmp_path / "output").mkdir()
+    runpy.run_path(str(API_DIR / "clean.py"), run_name="__main__")
+    etape2.process_files(incremental=False)
+    AcidConsistencyAdderSimple(incremental=False, workers=1).process_all_files()
+    AlertsAdder(incremental=False, workers=1).process_all_files()
+    InnovationSummaryGenerator(incremental=False, workers=1).process_all_files()
+    monkeypatch.setattr("sys.argv", ["remove-changes.py"])
+    runpy.run_path(str(API_DIR / "remove-changes.py"), run_name="__main__")
+
+    fused, staged = stable_output(tmp_path / "fused"), stable_output(tmp_path / "output")
+    assert sorted(fused) == [f"{name}.json" for name in sorted(SAMPLE_SIZES)]
+    assert fused == staged
+
+
+# ==============================
+# MESURES PAR ÉTAPE (stage_metrics)
+# ==============================
+def test_stage_metrics_history_and_regressions(tmp_path):
+    import stage_metrics
+
+    path = str(tmp_path / "scheduler_metrics.jsonl")
+
+    def record(run_id, stage, wall_s, status="ok", user_s=4.0, rss_mb=100):
+        stage_metrics.append_record({"run_id": run_id, "phase": "pipeline", "stage": stage, "status": status,
+                                     "wall_s": wall_s, "user_s": user_s, "sys_s": 1.0,
+                                     "max_rss_kb": rss_mb * 1024}, path)
+
+    # r0 sort de la fenêtre de référence (baseline=5) ; l'échec de r5 n'y entre pas
+    record("r0", "enrich:neo4j", 1.0)
+    for run_id, wall_s in [("r1", 10.0), ("r2", 11.0), ("r3", 9.0), ("r4", 10.0)]:
+        record(run_id, "enrich:neo4j", wall_s)
+        record(run_id, "join", 0.2)
+    record("r5", "enrich:neo4j", 100.0, status="failed")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n{tronqué\n")
+
+    # Dernière exécution : +30 % sur enrich (régression), +150 % mais +0.3s sur join (bruit)
+    record("r6", "enrich:neo4j", 13.0, rss_mb=130)
+    record("r6", "join", 0.5)
+    record("r6", "report", 0.0, status="unchanged")
+
+    runs = stage_metrics.load_runs(path)
+    assert list(runs) == ["r0", "r1", "r2", "r3", "r4", "r5", "r6"]
+    assert runs["r6"]["enrich:neo4j"]["cpu_s"] == 5.0
+
+    regressions = stage_metrics.summarize(path, baseline=5, threshold=0.25)
+    assert regressions == [
+        {"stage": "enrich:neo4j", "metric": "wall_s", "current": 13.0, "baseline": 10.0},
+        {"stage": "enrich:neo4j", "metric": "max_rss_kb", "current": 130 * 1024, "baseline": 100 * 1024},
+    ]
+    # Seuil plus large : plus de régression
+    assert stage_metrics.summarize(path, baseline=5, threshold=0.5) == []
+
+
+# ==============================
+# GRAPHE DE TÂCHES (job_graph)
+# ==============================
+def run_graph(tasks, failing=(), max_parallel=2):
+    """Exécute le graphe ; renvoie (statuts, ordre de lancement)"""
+    from job_graph import JobGraph
+
+    started = []
+
+    def execute(task):
+        started.append(task.name)
+        return task.name not in failing
+
+    status = JobGraph(tasks).run(execute, max_parallel, log=lambda msg: None)
+    return status, started
+
+
+def test_job_graph_runs_dependencies_first():
+    from job_graph import Task
+
+    tasks = [
+        Task("scrape:a", "a.py", required=False),
+        Task("scrape:b", "b.py", required=False),
+        Task("enrich:a", "pipeline.py", deps=["scrape:a"]),
+        Task("enrich:b", "pipeline.py", deps=["scrape:b"]),
+        Task("join", "pipeline.py", deps=["enrich:a", "enrich:b"]),
+        Task("report", "etape1.py", deps=["join"]),
+    ]
+    for max_parallel in (1, 3):
+        status, started = run_graph(tasks, max_parallel=max_parallel)
+        assert set(status.values()) == {"ok"}
+        for task in tasks:
+            assert all(started.index(dep) < started.index(task.name) for dep in task.deps)
+
+
+def test_job_graph_rejects_cycles_and_unknown_dependencies():
+    from job_graph import JobGraph, Task
+
+    with pytest.raises(ValueError, match="Cycle"):
+        JobGraph([Task("a", "a.py", deps=["c"]), Task("b", "b.py", deps=["a"]), Task("c", "c.py", deps=["b"])])
+    with pytest.raises(ValueError, match="inconnue"):
+        JobGraph([Task("a", "a.py", deps=["missing"])])
+    with pytest.raises(ValueError, match="double"):
+        JobGraph([Task("a", "a.py"), Task("a", "b.py")])
+
+
+def test_job_graph_failure_propagation():
+    from job_graph import Task
+
+    tasks = [
+        Task("scrape:a", "a.py", required=False),
+        Task("enrich:a", "pipeline.py", deps=["scrape:a"]),
+        Task("enrich:b", "pipeline.py"),
+        Task("index:b", "index.py", deps=["enrich:b"]),
+        Task("join", "pipeline.py", deps=["enrich:a", "enrich:b"], partial=True),
+        Task("report", "etape1.py", deps=["join"]),
+    ]
+    status, started = run_graph(tasks, failing={"scrape:a", "enrich:b"})
+
+    # Scraper optionnel en échec : sa base est quand même enrichie
+    assert status["scrape:a"] == "failed" and status["enrich:a"] == "ok"
+    # Tâche requise en échec : ses dépendantes sont annulées, sauf la jointure partielle
+    assert status["enrich:b"] == "failed"
+    assert status["index:b"] == "skipped" and "index:b" not in started
+    assert status["join"] == "ok" and status["report"] == "ok"
+
+    # Sans partial=True, la jointure et le rapport sont annulés
+    tasks[4] = Task("join", "pipeline.py", deps=["enrich:a", "enrich:b"])
+    status, started = run_graph(tasks, failing={"enrich:b"})
+    assert status["join"] == status["report"] == "skipped"
+    assert "join" not in started and "report" not in started
+
+
+# ==============================
+# MANIFESTE DE CHANGEMENTS (scheduler)
+# ==============================
+@pytest.fixture
+def scheduler_runs(tmp_path, monkeypatch):
+    """scheduler sans sous-processus : run_script recopie in.json dans out.json et note la tâche"""
+    import scheduler
+
+    runs = []
+
+    def fake_run_script(script_path, stop_on_error=True, phase="pipeline", run_id=None, args=(), label=None):
+        runs.append(label)
+        (tmp_path / "out.json").write_text("enriched " + (tmp_path / "in.json").read_text(), encoding="utf-8")
+        return True
+
+    monkeypatch.setattr(scheduler, "run_script", fake_run_script)
+    monkeypatch.setattr(scheduler, "log", lambda msg: None)
+    monkeypatch.setattr(scheduler.stage_metrics, "append_record", lambda record, *args: None)
+    (tmp_path / "in.json").write_text("[1]", encoding="utf-8")
+    return runs
+
+
+def test_run_task_skips_unchanged_inputs(tmp_path, monkeypatch, scheduler_runs):
+    import scheduler
+    from change_manifest import ChangeManifest
+    from job_graph import Task
+
+    task = Task("enrich:neo4j-versions", "pipeline.py", ["--dataset", "neo4j-versions"],
+                inputs=["in.json"], outputs=["out.json"])
+
+    def run():
+        return scheduler.run_task(task, "run", ChangeManifest(base_dir=str(tmp_path)))
+
+    assert run() and scheduler_runs == ["enrich:neo4j-versions"]
+    assert run() and len(scheduler_runs) == 1
+
+    # Fichier réécrit à l'identique (nouvelle date) : même SHA-256, tâche sautée
+    (tmp_path / "in.json").write_text("[1]", encoding="utf-8")
+    os.utime(tmp_path / "in.json", ns=(1, 1))
+    assert run() and len(scheduler_runs) == 1
+
+    # Entrée modifiée, puis sortie modifiée à la main : relancée
+    (tmp_path / "in.json").write_text("[1, 2]", encoding="utf-8")
+    assert run() and len(scheduler_runs) == 2
+    (tmp_path / "out.json").write_text("edited", encoding="utf-8")
+    assert run() and len(scheduler_runs) == 3
+    assert run() and len(scheduler_runs) == 3
+
+    # --force relance sans consulter le manifeste
+    monkeypatch.setattr(scheduler, "FORCE", True)
+    assert run() and len(scheduler_runs) == 4
+
+
+# ==============================
+# PROJECTION (projection)
+# ==============================
+PROJECTION_DOC = {
+    "database": "Neo4j",
+    "patch_version": "5.26.1",
+    "changes": ["Fix crash"],
+    "alerts": {"count": 2, "alerts": [{"type": "performance", "level": "low"}, {"type": "vulnerability"}]},
+    "ai_analysis": {"summary": "Correctifs", "details": {"bug_fix": ["Fix crash"]}},
+}
+
+
+def test_projection_drop_nested_fields():
+    from projection import Projection
+
+    doc = json.loads(json.dumps(PROJECTION_DOC))
+    projection = Projection(drop=["changes", "alerts.alerts.type", "ai_analysis.details.bug_fix", "missing.field"])
+    projected = projection.apply(doc)
+
+    assert projected == {
+        "database": "Neo4j",
+        "patch_version": "5.26.1",
+        "alerts": {"count": 2, "alerts": [{"level": "low"}, {}]},
+        "ai_analysis": {"summary": "Correctifs", "details": {}},
+    }
+    # L'original est intact ; les branches non touchées sont partagées, pas copiées
+    assert doc == PROJECTION_DOC
+    assert projected["ai_analysis"] is not doc["ai_analysis"]
+    assert Projection(drop=["changes"]).apply(doc)["alerts"] is doc["alerts"]
+    assert projection.dropped == 4
+    assert projection.saved_bytes > 0
+
+
+def test_projection_keep_nested_fields():
+    from projection import Projection
+
+    projection = Projection(keep=["database", "alerts.alerts.level", "ai_analysis.summary", "ai_analysis"])
+    projected = projection.apply(PROJECTION_DOC)
+
+    # Un parent gardé en entier l'emporte sur un de ses champs
+    assert projected == {
+        "database": "Neo4j",
+        "alerts": {"alerts": [{"level": "low"}, {}]},
+        "ai_analysis": PROJECTION_DOC["ai_analysis"],
+    }
+    assert projection.dropped == 5
+
+    # keep puis drop : le retrait s'applique à ce qui a été gardé
+    both = Projection(keep=["database", "ai_analysis"], drop=["ai_analysis.details"])
+    assert list(both.iter([PROJECTION_DOC])) == [{"database": "Neo4j", "ai_analysis": {"summary": "Correctifs"}}]
+    assert not Projection() and Projection(keep=[])
+    assert Projection().apply(PROJECTION_DOC) is PROJECTION_DOC
+
+
+# ==============================
+# SYNCHRONISATION
+# ==============================
+@pytest.fixture
+def sqlite_storage(tmp_path, monkeypatch):
+    import storage
+
+    monkeypatch.setenv(storage.BACKEND_ENV, "sqlite")
+    monkeypatch.setenv(storage.PATH_ENV, str(tmp_path / "storage.sqlite3"))
+    storage.close_repository()
+    yield storage
+    storage.close_repository()
+
+
+def output_datasets():
+    import codec
+    from projection import output_projection
+
+    projection = output_projection()
+    return {path.name: projection.iter(codec.iter_items(path)) for path in codec.dataset_files(API_DIR / "output")}
+
+
+def test_second_sync_writes_nothing(sqlite_storage):
+    import sync
+
+    first = sync.sync_new_patches(output_datasets(), close_client=False)
+    second = sync.sync_new_patches(output_datasets(), close_client=False)
+
+    assert first["new"] > 0
+    assert second["new"] == second["updated"] == 0
+    assert second["unchanged"] == first["new"]
+    assert second["duplicates"] == first["duplicates"]
+
+
+def test_sync_keeps_first_copy_of_duplicate_patch(sqlite_storage):
+    import sync
+
+    first = {"database": "Neo4j", "major_version": "5.26", "patch_version": "5.26.1", "alerts": {"alerts_count": 1}}
+    second = dict(first, alerts={"alerts_count": 2})
+
+    counts = sync.sync_new_patches({"a.json": [first], "b.json": [second, first]}, close_client=False)
+    assert counts == {"new": 1, "updated": 0, "unchanged": 0, "duplicates": 2}
+    stored = sqlite_storage.get_repository().find_by_tech("Neo4j")
+    assert [doc["alerts"] for doc in stored] == [{"alerts_count": 1}]
+
+
+def test_incremental_version_stats_match_rebuild(sqlite_storage):
+    import sync
+
+    def patch(major, version, dominant_type):
+        return {"database": "Neo4j", "major_version": major, "patch_version": version,
+                "ai_analysis": {"dominant_type": dominant_type}, "alerts": {"alerts_count": 1}}
+
+    sync.sync_new_patches({"a.json": [patch("5.26", "5.26.1", "bug_fix"), patch("5.25", "5.25.1", "bug_fix")]},
+                          close_client=False)
+    # Le type bug_fix de 5.26 retombe à zéro, 5.25.1 change de version majeure
+    sync.sync_new_patches({"a.json": [patch("5.26", "5.26.1", "performance"), patch("5.24", "5.25.1", "security")]},
+                          close_client=False)
+
+    repository = sqlite_storage.get_repository()
+    incremental = {major: repository.get_stats("Neo4j", major) for major in ["*", "5.26", "5.25", "5.24"]}
+    sync.rebuild_version_stats()
+    rebuilt = {major: repository.get_stats("Neo4j", major) for major in ["*", "5.26", "5.25", "5.24"]}
+
+    assert incremental == rebuilt
+    assert incremental["5.25"] is None
+    assert incremental["5.26"]["ai_types_distribution"] == {"performance": 1}
+
+
+# ==============================
+# RAPPORT database_statistics.json
+# ==============================
+STATS_PATCHES = [
+    {"database": "Neo4j", "major_version": "5.26", "patch_version": "5.26.2", "date": "2025-01-10",
+     "ai_analysis": {"dominant_type": "bug_fix", "summary": {"bug_fix": 3, "new_feature": 1}},
+     "acid_consistency_features": {"transactions": ["Fix commit ordering"], "isolation": [], "durability": None},
+     "alerts": {"alerts_count": 2, "alerts": [{"level": "high"}]}},
+    {"database": "Neo4j", "major_version": "5.26", "patch_version": "5.26.1",
+     "ai_analysis": {"dominant_type": "performance", "summary": {"performance": 2}},
+     "acid_consistency_features": {}, "alerts": []},
+    {"database": "Neo4j", "patch_version": "5.0-rc1", "ai_analysis": {"dominant_type": "other"}},
+    {"database": "Redis", "major_version": "7.4", "patch_version": "7.4.1", "date": "2024-12-01",
+     "ai_analysis": {"dominant_type": "security", "summary": {"security": 1, "new_feature": 0}},
+     "acid_consistency_features": ["Atomic MULTI", "Durable AOF"], "alerts": [{"level": "critical"}, {"level": "low"}]},
+    {"database": "Redis", "major_version": "7.2", "patch_version": "7.2.9"},
+]
+
+
+def reference_database_stats(docs):
+    """Rapport d'origine de sync.generate_comprehensive_stats (find() par base, boucles Python)"""
+    def acid_count(features):
+        if isinstance(features, dict):
+            return len([k for k, v in features.items() if v])
+        if isinstance(features, list):
+            return len(features)
+        return 0
+
+    def alerts_count(alerts):
+        return (len(alerts) if isinstance(alerts, list) else 1) if alerts else 0
+
+    report = {}
+    for database in sorted({doc["database"] for doc in docs}):
+        db_docs = [doc for doc in docs if doc["database"] == database]
+        grouped = {}
+        for doc in db_docs:
+            grouped.setdefault(doc.get("major_version", "N/A"), []).append(doc)
+
+        versions = {}
+        for major_version, patches in grouped.items():
+            rows = {}
+            for patch in patches:
+                ai_analysis = patch.get("ai_analysis", {})
+                row = {"patch_version": patch.get("patch_version", "N/A"), "date": patch.get("date", "N/A"),
+                       "ai_analysis": {}, "acid_consistency": {}, "innovation_count": 0,
+                       "alerts_count": alerts_count(patch.get("alerts", []))}
+                if "dominant_type" in ai_analysis:
+                    row["ai_analysis"]["dominant_type"] = ai_analysis["dominant_type"]
+                if "summary" in ai_analysis:
+                    row["ai_analysis"]["summary"] = ai_analysis["summary"]
+                    row["innovation_count"] = ai_analysis["summary"].get("new_feature", 0)
+                features = patch.get("acid_consistency_features", {})
+                if features:
+                    row["acid_consistency"] = {"features_count": acid_count(features), "features": features}
+                rows[row["patch_version"]] = row
+            versions[major_version] = {
+                "patches_count": len(patches),
+                "patches": rows,
+                "version_totals": {
+                    "total_innovation": sum(row["innovation_count"] for row in rows.values()),
+                    "total_acid_features": sum(acid_count(p.get("acid_consistency_features", {})) for p in patches),
+                    "total_alerts": sum(row["alerts_count"] for row in rows.values()),
+                },
+            }
+
+        ai_types = {}
+        for doc in db_docs:
+            dominant_type = doc.get("ai_analysis", {}).get("dominant_type")
+            if dominant_type is not None:
+                ai_types[dominant_type] = ai_types.get(dominant_type, 0) + 1
+        report[database] = {
+            "major_versions_count": len(grouped),
+            "major_versions": sorted(grouped),
+            "total_patches": len(db_docs),
+            "versions": versions,
+            "global_stats": {
+                **{field: sum(v["version_totals"][field] for v in versions.values())
+                   for field in ("total_innovation", "total_acid_features", "total_alerts")},
+                "ai_types_distribution": ai_types,
+            },
+        }
+    return report
+
+
+def test_database_stats_match_reference_on_sqlite(sqlite_storage, tmp_path, monkeypatch):
+    import sync
+
+    sqlite_storage.get_repository().insert_patches([dict(doc) for doc in STATS_PATCHES])
+    monkeypatch.chdir(tmp_path)
+    stats = sync.generate_comprehensive_stats()
+
+    written = json.loads((tmp_path / "database_statistics.json").read_text(encoding="utf-8"))
+    assert written["databases"] == stats["databases"] == reference_database_stats(STATS_PATCHES)
+    assert written["summary"]["total_versions"] == len(STATS_PATCHES)
+    features = written["databases"]["Redis"]["versions"]["7.4"]["patches"]["7.4.1"]["acid_consistency"]["features"]
+    assert features == ["Atomic MULTI", "Durable AOF"]
+
+
+def test_database_stats_pipeline_matches_reference_on_mongodb():
+    """$group côté serveur : nécessite un serveur de test (VT_TEST_MONGO_URI)"""
+    uri = os.environ.get("VT_TEST_MONGO_URI")
+    if not uri:
+        pytest.skip("VT_TEST_MONGO_URI non défini : pas de serveur MongoDB de test")
+    from pymongo import MongoClient
+
+    from storage import database_stats_pipeline
+    from sync import assemble_database_stats
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    collection = client["vulnerability_tracker_test"]["versions_stats_test"]
+    try:
+        collection.drop()
+        collection.insert_many([dict(doc) for doc in STATS_PATCHES])
+        groups = collection.aggregate(database_stats_pipeline(), allowDiskUse=True)
+        assert {group["_id"]: assemble_database_stats(group) for group in groups} == reference_database_stats(STATS_PATCHES)
+    finally:
+        collection.drop()
+        client.close()
+
+
+# ==============================
+# INDEX (storage)
+# ==============================
+def test_sqlite_indexes_are_idempotent_and_unique(sqlite_storage):
+    import sqlite3
+
+    repository = sqlite_storage.get_repository()
+
+    def index_names():
+        return repository._query("SELECT name, sql FROM sqlite_master WHERE type = 'index' ORDER BY name")
+
+    # Avant les index secondaires, la liste d'une base et la dernière version trient en mémoire
+    before = {row["query"]: row["status"] for row in repository.index_report("Neo4j")}
+    assert before["api_get_versions"] == before["show_sync_stats.latest_patch"] == "sort"
+
+    assert repository.ensure_indexes()
+    created = index_names()
+    assert repository.ensure_indexes()
+    assert index_names() == created
+    assert {row["query"]: row["status"] for row in repository.index_report("Neo4j")} == {query: "ok" for query in before}
+
+    # Clé unique (database, patch_version) : un second INSERT est refusé, les écritures remplacent
+    patch = {"database": "Neo4j", "major_version": "5.26", "patch_version": "5.26.1", "date": "2025-01-10"}
+    repository.insert_patches([patch, dict(patch, date="2025-01-11")])
+    with pytest.raises(sqlite3.IntegrityError):
+        with repository.conn:
+            repository.conn.execute("INSERT INTO versions (database, patch_version, doc) VALUES (?, ?, ?)",
+                                    ("Neo4j", "5.26.1", "{}"))
+    assert repository.count() == 1
+    assert repository.duplicates() == []
+    assert repository.find_one_by_tech("Neo4j")["date"] == "2025-01-11"
+    assert repository.find_one_by_tech("Redis") is None
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import api_status, api_list, api_get_versions
+from .views import api_status, api_list, api_get_versions, api_get_stats
 
 urlpatterns = [
     path("api/", api_status),
     path("api/technologies/", api_list),
     path("api/technologies/<str:tech>/versions/", api_get_versions),
+    path("api/technologies/<str:tech>/stats/", api_get_stats),
 ]
@@ -1,6 +1,7 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .mongo import collection_version  # importer ta collection versions
+from .storage import get_repository  # MongoDB ou stockage embarqué (config.STORAGE_BACKEND)
+from .config import STATS_ALL_VERSIONS
 
 # Health check
 @api_view(["GET"])
@@ -25,7 +26,16 @@ def api_list(request):
 # Récupérer les versions depuis MongoDB
 @api_view(["GET"])
 def api_get_versions(request, tech):
-    results = list(collection_version.find({"database": tech}, {"_id": 0}))
+    results = get_repository().find_by_tech(tech)
     if not results:
         return Response({"error": "no data found for this technology"}, status=404)
     return Response(results)  # ← Cette ligne doit être au même niveau que le if
+
+# Totaux matérialisés d'une technologie (version_stats, tenus à jour par sync.py)
+@api_view(["GET"])
+def api_get_stats(request, tech):
+    major_version = request.GET.get("major", STATS_ALL_VERSIONS)
+    stats = get_repository().get_stats(tech, major_version)
+    if stats is None:
+        return Response({"error": "no stats found for this technology"}, status=404)
+    return Response(stats)